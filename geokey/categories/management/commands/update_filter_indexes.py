@@ -0,0 +1,63 @@
+"""Command `update_filter_indexes`."""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from geokey.categories.models import get_field_indexes, drop_index
+from geokey.subsets.models import Subset
+from geokey.users.models import UserGroup
+
+
+class Command(BaseCommand):
+    """
+    A command to maintain the expression indexes of fields used in filters
+    of user groups and subsets. Filters compiled with outdated expressions
+    are compiled again, missing indexes are built and indexes of fields that
+    are no longer filtered are dropped. Indexes are built concurrently, so
+    that contributions can be written while the command runs.
+    """
+
+    help = 'Creates the indexes of fields used in filters.'
+
+    def get_filter_fields(self):
+        """Compiles the filters again and returns all fields used."""
+        fields = {}
+
+        for model in [UserGroup, Subset]:
+            for instance in model.objects.filter(
+                    filters__isnull=False).select_related('project'):
+                clause, params = instance.compile_filters()
+                if (clause != instance.where_clause or
+                        params != instance.where_params):
+                    instance.save()
+                    self.stdout.write('Compiled filters of %s %s.' % (
+                        model._meta.verbose_name, instance.id))
+
+                for key, rule in instance.filters.items():
+                    category = instance.project.categories.get(pk=key)
+                    for field in category.get_filter_fields(rule):
+                        fields[field.index_name] = field
+
+        return fields
+
+    def handle(self, *args, **options):
+        fields = self.get_filter_fields()
+        failed = []
+
+        for index_name, field in sorted(fields.items()):
+            try:
+                if field.create_index():
+                    self.stdout.write('Created index %s.' % index_name)
+            except DatabaseError as error:
+                failed.append(index_name)
+                self.stderr.write(
+                    'Creating index %s failed: %s' % (index_name, error))
+
+        for index_name in get_field_indexes():
+            if index_name not in fields:
+                drop_index(index_name)
+                self.stdout.write('Dropped index %s.' % index_name)
+
+        if failed:
+            raise CommandError(
+                'Creating %s indexes failed.' % len(failed))
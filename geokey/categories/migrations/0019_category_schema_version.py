@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0018_historicalcategory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='schema_version',
+            field=models.CharField(editable=False, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalcategory',
+            name='schema_version',
+            field=models.CharField(editable=False, max_length=32, null=True),
+        ),
+    ]
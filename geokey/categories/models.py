@@ -8,16 +8,89 @@ from iso8601.iso8601 import ParseError
 
 from django.apps import apps
 from django.conf import settings
-from django.db import models
+from django.db import models, connection
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 
 from simple_history.models import HistoricalRecords
 
 from geokey.core.exceptions import InputError
 
 from .managers import CategoryManager, FieldManager, LookupValueManager
+from .schemas import invalidate_schema
 from .base import STATUS, DEFAULT_STATUS
 
 
+# Patterns of values that can be converted without errors; numbers with too
+# many digits would be out of range
+NUMBER_PATTERN = (
+    '^ *[-+]?([0-9]{1,100}([.][0-9]*)?|[.][0-9]+)([eE][-+]?[0-9]{1,2})? *$')
+ID_PATTERN = '^ *[0-9]{1,9} *$'
+ID_LIST_PATTERN = '^[[]?[0-9]{1,9}( *, *[0-9]{1,9})*[]]?$'
+
+INDEX_PREFIX = 'contributions_observation_field_'
+
+
+def get_index_status(index_name):
+    """
+    Returns whether the index exists and can be used. A concurrent build of
+    an index that failed leaves an invalid index.
+
+    Parameters
+    ----------
+    index_name : str
+        Name of the index
+
+    Returns
+    -------
+    Boolean
+        Indicating whether the index is valid, or None if it does not exist
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT i.indisvalid FROM pg_class c '
+            'JOIN pg_index i ON i.indexrelid = c.oid '
+            'WHERE c.relname = %s',
+            [index_name]
+        )
+        row = cursor.fetchone()
+
+    return row[0] if row is not None else None
+
+
+def get_field_indexes():
+    """
+    Returns the names of all expression indexes of fields.
+
+    Returns
+    -------
+    list
+        Names of the indexes
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT indexname FROM pg_indexes WHERE indexname LIKE %s',
+            [INDEX_PREFIX + '%']
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def drop_index(index_name):
+    """
+    Drops the index if it exists, concurrently if outside of a transaction.
+
+    Parameters
+    ----------
+    index_name : str
+        Name of the index
+    """
+    concurrently = '' if connection.in_atomic_block else 'CONCURRENTLY '
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DROP INDEX %sIF EXISTS %s' % (concurrently, index_name))
+
+
 class Category(models.Model):
     """
     Defines the data structure of a certain type of features.
@@ -50,6 +123,7 @@ class Category(models.Model):
     )
     colour = models.TextField(default='#0033ff')
     symbol = models.ImageField(upload_to='symbols', null=True, max_length=500)
+    schema_version = models.CharField(max_length=32, null=True, editable=False)
 
     objects = CategoryManager()
     history = HistoricalRecords()
@@ -82,30 +156,60 @@ class Category(models.Model):
 
         Returns
         -------
-        str
-            SQL where clause for the rule
+        tuple
+            SQL where clause for the rule, with placeholders for all values,
+            and the list of values
         """
-        queries = ['(category_id = %s)' % self.id]
+        queries = ['(category_id = %s)']
+        params = [self.id]
 
         if 'min_date' in rule:
-            queries.append('("contributions_observation".created_at >= to_date(\'' +
-                           rule['min_date'] +
-                           '\', \'YYYY-MM-DD HH24:MI\'))')
+            queries.append('("contributions_observation".created_at >= '
+                           'to_date(%s, \'YYYY-MM-DD HH24:MI\'))')
+            params.append(rule['min_date'])
 
         if 'max_date' in rule:
-            queries.append('("contributions_observation".created_at <= to_date(\'' +
-                           rule['max_date'] +
-                           '\', \'YYYY-MM-DD HH24:MI\'))')
+            queries.append('("contributions_observation".created_at <= '
+                           'to_date(%s, \'YYYY-MM-DD HH24:MI\'))')
+            params.append(rule['max_date'])
 
         for key in rule:
             if key not in ['min_date', 'max_date']:
                 try:
                     field = self.fields.get_subclass(key=key)
-                    queries.append(field.get_filter(rule[key]))
+                    query, query_params = field.get_filter(rule[key])
+                    queries.append(query)
+                    params.extend(query_params)
                 except Field.DoesNotExist:
                     pass
 
-        return '(%s)' % ' AND '.join(queries)
+        return '(%s)' % ' AND '.join(queries), params
+
+    def get_filter_fields(self, rule):
+        """
+        Returns the fields used in the rule, whose expression indexes can be
+        used by the where clause returned by `get_query`.
+
+        Parameters
+        ----------
+        rule : dict
+            Filter for the category, as stored in subsets and user groups
+
+        Returns
+        -------
+        list
+            Fields of the category
+        """
+        fields = []
+
+        for key in rule:
+            if key not in ['min_date', 'max_date']:
+                try:
+                    fields.append(self.fields.get_subclass(key=key))
+                except Field.DoesNotExist:
+                    pass
+
+        return fields
 
     def delete(self):
         """
@@ -118,6 +222,9 @@ class Category(models.Model):
         from geokey.contributions.models import Observation
         Observation.objects.filter(category=self).delete()
 
+        for field in self.fields.all():
+            field.drop_index()
+
         groups = self.project.usergroups.all()
         for usergroup in groups:
             if usergroup.filters is not None:
@@ -257,6 +364,108 @@ class Field(models.Model):
             'subclass of Field.'
         )
 
+    @property
+    def property_sql(self):
+        """
+        Returns the SQL expression selecting the value of the field from the
+        properties of a contribution. The key is part of the SQL (rather than
+        a parameter) so that expression indexes on the field can be used.
+
+        Returns
+        -------
+        str
+            SQL expression, escaped to be used in queries with parameters
+        """
+        key = self.key.replace('\'', '\'\'').replace('%', '%%')
+        return 'properties ->> \'%s\'' % key
+
+    @property
+    def value_sql(self):
+        """
+        Returns the SQL expression converting the value of the field to the
+        type it is filtered by. Values that can not be converted are NULL, so
+        that neither filters nor expression indexes fail on them.
+
+        Returns
+        -------
+        str
+            SQL expression, escaped to be used in queries with parameters
+        """
+        return self.property_sql
+
+    @property
+    def index_name(self):
+        """
+        Returns the name of the expression index for the field.
+
+        Returns
+        -------
+        str
+            Name of the index
+        """
+        return INDEX_PREFIX + str(self.id)
+
+    def get_index(self):
+        """
+        Returns the index method and the indexed expression matching the
+        where clause returned by `get_filter`. Fields that can not be filtered
+        using an index return `None`.
+
+        Returns
+        -------
+        tuple
+            Index method and index expression
+        """
+        return None
+
+    def create_index(self):
+        """
+        Creates a partial expression index on the properties of all
+        contributions of the category, unless it exists already. Outside of
+        a transaction, the index is built concurrently, so that contributions
+        can be written while it is built.
+
+        Returns
+        -------
+        Boolean
+            Indicating whether the index has been created
+        """
+        index = self.get_index()
+
+        if index is None:
+            return False
+
+        valid = get_index_status(self.index_name)
+        if valid:
+            return False
+
+        method, expression = index
+        # the expression is escaped to be used with parameters, DDL is not
+        expression = expression.replace('%%', '%')
+        concurrently = '' if connection.in_atomic_block else 'CONCURRENTLY '
+
+        with connection.cursor() as cursor:
+            if valid is not None:
+                # A concurrent build that failed leaves an invalid index
+                cursor.execute(
+                    'DROP INDEX %s%s' % (concurrently, self.index_name))
+
+            cursor.execute(
+                'CREATE INDEX %s%s '
+                'ON contributions_observation USING %s (%s) '
+                'WHERE category_id = %d' % (
+                    concurrently, self.index_name, method, expression,
+                    self.category_id)
+            )
+
+        return True
+
+    def drop_index(self):
+        """
+        Drops the expression index of the field.
+        """
+        drop_index(self.index_name)
+
     def get_filter(self, rule):
         """
         Returns an SQL where clause that can be used to filter contributions in
@@ -271,8 +480,9 @@ class Field(models.Model):
 
         Return
         ------
-        str
-            The where-clause that can be used in SQL queries.
+        tuple
+            The where-clause that can be used in SQL queries, with
+            placeholders for all values, and the list of values.
         """
         raise NotImplementedError(
             'The method `filter` has not been implemented for this '
@@ -290,6 +500,7 @@ class Field(models.Model):
         for usergroup in self.category.project.usergroups.all():
             usergroup.remove_filter_field(self)
 
+        self.drop_index()
         super(Field, self).delete()
 
 
@@ -366,11 +577,21 @@ class TextField(Field):
 
         Return
         ------
-        str
-            SQL where-clause
+        tuple
+            SQL where-clause and its parameters
+        """
+        return '((%s) ILIKE %%s)' % self.property_sql, ['%' + rule + '%']
+
+    def get_index(self):
         """
-        return ('((properties ->> \'' + self.key + '\') '
-                'ILIKE \'%%' + rule + '%%\')')
+        Returns a trigram index, used for the ILIKE pattern of the filter.
+
+        Return
+        ------
+        tuple
+            Index method and index expression
+        """
+        return 'GIN', '(%s) gin_trgm_ops' % self.property_sql
 
 
 class NumericField(Field):
@@ -380,6 +601,21 @@ class NumericField(Field):
     minval = models.FloatField(blank=True, null=True)
     maxval = models.FloatField(blank=True, null=True)
 
+    @property
+    def value_sql(self):
+        """
+        Returns the value cast to a number, or NULL if it is not a number.
+
+        Returns
+        -------
+        str
+            SQL expression, escaped to be used in queries with parameters
+        """
+        return (
+            'CASE WHEN (%s) ~ \'%s\' THEN cast(%s as double precision) END' %
+            (self.property_sql, NUMBER_PATTERN, self.property_sql)
+        )
+
     def validate_input(self, value):
         """
         Validates if the given value is a valid input for the NumerField.
@@ -455,24 +691,33 @@ class NumericField(Field):
 
         Return
         ------
-        str
-            SQL where-clause
+        tuple
+            SQL where-clause and its parameters
         """
         minval = rule.get('minval')
         maxval = rule.get('maxval')
+        value = self.value_sql
 
         if minval is not None and maxval is not None:
-            return ('(cast(properties ->> \'%s\' as double precision) >= %s) '
-                    'AND (cast(properties ->> \'%s\' as double precision) <= '
-                    '%s)' % (self.key, minval, self.key, maxval))
+            return ('(%s >= %%s) AND (%s <= %%s)' % (value, value),
+                    [minval, maxval])
         else:
             if minval is not None:
-                return ('(cast(properties ->> \'%s\' as double '
-                        'precision) >= %s)' % (self.key, minval))
+                return '(%s >= %%s)' % value, [minval]
 
             if maxval is not None:
-                return ('(cast(properties ->> \'%s\' as double '
-                        'precision) <= %s)' % (self.key, maxval))
+                return '(%s <= %%s)' % value, [maxval]
+
+    def get_index(self):
+        """
+        Returns an index on the values cast to numbers.
+
+        Return
+        ------
+        tuple
+            Index method and index expression
+        """
+        return 'BTREE', '(%s)' % self.value_sql
 
 
 class DateTimeField(Field):
@@ -546,28 +791,23 @@ class DateTimeField(Field):
 
         Return
         ------
-        str
-            SQL where-clause
+        tuple
+            SQL where-clause and its parameters
         """
         minval = rule.get('minval')
         maxval = rule.get('maxval')
+        value = 'to_date(%s, \'YYYY-MM-DD HH24:MI\')' % self.property_sql
+        bound = 'to_date(%s, \'YYYY-MM-DD HH24:MI\')'
 
         if minval is not None and maxval is not None:
-            return ('(to_date(properties ->> \'%s\', \'YYYY-MM-DD HH24:MI\') '
-                    '>= to_date(\'%s\', \'YYYY-MM-DD HH24:MI\')) AND '
-                    '(to_date(properties ->> \'%s\', \'YYYY-MM-DD HH24:MI\') '
-                    '<= to_date(\'%s\', \'YYYY-MM-DD HH24:MI\'))' %
-                    (self.key, minval, self.key, maxval))
+            return ('(%s >= %s) AND (%s <= %s)' % (value, bound, value, bound),
+                    [minval, maxval])
         else:
             if minval is not None:
-                return ('(to_date(properties ->> \'%s\', \'YYYY-MM-DD '
-                        'HH24:MI\') >= to_date(\'%s\', \'YYYY-MM-DD HH24:MI\''
-                        '))' % (self.key, minval))
+                return '(%s >= %s)' % (value, bound), [minval]
 
             if maxval is not None:
-                return ('(to_date(properties ->> \'%s\', \'YYYY-MM-DD '
-                        'HH24:MI\') <= to_date(\'%s\', \'YYYY-MM-DD HH24:MI\''
-                        '))' % (self.key, maxval))
+                return '(%s <= %s)' % (value, bound), [maxval]
 
 
 class DateField(Field):
@@ -640,28 +880,23 @@ class DateField(Field):
 
         Return
         ------
-        str
-            SQL where-clause
+        tuple
+            SQL where-clause and its parameters
         """
         minval = rule.get('minval')
         maxval = rule.get('maxval')
+        value = 'to_date(%s, \'YYYY-MM-DD\')' % self.property_sql
+        bound = 'to_date(%s, \'YYYY-MM-DD\')'
 
         if minval is not None and maxval is not None:
-            return ('(to_date(properties ->> \'%s\', \'YYYY-MM-DD\') '
-                    '>= to_date(\'%s\', \'YYYY-MM-DD\')) AND '
-                    '(to_date(properties ->> \'%s\', \'YYYY-MM-DD\') '
-                    '<= to_date(\'%s\', \'YYYY-MM-DD\'))' %
-                    (self.key, minval, self.key, maxval))
+            return ('(%s >= %s) AND (%s <= %s)' % (value, bound, value, bound),
+                    [minval, maxval])
         else:
             if minval is not None:
-                return ('(to_date(properties ->> \'%s\', \'YYYY-MM-DD'
-                        '\') >= to_date(\'%s\', \'YYYY-MM-DD\''
-                        '))' % (self.key, minval))
+                return '(%s >= %s)' % (value, bound), [minval]
 
             if maxval is not None:
-                return ('(to_date(properties ->> \'%s\', \'YYYY-MM-DD'
-                        '\') <= to_date(\'%s\', \'YYYY-MM-DD\''
-                        '))' % (self.key, maxval))
+                return '(%s <= %s)' % (value, bound), [maxval]
 
 
 class TimeField(Field):
@@ -730,29 +965,26 @@ class TimeField(Field):
 
         Return
         ------
-        str
-            SQL where-clause
+        tuple
+            SQL where-clause and its parameters
         """
         minval = rule.get('minval')
         maxval = rule.get('maxval')
+        value = '(%s)::time' % self.property_sql
 
         if minval is not None and maxval is not None:
             if time.strptime(minval, '%H:%M') > time.strptime(maxval, '%H:%M'):
-                return ('((properties ->> \'%s\')::time >= \'%s\'::time) OR '
-                        '((properties ->> \'%s\')::time <= \'%s\'::time)' %
-                        (self.key, minval, self.key, maxval))
+                return ('(%s >= %%s::time) OR (%s <= %%s::time)' %
+                        (value, value), [minval, maxval])
             else:
-                return ('((properties ->> \'%s\')::time >= \'%s\'::time) AND '
-                        '((properties ->> \'%s\')::time <= \'%s\'::time)' %
-                        (self.key, minval, self.key, maxval))
+                return ('(%s >= %%s::time) AND (%s <= %%s::time)' %
+                        (value, value), [minval, maxval])
         else:
             if minval is not None:
-                return ('((properties ->> \'%s\')::time >= \'%s\'::time)' %
-                        (self.key, minval))
+                return '(%s >= %%s::time)' % value, [minval]
 
             if maxval is not None:
-                return ('((properties ->> \'%s\')::time <= \'%s\'::time)' %
-                        (self.key, maxval))
+                return '(%s <= %%s::time)' % value, [maxval]
 
 
 class LookupField(Field):
@@ -760,6 +992,20 @@ class LookupField(Field):
     A lookup value is a special kind of field the provides an pre-defined
     number of values as valid input values.
     """
+    @property
+    def value_sql(self):
+        """
+        Returns the value cast to the ID of a lookup value, or NULL if it is
+        not an ID.
+
+        Returns
+        -------
+        str
+            SQL expression, escaped to be used in queries with parameters
+        """
+        return 'CASE WHEN (%s) ~ \'%s\' THEN (%s)::int END' % (
+            self.property_sql, ID_PATTERN, self.property_sql)
+
     def validate_input(self, value):
         """
         Checks if the provided value matches the ID of one of the field's
@@ -780,11 +1026,8 @@ class LookupField(Field):
 
         if value is not None:
             try:
-                value = int(value)
-                for lookupvalue in self.lookupvalues.all():
-                    if lookupvalue.id == value:
-                        valid = True
-            except ValueError:
+                valid = int(value) in self.lookup_ids
+            except (TypeError, ValueError):
                 pass
         else:
             valid = True
@@ -805,6 +1048,25 @@ class LookupField(Field):
         """
         return 'Select box'
 
+    @property
+    def lookup_ids(self):
+        """
+        Returns the IDs of all lookup values of the field. Fields of compiled
+        category schemas have them loaded already, other fields query them.
+
+        Return
+        ------
+        frozenset
+            IDs of the lookup values
+        """
+        lookup_ids = getattr(self, '_lookup_ids', None)
+
+        if lookup_ids is None:
+            lookup_ids = frozenset(
+                value.id for value in self.lookupvalues.all())
+
+        return lookup_ids
+
     def get_filter(self, rule):
         """
         Returns the SQL where clause for the given field based on the rule.
@@ -818,11 +1080,22 @@ class LookupField(Field):
 
         Return
         ------
-        str
-            SQL where-clause
+        tuple
+            SQL where-clause and its parameters
         """
-        return ('((properties ->> \'%s\')::int IN (%s))' %
-                (self.key, ','.join(str(x) for x in rule)))
+        return ('((%s) = ANY(%%s))' % self.value_sql,
+                [[int(x) for x in rule]])
+
+    def get_index(self):
+        """
+        Returns an index on the IDs of the selected lookup values.
+
+        Return
+        ------
+        tuple
+            Index method and index expression
+        """
+        return 'BTREE', '(%s)' % self.value_sql
 
 
 class LookupValue(models.Model):
@@ -852,6 +1125,23 @@ class LookupValue(models.Model):
 
 
 class MultipleLookupField(Field):
+    @property
+    def value_sql(self):
+        """
+        Returns the value cast to an array of IDs of lookup values, or NULL
+        if it is not a list of IDs.
+
+        Returns
+        -------
+        str
+            SQL expression, escaped to be used in queries with parameters
+        """
+        return (
+            'CASE WHEN (%s) ~ \'%s\' THEN '
+            'regexp_split_to_array(btrim(%s, \'[]\'), \',\')::int[] END' %
+            (self.property_sql, ID_LIST_PATTERN, self.property_sql)
+        )
+
     def validate_input(self, provided_vals):
         """
         Checks if the provided value matches the ID of one of the field's
@@ -874,12 +1164,10 @@ class MultipleLookupField(Field):
             if isinstance(provided_vals, (str, unicode)):
                 provided_vals = json.loads(provided_vals)
 
-            accepted_values = [value.id for value in self.lookupvalues.all()]
-            intersection = [
-                val for val in provided_vals if val in accepted_values
-            ]
-
-            valid = len(intersection) == len(provided_vals)
+            try:
+                valid = all(val in self.lookup_ids for val in provided_vals)
+            except TypeError:
+                valid = False
 
         if not valid:
             raise InputError('One or more values for the multiple select '
@@ -898,6 +1186,25 @@ class MultipleLookupField(Field):
         """
         return 'Multiple select'
 
+    @property
+    def lookup_ids(self):
+        """
+        Returns the IDs of all lookup values of the field. Fields of compiled
+        category schemas have them loaded already, other fields query them.
+
+        Return
+        ------
+        frozenset
+            IDs of the lookup values
+        """
+        lookup_ids = getattr(self, '_lookup_ids', None)
+
+        if lookup_ids is None:
+            lookup_ids = frozenset(
+                value.id for value in self.lookupvalues.all())
+
+        return lookup_ids
+
     def get_filter(self, rule):
         """
         Returns the SQL where clause for the given field based on the rule.
@@ -911,11 +1218,22 @@ class MultipleLookupField(Field):
 
         Return
         ------
-        str
-            SQL where-clause
+        tuple
+            SQL where-clause and its parameters
         """
-        return ('(regexp_split_to_array(btrim(properties ->> \'%s\', \'[]\'),'
-                ' \',\')::int[] && ARRAY[%s])' % (self.key, ', '.join(rule)))
+        return ('((%s) && %%s::int[])' % self.value_sql,
+                [[int(x) for x in rule]])
+
+    def get_index(self):
+        """
+        Returns an index on the arrays of IDs of the selected lookup values.
+
+        Return
+        ------
+        tuple
+            Index method and index expression
+        """
+        return 'GIN', '(%s)' % self.value_sql
 
 
 class MultipleLookupValue(models.Model):
@@ -942,3 +1260,30 @@ class MultipleLookupValue(models.Model):
         """
         self.status = STATUS.inactive
         self.save()
+
+
+@receiver(post_save, sender=Category)
+def invalidate_schema_on_category_save(sender, instance, **kwargs):
+    """Invalidate the compiled schema of the category when it is saved."""
+    invalidate_schema(instance.id)
+
+
+def invalidate_schema_on_field_change(sender, instance, **kwargs):
+    """Invalidate the compiled schema of the category when fields change."""
+    invalidate_schema(instance.category_id)
+
+
+# Signals are sent with the class of the instance, so the receiver is
+# connected to each type of field
+for field_class in [Field] + Field.__subclasses__():
+    post_save.connect(invalidate_schema_on_field_change, sender=field_class)
+    post_delete.connect(invalidate_schema_on_field_change, sender=field_class)
+
+
+@receiver(post_save, sender=LookupValue)
+@receiver(post_delete, sender=LookupValue)
+@receiver(post_save, sender=MultipleLookupValue)
+@receiver(post_delete, sender=MultipleLookupValue)
+def invalidate_schema_on_lookupvalue_change(sender, instance, **kwargs):
+    """Invalidate the compiled schema of the category when values change."""
+    invalidate_schema(instance.field.category_id)
@@ -0,0 +1,233 @@
+"""Compiled schemas of categories."""
+
+import re
+import time
+
+from uuid import uuid4
+
+from django.conf import settings
+from django.db.models.query import prefetch_related_objects
+
+
+SEARCH_TERMS = re.compile(r'[\W_]+')
+
+# Compiled schemas of this process by category ID
+_schemas = {}
+# Versions read from the database and when they expire, by category ID
+_versions = {}
+
+
+class CategorySchema(object):
+    """
+    The compiled schema of a category: its fields in display order, with the
+    IDs and names of the lookup values of lookup fields loaded, and the keys
+    of the display and expiry fields. Contributions are validated and their
+    display field, expiry field and search index are computed against the
+    schema without any query.
+
+    Parameters
+    ----------
+    category_id : int
+        Identifies the category in the database
+    version : str
+        Version of the schema the fields have been loaded for
+    fields : list
+        All fields of the category
+    display_field : str
+        Key of the display field of the category
+    expiry_field : str
+        Key of the expiry field of the category
+    """
+    def __init__(self, category_id, version, fields, display_field=None,
+                 expiry_field=None):
+        self.category_id = category_id
+        self.version = version
+        self.all_fields = tuple(fields)
+        self.fields = tuple(f for f in fields if f.status == 'active')
+        self.fields_by_key = dict((field.key, field) for field in self.fields)
+        self.display_field = display_field
+        self.expiry_field = expiry_field
+
+        self.search_fields = []
+        for field in self.all_fields:
+            names = None
+            if field.fieldtype in ['LookupField', 'MultipleLookupField']:
+                names = dict(
+                    (value.id, value.name)
+                    for value in field.lookupvalues.all()
+                )
+            self.search_fields.append((field.key, field.fieldtype, names))
+
+    def get_search_index(self, properties):
+        """
+        Returns the search index for the properties of a contribution: the
+        distinct words of all text, numeric and lookup values, in the order
+        of the fields.
+
+        Parameters
+        ----------
+        properties : dict
+            Properties of the contribution
+
+        Returns
+        -------
+        str
+            Comma-separated words
+        """
+        search_index = []
+        terms = set()
+
+        for key, fieldtype, names in self.search_fields:
+            value = None
+            if properties and properties.get(key) is not None:
+                value = properties.get(key)
+
+                if fieldtype == 'TextField':
+                    value = value if isinstance(value, basestring) else None
+
+                elif fieldtype == 'NumericField':
+                    value = unicode(value)
+
+                elif fieldtype == 'LookupField':
+                    try:
+                        value = names.get(int(value))
+                    except (TypeError, ValueError):
+                        value = None
+
+                elif fieldtype == 'MultipleLookupField':
+                    try:
+                        value = ' '.join(
+                            names[lookup_id] for lookup_id in sorted(value)
+                            if lookup_id in names
+                        )
+                    except TypeError:
+                        value = None
+
+                else:
+                    value = None
+
+            if value:
+                for term in SEARCH_TERMS.sub(' ', value).lower().split():
+                    if term not in terms:
+                        terms.add(term)
+                        search_index.append(term)
+
+        return ','.join(search_index)
+
+
+def get_version(category_id):
+    """
+    Returns the current version of the schema of the category, as stored
+    with the category in the database. The version read is kept in this
+    process for `SCHEMA_VERSION_TTL` seconds, so a schema changed in another
+    process is recompiled here after that delay at the latest.
+
+    Parameters
+    ----------
+    category_id : int
+        Identifies the category in the database
+
+    Returns
+    -------
+    str
+        Version of the schema
+    """
+    from .models import Category
+
+    version, expires = _versions.get(category_id, (None, 0))
+    now = time.time()
+
+    if expires <= now:
+        version = Category._base_manager.filter(pk=category_id).values_list(
+            'schema_version', flat=True).first()
+        ttl = getattr(settings, 'SCHEMA_VERSION_TTL', 5)
+        _versions[category_id] = (version, now + ttl)
+
+    return version
+
+
+def compile_schema(category_id, version):
+    """
+    Loads the category, all its fields and all values of its lookup fields,
+    and returns them as a schema.
+
+    Parameters
+    ----------
+    category_id : int
+        Identifies the category in the database
+    version : str
+        Version of the schema
+
+    Returns
+    -------
+    geokey.categories.schemas.CategorySchema
+        The compiled schema
+    """
+    from .models import Category, Field, LookupField, MultipleLookupField
+
+    fields = list(Field.objects.filter(category_id=category_id))
+
+    for field_class in [LookupField, MultipleLookupField]:
+        lookup_fields = [f for f in fields if isinstance(f, field_class)]
+        prefetch_related_objects(lookup_fields, ['lookupvalues'])
+
+        for field in lookup_fields:
+            field._lookup_ids = frozenset(
+                value.id for value in field.lookupvalues.all())
+
+    keys = dict((field.id, field.key) for field in fields)
+    category = Category._base_manager.filter(pk=category_id).values(
+        'display_field_id', 'expiry_field_id').first() or {}
+
+    return CategorySchema(
+        category_id,
+        version,
+        fields,
+        display_field=keys.get(category.get('display_field_id')),
+        expiry_field=keys.get(category.get('expiry_field_id'))
+    )
+
+
+def get_schema(category_id):
+    """
+    Returns the compiled schema of the category. The schema is compiled once
+    per process and version, and only the version is read from the database
+    when the schema is used again.
+
+    Parameters
+    ----------
+    category_id : int
+        Identifies the category in the database
+
+    Returns
+    -------
+    geokey.categories.schemas.CategorySchema
+        The compiled schema
+    """
+    version = get_version(category_id)
+    schema = _schemas.get(category_id)
+
+    if schema is None or schema.version != version:
+        schema = compile_schema(category_id, version)
+        _schemas[category_id] = schema
+
+    return schema
+
+
+def invalidate_schema(category_id):
+    """
+    Invalidates the schema of the category in all processes by storing a new
+    version with the category. Called whenever the category, its fields or
+    the values of its lookup fields change.
+
+    Parameters
+    ----------
+    category_id : int
+        Identifies the category in the database
+    """
+    from .models import Category
+
+    Category._base_manager.filter(pk=category_id).update(
+        schema_version=uuid4().hex)
+    _versions.pop(category_id, None)
+    _schemas.pop(category_id, None)
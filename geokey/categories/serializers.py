@@ -5,6 +5,7 @@ from rest_framework.serializers import (
 )
 
 from geokey.core.serializers import FieldSelectorSerializer
+from geokey.categories.schemas import get_schema
 from geokey.categories.models import (
     Category, Field, TextField, NumericField,
     LookupField, LookupValue, MultipleLookupField, MultipleLookupValue
@@ -29,6 +30,8 @@ class FieldSerializer(ModelSerializer):
     def get_is_displayfield(self, field):
         """
         Return whether the field is set as a display field for the category.
+        The category is taken from the context if it has been serialized
+        together with its fields.
 
         Parameters
         ----------
@@ -39,10 +42,8 @@ class FieldSerializer(ModelSerializer):
         -------
         Boolean
         """
-        if field.category.display_field == field:
-            return True
-        else:
-            return False
+        category = self.context.get('category') or field.category
+        return category.display_field_id == field.id
 
 
 class TextFieldSerializer(FieldSerializer):
@@ -96,7 +97,8 @@ class BaseLookupSerializer(object):
 
     def get_lookupvalues(self, field):
         """
-        Return serialized lookupvalues.
+        Return serialized lookupvalues. Lookupvalues that have been loaded
+        with the field are used without another query.
 
         Parameters
         ----------
@@ -108,7 +110,10 @@ class BaseLookupSerializer(object):
         List
             Serialized lookupvalues
         """
-        values = field.lookupvalues.filter(status='active')
+        values = [
+            value for value in field.lookupvalues.all()
+            if value.status == 'active'
+        ]
 
         if isinstance(field, LookupField):
             serializer = LookupValueSerializer(values, many=True)
@@ -166,7 +171,9 @@ class CategorySerializer(FieldSelectorSerializer):
 
     def get_fields_serialized(self, category):
         """
-        Return a list of serialized fields for the category.
+        Return a list of serialized fields for the category. The active fields
+        and their lookupvalues are taken from the compiled schema of the
+        category.
 
         Parameters
         ----------
@@ -179,18 +186,20 @@ class CategorySerializer(FieldSelectorSerializer):
             Serialized fields
         """
         fields = []
+        context = {'category': category}
 
-        for field in category.fields.filter(status='active'):
+        for field in get_schema(category.id).fields:
             if isinstance(field, TextField):
-                serializer = TextFieldSerializer(field)
+                serializer = TextFieldSerializer(field, context=context)
             elif isinstance(field, NumericField):
-                serializer = NumericFieldSerializer(field)
+                serializer = NumericFieldSerializer(field, context=context)
             elif isinstance(field, LookupField):
-                serializer = LookupFieldSerializer(field)
+                serializer = LookupFieldSerializer(field, context=context)
             elif isinstance(field, MultipleLookupField):
-                serializer = MultipleLookupFieldSerializer(field)
+                serializer = MultipleLookupFieldSerializer(
+                    field, context=context)
             else:
-                serializer = FieldSerializer(field)
+                serializer = FieldSerializer(field, context=context)
 
             fields.append(serializer.data)
 
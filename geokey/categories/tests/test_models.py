@@ -2,7 +2,11 @@
 
 import json
 
+from StringIO import StringIO
+
+from django.db import connection
 from django.test import TestCase
+from django.core.management import call_command
 
 from nose.tools import raises
 
@@ -116,23 +120,20 @@ class CategoryTest(TestCase):
         })
         self.assertEqual(
             query,
-            "((category_id = %s) AND (cast(prop"
-            "erties ->> 'number' as double precision) >= 20))" % category.id
+            ("((category_id = %%s) AND (%s >= %%s))" % field.value_sql,
+             [category.id, 20])
         )
 
         category.fields.get(pk=field.id).delete()
         query = category.get_query({
             'number': {'minval': 20}
         })
-        self.assertEqual(
-            query,
-            "((category_id = %s))" % category.id
-        )
+        self.assertEqual(query, ("((category_id = %s))", [category.id]))
 
     def test_get_query(self):
         category = CategoryFactory.create()
         query = category.get_query({})
-        self.assertEqual(query, '((category_id = %s))' % category.id)
+        self.assertEqual(query, ('((category_id = %s))', [category.id]))
 
         category = CategoryFactory.create()
         query = category.get_query({
@@ -140,9 +141,9 @@ class CategoryTest(TestCase):
         })
         self.assertEqual(
             query,
-            '((category_id = %s) AND ("contributions_observation".created_at '
-            '>= to_date(\'2014-01-05 00:00\', \'YYYY-MM-DD HH24:MI\'))'
-            ')' % category.id
+            ('((category_id = %s) AND ("contributions_observation".created_at '
+             '>= to_date(%s, \'YYYY-MM-DD HH24:MI\')))',
+             [category.id, '2014-01-05 00:00'])
         )
 
         category = CategoryFactory.create()
@@ -151,9 +152,9 @@ class CategoryTest(TestCase):
         })
         self.assertEqual(
             query,
-            '((category_id = %s) AND ("contributions_observation".created_at '
-            '<= to_date(\'2014-01-05 00:00\', \'YYYY-MM-DD HH24:MI\'))'
-            ')' % category.id
+            ('((category_id = %s) AND ("contributions_observation".created_at '
+             '<= to_date(%s, \'YYYY-MM-DD HH24:MI\')))',
+             [category.id, '2014-01-05 00:00'])
         )
 
         category = CategoryFactory.create()
@@ -163,14 +164,16 @@ class CategoryTest(TestCase):
         })
         self.assertEqual(
             query,
-            '((category_id = %s) AND ("contributions_observation".created_at '
-            '>= to_date(\'2014-01-01 00:00\', \'YYYY-MM-DD HH24:MI\')) AND '
-            '("contributions_observation".created_at <= to_date(\'2014-01-05 '
-            '00:00\', \'YYYY-MM-DD HH24:MI\')))' % category.id
+            ('((category_id = %s) AND ("contributions_observation".created_at '
+             '>= to_date(%s, \'YYYY-MM-DD HH24:MI\')) AND '
+             '("contributions_observation".created_at <= to_date(%s, '
+             '\'YYYY-MM-DD HH24:MI\')))',
+             [category.id, '2014-01-01 00:00', '2014-01-05 00:00'])
         )
 
         category = CategoryFactory.create()
-        NumericFieldFactory.create(**{'key': 'number', 'category': category})
+        field = NumericFieldFactory.create(
+            **{'key': 'number', 'category': category})
         query = category.get_query({
             'min_date': '2014-01-01 00:00',
             'max_date': '2014-01-05 00:00',
@@ -178,11 +181,12 @@ class CategoryTest(TestCase):
         })
         self.assertEqual(
             query,
-            "((category_id = %s) AND (\"contributions_observation\".created_at"
-            " >= to_date(\'2014-01-01 00:00', 'YYYY-MM-DD HH24:MI')) AND "
-            "(\"contributions_observation\".created_at <= to_"
-            "date('2014-01-05 00:00', 'YYYY-MM-DD HH24:MI')) AND (cast(prop"
-            "erties ->> 'number' as double precision) >= 20))" % category.id
+            ("((category_id = %%s) AND (\"contributions_observation\"."
+             "created_at >= to_date(%%s, 'YYYY-MM-DD HH24:MI')) AND "
+             "(\"contributions_observation\".created_at <= to_"
+             "date(%%s, 'YYYY-MM-DD HH24:MI')) AND (%s >= %%s))" %
+             field.value_sql,
+             [category.id, '2014-01-01 00:00', '2014-01-05 00:00', 20])
         )
 
 
@@ -344,7 +348,15 @@ class TextFieldTest(TestCase):
         textfield = TextFieldFactory(**{'key': 'key'})
         self.assertEqual(
             textfield.get_filter('blah'),
-            "((properties ->> 'key') ILIKE '%%blah%%')"
+            ("((properties ->> 'key') ILIKE %s)", ['%blah%'])
+        )
+
+    def test_get_filter_escapes_key(self):
+        textfield = TextFieldFactory(**{'key': "it's_100%"})
+        self.assertEqual(
+            textfield.get_filter("'; DROP TABLE x; --"),
+            ("((properties ->> 'it''s_100%%') ILIKE %s)",
+             ["%'; DROP TABLE x; --%"])
         )
 
 
@@ -484,18 +496,24 @@ class NumericFieldTest(TestCase):
 
     def test_get_filter(self):
         numeric_field = NumericFieldFactory(**{'key': 'key'})
+        value = numeric_field.value_sql
+        self.assertEqual(
+            value,
+            "CASE WHEN (properties ->> 'key') ~ '^ *[-+]?([0-9]{1,100}"
+            "([.][0-9]*)?|[.][0-9]+)([eE][-+]?[0-9]{1,2})? *$' THEN "
+            "cast(properties ->> 'key' as double precision) END"
+        )
         self.assertEqual(
             numeric_field.get_filter({'minval': 10, 'maxval': 20}),
-            "(cast(properties ->> 'key' as double precision) >= 10) AND "
-            "(cast(properties ->> 'key' as double precision) <= 20)"
+            ('(%s >= %%s) AND (%s <= %%s)' % (value, value), [10, 20])
         )
         self.assertEqual(
             numeric_field.get_filter({'minval': 10}),
-            "(cast(properties ->> 'key' as double precision) >= 10)"
+            ('(%s >= %%s)' % value, [10])
         )
         self.assertEqual(
             numeric_field.get_filter({'maxval': 20}),
-            "(cast(properties ->> 'key' as double precision) <= 20)"
+            ('(%s <= %%s)' % value, [20])
         )
 
 
@@ -584,7 +602,9 @@ class SingleLookupFieldTest(TestCase):
         lookup_field = LookupFieldFactory(**{'key': 'key'})
         self.assertEqual(
             lookup_field.get_filter([1, 2, 3]),
-            '((properties ->> \'key\')::int IN (1,2,3))'
+            ('((CASE WHEN (properties ->> \'key\') ~ \'^ *[0-9]{1,9} *$\' '
+             'THEN (properties ->> \'key\')::int END) = ANY(%s))',
+             [[1, 2, 3]])
         )
 
 
@@ -653,20 +673,21 @@ class DateTimeFieldTest(TestCase):
             date_time_field.get_filter(
                 {'minval': '2014-10-31 13:00', 'maxval': '2015-02-23 12:00'}
             ),
-            "(to_date(properties ->> \'key\', \'YYYY-MM-DD HH24:MI\') >= "
-            "to_date(\'2014-10-31 13:00\', \'YYYY-MM-DD HH24:MI\')) AND "
-            "(to_date(properties ->> \'key\', \'YYYY-MM-DD HH24:MI\') <= "
-            "to_date(\'2015-02-23 12:00\', \'YYYY-MM-DD HH24:MI\'))"
+            ("(to_date(properties ->> \'key\', \'YYYY-MM-DD HH24:MI\') >= "
+             "to_date(%s, \'YYYY-MM-DD HH24:MI\')) AND "
+             "(to_date(properties ->> \'key\', \'YYYY-MM-DD HH24:MI\') <= "
+             "to_date(%s, \'YYYY-MM-DD HH24:MI\'))",
+             ['2014-10-31 13:00', '2015-02-23 12:00'])
         )
         self.assertEqual(
             date_time_field.get_filter({'minval': '2014-10-31 13:00'}),
-            "(to_date(properties ->> \'key\', \'YYYY-MM-DD HH24:MI\') >= "
-            "to_date(\'2014-10-31 13:00\', \'YYYY-MM-DD HH24:MI\'))"
+            ("(to_date(properties ->> \'key\', \'YYYY-MM-DD HH24:MI\') >= "
+             "to_date(%s, \'YYYY-MM-DD HH24:MI\'))", ['2014-10-31 13:00'])
         )
         self.assertEqual(
             date_time_field.get_filter({'maxval': '2015-02-23 12:00'}),
-            "(to_date(properties ->> \'key\', \'YYYY-MM-DD HH24:MI\') <= "
-            "to_date(\'2015-02-23 12:00\', \'YYYY-MM-DD HH24:MI\'))"
+            ("(to_date(properties ->> \'key\', \'YYYY-MM-DD HH24:MI\') <= "
+             "to_date(%s, \'YYYY-MM-DD HH24:MI\'))", ['2015-02-23 12:00'])
         )
 
 
@@ -733,21 +754,23 @@ class TimeFieldTest(TestCase):
         time_field = TimeFieldFactory(**{'key': 'key'})
         self.assertEqual(
             time_field.get_filter({'minval': '8:00', 'maxval': '10:00'}),
-            '((properties ->> \'key\')::time >= \'8:00\'::time) AND '
-            '((properties ->> \'key\')::time <= \'10:00\'::time)'
+            ('((properties ->> \'key\')::time >= %s::time) AND '
+             '((properties ->> \'key\')::time <= %s::time)',
+             ['8:00', '10:00'])
         )
         self.assertEqual(
             time_field.get_filter({'minval': '21:00', 'maxval': '3:00'}),
-            '((properties ->> \'key\')::time >= \'21:00\'::time) OR '
-            '((properties ->> \'key\')::time <= \'3:00\'::time)'
+            ('((properties ->> \'key\')::time >= %s::time) OR '
+             '((properties ->> \'key\')::time <= %s::time)',
+             ['21:00', '3:00'])
         )
         self.assertEqual(
             time_field.get_filter({'minval': '21:00'}),
-            '((properties ->> \'key\')::time >= \'21:00\'::time)'
+            ('((properties ->> \'key\')::time >= %s::time)', ['21:00'])
         )
         self.assertEqual(
             time_field.get_filter({'maxval': '21:00'}),
-            '((properties ->> \'key\')::time <= \'21:00\'::time)'
+            ('((properties ->> \'key\')::time <= %s::time)', ['21:00'])
         )
 
 
@@ -816,20 +839,21 @@ class DateFieldTest(TestCase):
             date_field.get_filter(
                 {'minval': '2014-10-31', 'maxval': '2015-02-23'}
             ),
-            "(to_date(properties ->> \'key\', \'YYYY-MM-DD\') >= "
-            "to_date(\'2014-10-31\', \'YYYY-MM-DD\')) AND "
-            "(to_date(properties ->> \'key\', \'YYYY-MM-DD\') <= "
-            "to_date(\'2015-02-23\', \'YYYY-MM-DD\'))"
+            ("(to_date(properties ->> \'key\', \'YYYY-MM-DD\') >= "
+             "to_date(%s, \'YYYY-MM-DD\')) AND "
+             "(to_date(properties ->> \'key\', \'YYYY-MM-DD\') <= "
+             "to_date(%s, \'YYYY-MM-DD\'))",
+             ['2014-10-31', '2015-02-23'])
         )
         self.assertEqual(
             date_field.get_filter({'minval': '2014-10-31'}),
-            "(to_date(properties ->> \'key\', \'YYYY-MM-DD\') >= "
-            "to_date(\'2014-10-31\', \'YYYY-MM-DD\'))"
+            ("(to_date(properties ->> \'key\', \'YYYY-MM-DD\') >= "
+             "to_date(%s, \'YYYY-MM-DD\'))", ['2014-10-31'])
         )
         self.assertEqual(
             date_field.get_filter({'maxval': '2015-02-23'}),
-            "(to_date(properties ->> \'key\', \'YYYY-MM-DD\') <= "
-            "to_date(\'2015-02-23\', \'YYYY-MM-DD\'))"
+            ("(to_date(properties ->> \'key\', \'YYYY-MM-DD\') <= "
+             "to_date(%s, \'YYYY-MM-DD\'))", ['2015-02-23'])
         )
 
 
@@ -972,6 +996,120 @@ class MultipleLookupTest(TestCase):
         lookup_field = MultipleLookupFieldFactory(**{'key': 'key'})
         self.assertEqual(
             lookup_field.get_filter(['1', '2', '3']),
-            '(regexp_split_to_array(btrim(properties ->> \'key\', \'[]\'), '
-            '\',\')::int[] && ARRAY[1, 2, 3])'
+            ('((CASE WHEN (properties ->> \'key\') ~ '
+             '\'^[[]?[0-9]{1,9}( *, *[0-9]{1,9})*[]]?$\' THEN '
+             'regexp_split_to_array(btrim(properties ->> \'key\', \'[]\'), '
+             '\',\')::int[] END) && %s::int[])', [[1, 2, 3]])
         )
+
+
+class FieldIndexTest(TestCase):
+    def setUp(self):
+        self.project = ProjectFactory.create()
+        self.category = CategoryFactory.create(**{'project': self.project})
+
+    def index_exists(self, index_name):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT 1 FROM pg_indexes WHERE indexname = %s',
+                [index_name]
+            )
+            return cursor.fetchone() is not None
+
+    def update_indexes(self):
+        stdout = StringIO()
+        call_command('update_filter_indexes', stdout=stdout)
+        return stdout.getvalue()
+
+    def test_create_index_with_filter(self):
+        field = NumericFieldFactory.create(**{
+            'key': 'number',
+            'category': self.category
+        })
+        usergroup = UserGroupFactory.create(**{
+            'project': self.project,
+            'filters': {self.category.id: {'number': {'minval': 10}}}
+        })
+        self.assertFalse(self.index_exists(field.index_name))
+
+        output = self.update_indexes()
+        self.assertIn('Created index %s.' % field.index_name, output)
+        self.assertTrue(self.index_exists(field.index_name))
+
+        SubsetFactory.create(**{
+            'project': self.project,
+            'filters': {self.category.id: {'number': {'maxval': 20}}}
+        })
+        usergroup.filters = {}
+        usergroup.save()
+        self.assertEqual(self.update_indexes(), '')
+        self.assertTrue(self.index_exists(field.index_name))
+
+        Subset.objects.all().delete()
+        self.update_indexes()
+        self.assertFalse(self.index_exists(field.index_name))
+
+    def test_compile_outdated_filters(self):
+        NumericFieldFactory.create(**{
+            'key': 'number',
+            'category': self.category
+        })
+        usergroup = UserGroupFactory.create(**{
+            'project': self.project,
+            'filters': {self.category.id: {'number': {'minval': 10}}}
+        })
+        where = usergroup.get_where()
+        UserGroup.objects.filter(pk=usergroup.id).update(
+            where_clause='(cast(properties ->> \'number\' as '
+                         'double precision) >= 10)',
+            where_params=[]
+        )
+
+        self.assertIn('Compiled filters of user group %s.' % usergroup.id,
+                      self.update_indexes())
+        self.assertEqual(UserGroup.objects.get(pk=usergroup.id).get_where(),
+                         where)
+
+    def test_create_index_with_invalid_values(self):
+        field = NumericFieldFactory.create(**{
+            'key': 'number',
+            'category': self.category
+        })
+        ObservationFactory.create(**{
+            'project': self.project,
+            'category': self.category,
+            'properties': {'number': 'not a number'}
+        })
+
+        self.assertTrue(field.create_index())
+        self.assertTrue(self.index_exists(field.index_name))
+        self.assertFalse(field.create_index())
+
+        ObservationFactory.create(**{
+            'project': self.project,
+            'category': self.category,
+            'properties': {'number': '1e999'}
+        })
+        query, params = field.get_filter({'minval': 0})
+        self.assertEqual(
+            Observation.objects.filter(category=self.category).extra(
+                where=[query], params=params).count(),
+            0
+        )
+
+    def test_no_index_for_dates(self):
+        field = DateFieldFactory.create(**{'category': self.category})
+        field.create_index()
+        self.assertFalse(self.index_exists(field.index_name))
+
+    def test_drop_index_when_field_deleted(self):
+        field = LookupFieldFactory.create(**{
+            'key': 'lookup',
+            'category': self.category
+        })
+        index_name = field.index_name
+        field.create_index()
+        self.assertTrue(self.index_exists(index_name))
+
+        field.delete()
+        self.assertFalse(self.index_exists(index_name))
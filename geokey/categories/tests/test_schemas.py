@@ -0,0 +1,198 @@
+"""Tests for compiled schemas of categories."""
+
+from django.test import TestCase, override_settings
+from django.core.exceptions import ValidationError
+
+from nose.tools import raises
+
+from geokey.contributions.models import Observation
+
+from ..models import Category
+from ..schemas import get_schema, _schemas, _versions
+from .model_factories import (
+    CategoryFactory,
+    TextFieldFactory,
+    NumericFieldFactory,
+    LookupFieldFactory,
+    LookupValueFactory,
+    MultipleLookupFieldFactory,
+    MultipleLookupValueFactory
+)
+
+
+class CategorySchemaTest(TestCase):
+    def setUp(self):
+        self.category = CategoryFactory.create()
+        self.text = TextFieldFactory.create(**{
+            'key': 'name',
+            'category': self.category,
+            'required': True,
+            'order': 0
+        })
+        self.numeric = NumericFieldFactory.create(**{
+            'key': 'height',
+            'category': self.category,
+            'minval': 0,
+            'maxval': 100,
+            'order': 1
+        })
+        self.lookup = LookupFieldFactory.create(**{
+            'key': 'type',
+            'category': self.category,
+            'order': 2
+        })
+        self.oak = LookupValueFactory.create(**{'field': self.lookup})
+        self.multiple = MultipleLookupFieldFactory.create(**{
+            'key': 'colours',
+            'category': self.category,
+            'order': 3
+        })
+        self.green = MultipleLookupValueFactory.create(**{
+            'field': self.multiple
+        })
+        TextFieldFactory.create(**{
+            'key': 'inactive',
+            'category': self.category,
+            'status': 'inactive',
+            'order': 4
+        })
+
+    def test_compile_schema(self):
+        schema = get_schema(self.category.id)
+
+        self.assertEqual(
+            [field.key for field in schema.fields],
+            ['name', 'height', 'type', 'colours']
+        )
+        self.assertEqual(schema.fields_by_key['height'].maxval, 100)
+        self.assertTrue(schema.fields_by_key['name'].required)
+        self.assertEqual(
+            schema.fields_by_key['type'].lookup_ids,
+            frozenset([self.oak.id])
+        )
+        self.assertEqual(
+            schema.fields_by_key['colours'].lookup_ids,
+            frozenset([self.green.id])
+        )
+
+    def test_compile_display_and_expiry_field(self):
+        self.assertIsNone(get_schema(self.category.id).display_field)
+
+        self.category.display_field = self.text
+        self.category.save()
+
+        schema = get_schema(self.category.id)
+        self.assertEqual(schema.display_field, 'name')
+        self.assertIsNone(schema.expiry_field)
+
+    def test_get_search_index(self):
+        pine = LookupValueFactory.create(**{
+            'field': self.lookup,
+            'name': 'Scots pine'
+        })
+        blue = MultipleLookupValueFactory.create(**{
+            'field': self.multiple,
+            'name': 'Blue'
+        })
+        schema = get_schema(self.category.id)
+
+        self.assertEqual(
+            schema.get_search_index({
+                'name': 'Old, old_tree',
+                'height': 12,
+                'type': pine.id,
+                'colours': [blue.id, 0],
+                'inactive': 'Hidden'
+            }),
+            'old,tree,12,scots,pine,blue,hidden'
+        )
+        self.assertEqual(
+            schema.get_search_index({'height': None, 'type': None}), '')
+        self.assertEqual(schema.get_search_index(None), '')
+
+    @override_settings(SCHEMA_VERSION_TTL=60)
+    def test_validate_without_queries(self):
+        get_schema(self.category.id)
+
+        with self.assertNumQueries(0):
+            Observation.validate_full(self.category, {
+                'name': 'Tree',
+                'height': 12,
+                'type': self.oak.id,
+                'colours': [self.green.id]
+            })
+            Observation.validate_partial(self.category, {
+                'type': self.oak.id
+            })
+
+    @raises(ValidationError)
+    def test_validate_invalid_lookup_value(self):
+        Observation.validate_full(self.category, {
+            'name': 'Tree',
+            'type': -1
+        })
+
+    def test_invalidate_on_field_change(self):
+        schema = get_schema(self.category.id)
+
+        self.numeric.required = True
+        self.numeric.save()
+        self.assertIsNot(get_schema(self.category.id), schema)
+        self.assertTrue(
+            get_schema(self.category.id).fields_by_key['height'].required)
+
+        TextFieldFactory.create(**{
+            'key': 'notes',
+            'category': self.category,
+            'order': 5
+        })
+        self.assertIn('notes', get_schema(self.category.id).fields_by_key)
+
+        self.text.delete()
+        self.assertNotIn('name', get_schema(self.category.id).fields_by_key)
+
+    def test_invalidate_on_lookupvalue_change(self):
+        get_schema(self.category.id)
+
+        pine = LookupValueFactory.create(**{'field': self.lookup})
+        self.assertIn(
+            pine.id,
+            get_schema(self.category.id).fields_by_key['type'].lookup_ids
+        )
+
+        blue = MultipleLookupValueFactory.create(**{'field': self.multiple})
+        self.assertIn(
+            blue.id,
+            get_schema(self.category.id).fields_by_key['colours'].lookup_ids
+        )
+
+    def test_invalidate_on_category_save(self):
+        schema = get_schema(self.category.id)
+
+        self.category.name = 'Trees'
+        self.category.save()
+        self.assertIsNot(get_schema(self.category.id), schema)
+
+    @override_settings(SCHEMA_VERSION_TTL=60)
+    def test_invalidate_in_other_process(self):
+        schema = get_schema(self.category.id)
+
+        # Another process changes the version stored with the category
+        Category.objects.filter(pk=self.category.id).update(
+            schema_version='changed')
+        self.assertIs(get_schema(self.category.id), schema)
+
+        # The version is read again once it expires
+        _versions.pop(self.category.id)
+        self.assertIsNot(get_schema(self.category.id), schema)
+        self.assertEqual(get_schema(self.category.id).version, 'changed')
+
+    @override_settings(SCHEMA_VERSION_TTL=0)
+    def test_compile_once_per_version(self):
+        schema = get_schema(self.category.id)
+
+        with self.assertNumQueries(1):
+            self.assertIs(get_schema(self.category.id), schema)
+
+        _schemas.clear()
+        self.assertIsNot(get_schema(self.category.id), schema)
@@ -7,7 +7,7 @@ LOCATION_STATUS = Choices('active', 'review')
 OBSERVATION_STATUS = Choices('active', 'draft', 'review', 'pending', 'deleted')
 COMMENT_STATUS = Choices('active', 'deleted')
 COMMENT_REVIEW = Choices('open', 'resolved')
-MEDIA_STATUS = Choices('active', 'deleted')
+MEDIA_STATUS = Choices('active', 'processing', 'deleted')
 
 ACCEPTED_IMAGE_FORMATS = ('png', 'jpeg', 'gif')
 ACCEPTED_AUDIO_FORMATS = ('wav', 'wave', 'mp3', 'mpeg', '3gpp', '3gpp2')
@@ -0,0 +1,34 @@
+"""Command `generate_thumbnails`."""
+
+from django.core.management.base import BaseCommand
+
+from geokey.contributions.models import MediaFile
+from geokey.contributions.thumbnails import (
+    generate_thumbnail,
+    get_max_attempts
+)
+
+
+class Command(BaseCommand):
+    """
+    A command to generate the thumbnails of media files that have none yet.
+    Thumbnails are not generated while files are uploaded; videos that have
+    not been processed by YouTube yet are attempted again on the next runs,
+    up to `THUMBNAIL_MAX_ATTEMPTS` times.
+    """
+
+    help = 'Generates missing thumbnails of media files.'
+
+    def handle(self, *args, **options):
+        media_files = MediaFile.objects.filter(
+            thumbnail_url__isnull=True,
+            thumbnail_attempts__lt=get_max_attempts(),
+            audiofile__isnull=True
+        )
+
+        generated = 0
+        for media_file in media_files.iterator():
+            if generate_thumbnail(media_file) is not None:
+                generated += 1
+
+        self.stdout.write('Generated %s thumbnails.' % generated)
@@ -0,0 +1,491 @@
+"""Command `import_contributions`."""
+
+import io
+import os
+import re
+import csv
+import json
+
+from django.db import transaction
+from django.core.management.base import BaseCommand, CommandError
+from django.core.exceptions import ValidationError
+from django.contrib.gis.geos import GEOSGeometry, Point
+from django.utils.encoding import force_text
+
+from geokey.users.models import User
+from geokey.projects.models import Project
+from geokey.categories.models import (
+    Category, NumericField, LookupField, MultipleLookupField
+)
+from geokey.categories.schemas import get_schema
+from geokey.contributions.models import Location, Observation
+
+
+CHUNK_SIZE = 65536
+FEATURES = re.compile(r'"features"\s*:\s*\[')
+
+
+def read_geojson(path, chunk_size=CHUNK_SIZE):
+    """
+    Reads the features of a GeoJSON FeatureCollection one by one, so that
+    only the feature being read is held in memory, not the whole file.
+
+    Parameters
+    ----------
+    path : str
+        Path to the GeoJSON file
+    chunk_size : int
+        Number of characters read from the file at once
+
+    Returns
+    -------
+    generator
+        Features of the collection, each a dict
+    """
+    decoder = json.JSONDecoder()
+
+    with io.open(path, encoding='utf-8-sig') as source:
+        buffer = u''
+        while True:
+            match = FEATURES.search(buffer)
+            if match:
+                buffer = buffer[match.end():]
+                break
+
+            chunk = source.read(chunk_size)
+            if not chunk:
+                raise CommandError('The file is not a FeatureCollection.')
+            buffer += chunk
+
+        while True:
+            buffer = buffer.lstrip(u' \t\r\n,')
+
+            if buffer.startswith(u']'):
+                return
+
+            try:
+                feature, end = decoder.raw_decode(buffer)
+            except ValueError:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    raise CommandError('The file is not valid GeoJSON.')
+                buffer += chunk
+                continue
+
+            buffer = buffer[end:]
+            yield feature
+
+
+def read_csv(path, geometry=None, longitude=None, latitude=None,
+             delimiter=','):
+    """
+    Reads the rows of a CSV file one by one and returns them as features. The
+    geometry is read from one column as WKT or GeoJSON, or from two columns
+    holding longitude and latitude.
+
+    Parameters
+    ----------
+    path : str
+        Path to the CSV file
+    geometry : str
+        Name of the column with the geometry
+    longitude : str
+        Name of the column with the longitude
+    latitude : str
+        Name of the column with the latitude
+    delimiter : str
+        Character separating the columns
+
+    Returns
+    -------
+    generator
+        Rows of the file, each a dict with `geometry` and `properties`
+    """
+    with open(path, 'rb') as source:
+        reader = csv.reader(source, delimiter=str(delimiter))
+
+        try:
+            header = [column.decode('utf-8-sig') for column in next(reader)]
+        except StopIteration:
+            return
+
+        for row in reader:
+            properties = dict(zip(
+                header, [value.decode('utf-8') for value in row]))
+
+            if geometry:
+                feature_geometry = properties.pop(geometry, None)
+            else:
+                feature_geometry = {
+                    'type': 'Point',
+                    'coordinates': [
+                        properties.pop(longitude, None),
+                        properties.pop(latitude, None)
+                    ]
+                }
+
+            yield {'geometry': feature_geometry, 'properties': properties}
+
+
+def get_geometry(geometry):
+    """
+    Returns the geometry of a feature, read from a GeoJSON object or a WKT
+    or GeoJSON string.
+
+    Parameters
+    ----------
+    geometry : dict or str
+        Geometry of the feature
+
+    Returns
+    -------
+    django.contrib.gis.geos.GEOSGeometry
+        The geometry
+
+    Raises
+    ------
+    ValueError
+        If the geometry is invalid or missing
+    """
+    if isinstance(geometry, dict) and geometry.get('type') == 'Point':
+        try:
+            return Point(*[float(c) for c in geometry.get('coordinates')])
+        except (TypeError, ValueError):
+            raise ValueError('The coordinates are invalid or missing.')
+
+    if isinstance(geometry, dict):
+        geometry = json.dumps(geometry)
+
+    try:
+        return GEOSGeometry(geometry)
+    except Exception:
+        raise ValueError('The geometry is invalid or missing.')
+
+
+def get_lookups(field):
+    """
+    Returns the IDs of the lookup values of a field by their lower-cased
+    names, so that values given by name can be converted.
+
+    Parameters
+    ----------
+    field : geokey.categories.models.Field
+        Field the lookup values are read for
+
+    Returns
+    -------
+    dict
+        IDs of the lookup values by name; empty for other fields
+    """
+    if not isinstance(field, (LookupField, MultipleLookupField)):
+        return {}
+
+    return dict(
+        (lookupvalue.name.lower(), lookupvalue.id)
+        for lookupvalue in field.lookupvalues.all()
+    )
+
+
+def convert_value(field, value, lookups=None):
+    """
+    Converts a value read from a file to the value stored for the field.
+    Numbers are read from strings, and lookup values can be given by name
+    instead of ID; multiple lookup values are separated by semicolons.
+    Values that can not be converted are returned as they are, so that the
+    validation of the field reports them.
+
+    Parameters
+    ----------
+    field : geokey.categories.models.Field
+        Field the value is set for
+    value
+        Value read from the file
+    lookups : dict
+        IDs of the lookup values by name, as returned by `get_lookups`;
+        read from the database if not given
+
+    Returns
+    -------
+    Value of the field
+    """
+    if not isinstance(value, basestring):
+        return value
+
+    value = value.strip()
+    if len(value) == 0:
+        return None
+
+    if isinstance(field, NumericField):
+        try:
+            return float(value) if '.' in value else int(value)
+        except ValueError:
+            return value
+
+    if isinstance(field, (LookupField, MultipleLookupField)):
+        if lookups is None:
+            lookups = get_lookups(field)
+
+        def get_id(name):
+            name = name.strip()
+            if name.isdigit():
+                return int(name)
+            return lookups.get(name.lower(), name)
+
+        if isinstance(field, LookupField):
+            return get_id(value)
+
+        if value.startswith('['):
+            try:
+                return json.loads(value)
+            except ValueError:
+                return value
+
+        return [get_id(name) for name in value.split(';') if name.strip()]
+
+    return value
+
+
+class Command(BaseCommand):
+    """
+    A command to import contributions of one category from a GeoJSON or CSV
+    file. Contributions are validated and created in batches; the progress is
+    stored after each batch, so that an interrupted import can be resumed.
+    """
+
+    help = 'Imports contributions from a GeoJSON or CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_id', type=int)
+        parser.add_argument('category_id', type=int)
+        parser.add_argument('path')
+        parser.add_argument(
+            '--user',
+            help='Email address of the user who creates the contributions.')
+        parser.add_argument(
+            '--format', choices=['geojson', 'csv'],
+            help='Format of the file, guessed from the extension by default.')
+        parser.add_argument(
+            '--map', action='append', metavar='COLUMN=KEY',
+            help='Maps a column or property to the key of a field.')
+        parser.add_argument(
+            '--status', choices=['active', 'pending', 'review'],
+            help='Status of the contributions, the default status of the '
+                 'category by default.')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of contributions created at once.')
+        parser.add_argument(
+            '--geometry',
+            help='CSV column with the geometry as WKT or GeoJSON.')
+        parser.add_argument(
+            '--longitude', default='longitude',
+            help='CSV column with the longitude.')
+        parser.add_argument(
+            '--latitude', default='latitude',
+            help='CSV column with the latitude.')
+        parser.add_argument(
+            '--delimiter', default=',',
+            help='Character separating the CSV columns.')
+        parser.add_argument(
+            '--state',
+            help='File the progress is stored in, the path of the imported '
+                 'file with `.import` appended by default.')
+        parser.add_argument(
+            '--resume', action='store_true', default=False,
+            help='Resumes an import that has been interrupted.')
+
+    def get_mapping(self, options):
+        """Returns the keys of the fields by column or property name."""
+        mapping = {}
+
+        for rule in options.get('map') or []:
+            try:
+                column, key = rule.split('=', 1)
+            except ValueError:
+                raise CommandError('Use COLUMN=KEY to map a column.')
+            mapping[force_text(column)] = force_text(key)
+
+        return mapping
+
+    def get_fields(self, category):
+        """Returns the active fields of the category by key."""
+        return get_schema(category.id).fields_by_key
+
+    def get_lookups(self, fields):
+        """Returns the IDs of the lookup values of each field by name."""
+        return dict((key, get_lookups(field)) for key, field in fields.items())
+
+    def get_features(self, path, options):
+        """Returns the features of the file, read one by one."""
+        file_format = options.get('format')
+
+        if file_format is None:
+            extension = os.path.splitext(path)[1].lower()
+            file_format = 'csv' if extension == '.csv' else 'geojson'
+
+        if file_format == 'csv':
+            return read_csv(
+                path,
+                geometry=options.get('geometry'),
+                longitude=options.get('longitude'),
+                latitude=options.get('latitude'),
+                delimiter=options.get('delimiter')
+            )
+
+        return read_geojson(path)
+
+    def read_state(self, path):
+        """Returns the stored progress of an import, if there is any."""
+        if not os.path.exists(path):
+            return None
+
+        with open(path) as state:
+            return json.load(state)
+
+    def write_state(self, path, state):
+        """Stores the progress of an import; replaces the previous one."""
+        temporary = '%s.tmp' % path
+
+        with open(temporary, 'w') as output:
+            json.dump(state, output)
+
+        os.rename(temporary, path)
+
+    def build(self, feature, category, fields, lookups, mapping, status,
+              user):
+        """
+        Returns a new contribution from a feature, validated against the
+        fields of the category.
+
+        Raises
+        ------
+        ValidationError
+            If the feature is invalid
+        """
+        properties = {}
+
+        for name, value in (feature.get('properties') or {}).iteritems():
+            key = mapping.get(name, name)
+            if key in fields:
+                properties[key] = convert_value(
+                    fields[key], value, lookups[key])
+
+        try:
+            geometry = get_geometry(feature.get('geometry'))
+        except ValueError, error:
+            raise ValidationError(unicode(error))
+
+        Observation.validate_full(category, properties, fields=fields.values())
+
+        return Observation(
+            location=Location(geometry=geometry, creator=user),
+            project=category.project,
+            category=category,
+            properties=properties,
+            status=status
+        )
+
+    def handle(self, *args, **options):
+        try:
+            project = Project.objects.get(pk=options.get('project_id'))
+            category = Category.objects.select_related(
+                'project', 'display_field', 'expiry_field'
+            ).get(pk=options.get('category_id'), project=project)
+        except (Project.DoesNotExist, Category.DoesNotExist):
+            raise CommandError('The project or category does not exist.')
+
+        if not options.get('user'):
+            raise CommandError('Set the user who creates the contributions.')
+
+        try:
+            user = User.objects.get(email=options.get('user'))
+        except User.DoesNotExist:
+            raise CommandError('The user does not exist.')
+
+        path = os.path.abspath(options.get('path'))
+        if not os.path.isfile(path):
+            raise CommandError('The file %s does not exist.' % path)
+
+        batch_size = options.get('batch_size')
+        if batch_size < 1:
+            raise CommandError('The batch size must be at least 1.')
+
+        state_path = options.get('state') or '%s.import' % path
+        state = self.read_state(state_path)
+
+        if state is not None and not options.get('resume'):
+            raise CommandError(
+                'An import of this file has been interrupted. Use --resume '
+                'to continue it or remove %s to start again.' % state_path)
+
+        if state is not None and (
+                state.get('project') != project.id or
+                state.get('category') != category.id):
+            raise CommandError(
+                'The interrupted import used a different project or '
+                'category.')
+
+        if state is None:
+            state = {
+                'project': project.id,
+                'category': category.id,
+                'position': 0,
+                'created': 0,
+                'invalid': 0
+            }
+
+        fields = self.get_fields(category)
+        lookups = self.get_lookups(fields)
+        mapping = self.get_mapping(options)
+        status = options.get('status') or category.default_status
+        start = state['position']
+
+        if start:
+            self.stdout.write('Resuming at feature %s.' % start)
+
+        position = start
+        batch = []
+        for index, feature in enumerate(self.get_features(path, options)):
+            if index < start:
+                continue
+
+            try:
+                batch.append(self.build(
+                    feature, category, fields, lookups, mapping, status,
+                    user))
+            except ValidationError, error:
+                state['invalid'] += 1
+                self.stderr.write('Feature %s is invalid: %s' % (
+                    index, ' '.join(unicode(m) for m in error.messages)))
+
+            position = index + 1
+            if position - state['position'] >= batch_size:
+                self.save(batch, user, state, position, state_path)
+                batch = []
+
+        if position > state['position']:
+            self.save(batch, user, state, position, state_path)
+
+        if os.path.exists(state_path):
+            os.remove(state_path)
+
+        self.stdout.write(
+            'Imported %s contributions, %s features were invalid.' %
+            (state['created'], state['invalid'])
+        )
+
+    def save(self, batch, user, state, position, state_path):
+        """
+        Creates a batch of contributions and stores the progress in the
+        same transaction, so that the batch is rolled back if the progress
+        can not be stored and a resumed import does not create it again.
+        """
+        with transaction.atomic():
+            Observation.create_many(batch, user)
+
+            state['created'] += len(batch)
+            state['position'] = position
+            self.write_state(state_path, state)
+
+        self.stdout.write('Processed %s features: %s created, %s invalid.' % (
+            state['position'], state['created'], state['invalid']))
@@ -0,0 +1,58 @@
+"""Command `transcode_media`."""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from geokey.contributions.base import MEDIA_STATUS
+from geokey.contributions.models import AudioFile
+from geokey.contributions.transcoding import get_concurrency, transcode
+
+
+class Command(BaseCommand):
+    """
+    A worker that converts uploaded 3gpp/3gpp2 audio files to mp3. Uploads
+    are stored with status `processing`; the worker converts them, up to
+    `AUDIO_TRANSCODING_CONCURRENCY` files at the same time, and activates
+    them. Only one worker should be run.
+    """
+
+    help = 'Converts uploaded audio files that are being processed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int,
+            help='Number of files converted at the same time, '
+                 'AUDIO_TRANSCODING_CONCURRENCY by default.')
+        parser.add_argument(
+            '--batch-size', type=int, default=10,
+            help='Number of files taken from the queue at once.')
+        parser.add_argument(
+            '--poll-interval', type=int, default=10,
+            help='Seconds to wait when no files are being processed.')
+        parser.add_argument(
+            '--once', action='store_true', default=False,
+            help='Stop when no files are left to be processed.')
+
+    def handle(self, *args, **options):
+        concurrency = options.get('concurrency') or get_concurrency()
+        batch_size = options.get('batch_size')
+
+        if concurrency < 1 or batch_size < 1:
+            raise CommandError(
+                'The concurrency and the batch size must be positive.')
+
+        processed = 0
+
+        while True:
+            audio_files = AudioFile.objects.filter(
+                status=MEDIA_STATUS.processing).order_by('id')[:batch_size]
+            count = transcode(audio_files, concurrency)
+            processed += count
+
+            if not count:
+                if options.get('once'):
+                    break
+                time.sleep(options.get('poll_interval'))
+
+        self.stdout.write('Transcoded %s audio files.' % processed)
@@ -7,6 +7,7 @@ from pytz import utc
 from datetime import datetime
 
 from django.contrib.gis.db import models
+from django.db import connection
 from django.db.models import Q
 from django.core.exceptions import PermissionDenied
 from django.conf import settings
@@ -22,6 +23,11 @@ from .base import (
     ACCEPTED_AUDIO_FORMATS, ACCEPTED_VIDEO_FORMATS, MEDIA_STATUS
 )
 
+from .tiles import (
+    TILE_EXTENT, TILE_BUFFER, DEFAULT_CLUSTER_COUNT, get_tile_bbox,
+    get_tile_envelope, get_cluster_grid_size
+)
+from .transcoding import has_video_stream
 from .utils import (
     get_args,
     get_authenticated_service,
@@ -54,6 +60,94 @@ class LocationQuerySet(models.query.QuerySet):
             Q(private_for_project=project)
         )
 
+    def search(self, query):
+        """
+        Returns all locations where name or description contain the query,
+        ignoring the case. The lookups are backed by trigram indexes on the
+        upper-cased name and description.
+
+        Parameters
+        ----------
+        query : str
+            Query that needs to be matched
+
+        Return
+        ------
+        django.db.models.Queryset
+            Locations matching the query
+        """
+        return self.filter(
+            Q(name__icontains=query) | Q(description__icontains=query)
+        )
+
+    def search_ranked(self, query):
+        """
+        Returns all locations where name or description contain the query or
+        are similar to it, ordered by trigram similarity (most similar first).
+
+        Parameters
+        ----------
+        query : str
+            Query that needs to be matched
+
+        Return
+        ------
+        django.db.models.Queryset
+            Locations matching the query, ranked by similarity
+        """
+        pattern = '%%%s%%' % re.sub(r'([\\%_])', r'\\\1', query)
+
+        name = 'UPPER("contributions_location"."name"::text)'
+        description = 'UPPER("contributions_location"."description"::text)'
+
+        return self.extra(
+            select={
+                'similarity': 'GREATEST('
+                'similarity(%s, UPPER(%%s)), '
+                'similarity(%s, UPPER(%%s)))' % (name, description)
+            },
+            select_params=[query, query],
+            where=[
+                '(%s LIKE UPPER(%%s) OR %s LIKE UPPER(%%s) OR '
+                '%s %%%% UPPER(%%s) OR %s %%%% UPPER(%%s))' % (
+                    name, description, name, description)
+            ],
+            params=[pattern, pattern, query, query],
+            order_by=['-similarity', 'id']
+        )
+
+    def get_by_bbox(self, xmin, ymin, xmax, ymax):
+        """
+        Returns all locations which bounding box overlaps the passed bbox.
+
+        The geometry is cast to a planar geometry, so the filter is answered
+        by the GiST index `contributions_location_geometry_gist` and the bbox
+        is treated as a rectangle in WGS84 coordinates.
+
+        Parameters
+        ----------
+        xmin : float
+            Minimum longitude
+        ymin : float
+            Minimum latitude
+        xmax : float
+            Maximum longitude
+        ymax : float
+            Maximum latitude
+
+        Return
+        ------
+        django.db.models.Queryset
+            List of locations inside the bbox
+        """
+        return self.extra(
+            where=[
+                '(geometry::geometry) && '
+                'ST_MakeEnvelope(%s, %s, %s, %s, 4326)'
+            ],
+            params=[xmin, ymin, xmax, ymax]
+        )
+
 
 class LocationManager(models.GeoManager):
     """
@@ -184,7 +278,10 @@ class ObservationQuerySet(models.query.QuerySet):
     def search(self, query):
         """
         Returns a subset of the queryset containing observations where one of
-        the properties matches the given query.
+        the properties matches the given query. Uses the full-text index on
+        `search_vector`, which is maintained from `search_index` by a database
+        trigger. Each term of the query matches words starting with the term,
+        results are ranked by how well they match.
 
         Parameters
         ----------
@@ -201,13 +298,22 @@ class ObservationQuerySet(models.query.QuerySet):
             terms = cleaned.lower().split()
 
             if terms:
-                queries = []
-                for term in terms:
-                    term = '%%' + term + '%%'
-                    q = "(search_index LIKE '%s')" % term
-                    queries.append(q)
-
-                return self.extra(where=[' OR '.join(queries)])
+                tsquery = ' | '.join(term + ':*' for term in terms)
+
+                return self.extra(
+                    select={
+                        'search_rank': 'ts_rank('
+                        '"contributions_observation"."search_vector", '
+                        'to_tsquery(\'simple\', %s))'
+                    },
+                    select_params=[tsquery],
+                    where=[
+                        '"contributions_observation"."search_vector" @@ '
+                        'to_tsquery(\'simple\', %s)'
+                    ],
+                    params=[tsquery],
+                    order_by=['-search_rank', '-updated_at', 'id']
+                )
 
         return self
 
@@ -229,17 +335,191 @@ class ObservationQuerySet(models.query.QuerySet):
 
         if bbox:
             try:
-                # created bbox to Polygon
-                from django.contrib.gis.geos import Polygon
-                bbox = bbox.split(',') # Split by ','
-                geom_bbox = Polygon.from_bbox(bbox)
-                # Filtering observations where
-                return self.filter(location__geometry__bboverlaps=geom_bbox)
+                xmin, ymin, xmax, ymax = [
+                    float(coordinate) for coordinate in bbox.split(',')
+                ]
             except Exception as e:
                 raise InputError(str(e) + '. Please, check the coordinates'
                     ' you attached to bbox parameters, they should follow'
                     'the OSGeo standards (e.g:bbox=xmin,ymin,xmax,ymax).')
 
+            # The locations are selected in a subquery, so that PostgreSQL
+            # uses the spatial index before joining them to observations
+            from geokey.contributions.models import Location
+            locations = Location.objects.get_queryset().get_by_bbox(
+                xmin, ymin, xmax, ymax)
+            return self.filter(location__in=locations.values('id'))
+
+    def changed_since(self, since):
+        """
+        Returns a subset of the queryset containing observations that have
+        been created, updated or deleted after the given date and time,
+        ordered by the time of the change.
+
+        Parameters
+        ----------
+        since : datetime.datetime
+            Date and time of the last sync
+
+        Return
+        ------
+        django.db.models.Queryset
+            List of observations changed since the date and time
+        """
+        return self.filter(updated_at__gt=since).order_by('updated_at', 'id')
+
+    def get_id_query(self):
+        """
+        Returns the SQL selecting the IDs of all observations in the
+        queryset, to be used as subquery in raw SQL.
+
+        Return
+        ------
+        tuple
+            SQL and its parameters
+        """
+        return self.order_by().values_list(
+            'id', flat=True).query.sql_with_params()
+
+    def get_clusters(self, zoom, method='grid', k=None):
+        """
+        Groups the locations of all observations in the queryset into
+        clusters. `grid` clusters points snapped to a grid that gets finer
+        with each zoom level, `kmeans` builds `k` clusters using k-means.
+
+        Parameters
+        ----------
+        zoom : int
+            Zoom level the clusters are shown on
+        method : str
+            `grid` or `kmeans`
+        k : int
+            Number of clusters for `kmeans`, at most one per observation
+
+        Return
+        ------
+        list
+            Clusters as dicts with `count` and `centroid` (GeoJSON string)
+        """
+        ids_sql, ids_params = self.get_id_query()
+
+        if method == 'kmeans':
+            # PostGIS fails when asked for more clusters than there are
+            # points, so `k` is limited to the number of points
+            sql = (
+                'SELECT COUNT(*), ST_AsGeoJSON(ST_Centroid(ST_Collect(point))) '
+                'FROM ('
+                'SELECT point, '
+                'ST_ClusterKMeans(point, LEAST(%s, total)::integer) '
+                'OVER () AS cluster '
+                'FROM ('
+                'SELECT ST_Centroid(l.geometry::geometry) AS point, '
+                'COUNT(*) OVER () AS total '
+                'FROM contributions_observation o '
+                'JOIN contributions_location l ON l.id = o.location_id '
+                'WHERE o.id IN (' + ids_sql + ')'
+                ') AS counted'
+                ') AS points '
+                'GROUP BY cluster'
+            )
+            params = [k or DEFAULT_CLUSTER_COUNT] + list(ids_params)
+        else:
+            sql = (
+                'SELECT COUNT(*), ST_AsGeoJSON(ST_Centroid(ST_Collect(point))) '
+                'FROM ('
+                'SELECT ST_Centroid(l.geometry::geometry) AS point '
+                'FROM contributions_observation o '
+                'JOIN contributions_location l ON l.id = o.location_id '
+                'WHERE o.id IN (' + ids_sql + ')'
+                ') AS points '
+                'GROUP BY ST_SnapToGrid(point, %s)'
+            )
+            params = list(ids_params) + [get_cluster_grid_size(zoom)]
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+        return [{'count': row[0], 'centroid': row[1]} for row in rows]
+
+    def get_vector_tile(self, zoom, x, y):
+        """
+        Returns a Mapbox Vector Tile containing the locations of all
+        observations in the queryset that are visible on the tile. Each
+        feature carries the observation's ID, category and status. Requires
+        PostGIS 2.4 or later.
+
+        Parameters
+        ----------
+        zoom : int
+            Zoom level of the tile
+        x : int
+            Column of the tile
+        y : int
+            Row of the tile
+
+        Return
+        ------
+        str
+            The encoded vector tile
+        """
+        observations = self.get_by_bbox(get_tile_bbox(zoom, x, y))
+        ids_sql, ids_params = observations.get_id_query()
+
+        sql = (
+            'SELECT ST_AsMVT(tile, \'contributions\', %s, \'geom\') '
+            'FROM ('
+            'SELECT o.id, o.category_id AS category, o.status, '
+            'ST_AsMVTGeom('
+            'ST_Transform(l.geometry::geometry, 3857), '
+            'ST_MakeEnvelope(%s, %s, %s, %s, 3857), %s, %s, true'
+            ') AS geom '
+            'FROM contributions_observation o '
+            'JOIN contributions_location l ON l.id = o.location_id '
+            'WHERE o.id IN (' + ids_sql + ')'
+            ') AS tile '
+            'WHERE tile.geom IS NOT NULL'
+        )
+        params = (
+            [TILE_EXTENT] +
+            list(get_tile_envelope(zoom, x, y)) +
+            [TILE_EXTENT, TILE_BUFFER] +
+            list(ids_params)
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            tile = cursor.fetchone()[0]
+
+        return bytes(tile) if tile is not None else ''
+
+    def iterate_in_chunks(self, chunk_size=500):
+        """
+        Iterates over the queryset in chunks. Only the IDs of all matching
+        observations are loaded first, the observations themselves are then
+        fetched from the database `chunk_size` at a time, keeping the order of
+        the queryset.
+
+        Parameters
+        ----------
+        chunk_size : int
+            Number of observations fetched with each query
+
+        Return
+        ------
+        generator
+            Yields geokey.contributions.models.Observation instances
+        """
+        # Extra selects (e.g. the search rank) must stay selected, the
+        # queryset might be ordered by them
+        fields = ['id'] + list(self.query.extra_select)
+        ids = [row[0] for row in self.values_list(*fields)]
+
+        for start in range(0, len(ids), chunk_size):
+            chunk = self.filter(pk__in=ids[start:start + chunk_size])
+            for observation in chunk.iterator():
+                yield observation
+
 
 class ObservationManager(models.Manager):
     """
@@ -254,10 +534,22 @@ class ObservationManager(models.Manager):
         django.db.models.Queryset
             All observations excluding deleted
         """
-        return ObservationQuerySet(self.model).prefetch_related(
-            'location', 'category', 'creator', 'updator').exclude(
+        return self.including_deleted().exclude(
             status=OBSERVATION_STATUS.deleted)
 
+    def including_deleted(self):
+        """
+        Returns all observations including those with status `deleted`. Used
+        to provide tombstones of deleted observations when syncing changes.
+
+        Return
+        ------
+        django.db.models.Queryset
+            All observations
+        """
+        return ObservationQuerySet(self.model).prefetch_related(
+            'location', 'category', 'creator', 'updator')
+
     def for_moderator(self, user):
         """
         Returns all observations for moderators; see
@@ -375,7 +667,7 @@ class MediaFileManager(InheritanceManager):
         )
 
     def _create_audio_file(self, name, description, creator, contribution,
-                           the_file):
+                           the_file, status=MEDIA_STATUS.active):
         """
         Creates an AudioFile and returns the instance.
 
@@ -391,6 +683,8 @@ class MediaFileManager(InheritanceManager):
             Observation the file is assigned to
         the_file : django.core.files.File
             The actual file
+        status : str
+            Status of the file, `processing` if it is converted later
 
         Return
         ------
@@ -408,7 +702,8 @@ class MediaFileManager(InheritanceManager):
             description=description,
             creator=creator,
             contribution=contribution,
-            audio=the_file
+            audio=the_file,
+            status=status
         )
 
     def _upload_to_youtube(self, name, path):
@@ -494,7 +789,8 @@ class MediaFileManager(InheritanceManager):
         Create a new file. Evaluates the file's content type and creates either
         an ImageFile, AudioFile or VideoFile.
 
-        3gpp/3gpp2 audio files are converted to mp3 by default using avconv.
+        3gpp/3gpp2 audio files are stored with status `processing` and
+        converted to mp3 in the background by the `transcode_media` command.
 
         Parameters
         ----------
@@ -519,14 +815,11 @@ class MediaFileManager(InheritanceManager):
         contribution = kwargs.get('contribution')
 
         content_type = the_file.content_type.split('/')
-        converted_file = None
+        status = MEDIA_STATUS.active
 
-        # Using avconv to scan and convert 3gpp/3gpp2 audio files to mp3
+        # Using avconv to scan 3gpp/3gpp2 files; audio files are stored as
+        # processing and converted to mp3 by `transcode_media`
         if content_type[1] in ['3gpp', '3gpp2']:
-            import time
-            import shlex
-            import subprocess
-            from django.core.files import File
             from django.core.files.storage import default_storage
             from django.core.files.base import ContentFile
 
@@ -539,47 +832,12 @@ class MediaFileManager(InheritanceManager):
             )
             tmp_file = os.path.join(settings.MEDIA_ROOT, path)
 
-            cmd = shlex.split('avconv -i %s' % tmp_file)
-            pipe = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
-            output, error = pipe.communicate()
-
-            video_stream = re.compile(
-                r"Stream #\d*\.\d*.*\:\s*Video",
-                re.MULTILINE
-            )
-
-            # Using error because output file is not specified
-            if not video_stream.search(error):
+            if not has_video_stream(tmp_file):
                 content_type[0] = 'audio'
-
-                converted_file = os.path.join(
-                    settings.MEDIA_ROOT,
-                    'tmp',
-                    '%s_%s.mp3' % (filename, int(time.time()))
-                )
-
-                cmd = shlex.split(
-                    'avconv -nostats -loglevel 0 -y -i %s -c:a libmp3lame -q:a 4 -ar 44100 %s' % (
-                        tmp_file,
-                        converted_file
-                    )
-                )
-                pipe = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
-                )
-                output, error = pipe.communicate()
-
-                if not error:
-                    the_file = File(open(converted_file, 'rb'))
-                    the_file.name = '%s.mp3' % filename
+                status = MEDIA_STATUS.processing
 
             os.remove(tmp_file)
+            the_file.seek(0)
 
         if (content_type[0] == 'image' and
                 content_type[1] in ACCEPTED_IMAGE_FORMATS):
@@ -592,18 +850,14 @@ class MediaFileManager(InheritanceManager):
             )
         elif (content_type[0] == 'audio' and
                 content_type[1] in ACCEPTED_AUDIO_FORMATS):
-            audio_file = self._create_audio_file(
+            return self._create_audio_file(
                 name,
                 description,
                 creator,
                 contribution,
-                the_file
+                the_file,
+                status=status
             )
-
-            if converted_file is not None and os.path.isfile(converted_file):
-                os.remove(converted_file)
-
-            return audio_file
         elif (content_type[0] == 'video' and
                 settings.ENABLE_VIDEO and
                 content_type[1] in ACCEPTED_VIDEO_FORMATS):
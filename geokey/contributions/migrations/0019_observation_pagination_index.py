@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0018_historicalcomment'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX contributions_observation_project_updated_id '
+            'ON contributions_observation (project_id, updated_at DESC, id);',
+            'DROP INDEX IF EXISTS contributions_observation_project_updated_id;'
+        ),
+    ]
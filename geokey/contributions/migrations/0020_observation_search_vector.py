@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0019_observation_pagination_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [
+                'ALTER TABLE contributions_observation '
+                'ADD COLUMN search_vector tsvector;',
+
+                'CREATE FUNCTION contributions_observation_search_vector() '
+                'RETURNS trigger AS $$ '
+                'BEGIN '
+                'NEW.search_vector := to_tsvector('
+                '\'simple\', replace(coalesce(NEW.search_index, \'\'), '
+                '\',\', \' \')); '
+                'RETURN NEW; '
+                'END '
+                '$$ LANGUAGE plpgsql;',
+
+                'CREATE TRIGGER contributions_observation_search_vector '
+                'BEFORE INSERT OR UPDATE OF search_index '
+                'ON contributions_observation FOR EACH ROW '
+                'EXECUTE PROCEDURE contributions_observation_search_vector();',
+
+                'UPDATE contributions_observation SET search_vector = '
+                'to_tsvector(\'simple\', '
+                'replace(coalesce(search_index, \'\'), \',\', \' \'));',
+
+                'CREATE INDEX contributions_observation_search_vector '
+                'ON contributions_observation USING GIN (search_vector);',
+            ],
+            [
+                'DROP INDEX IF EXISTS contributions_observation_search_vector;',
+
+                'DROP TRIGGER IF EXISTS contributions_observation_search_vector '
+                'ON contributions_observation;',
+
+                'DROP FUNCTION IF EXISTS '
+                'contributions_observation_search_vector();',
+
+                'ALTER TABLE contributions_observation '
+                'DROP COLUMN IF EXISTS search_vector;',
+            ]
+        ),
+    ]
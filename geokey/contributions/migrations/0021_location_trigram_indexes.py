@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0020_observation_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [
+                'CREATE EXTENSION IF NOT EXISTS pg_trgm;',
+
+                'CREATE INDEX contributions_location_name_trgm '
+                'ON contributions_location '
+                'USING GIN (UPPER(name::text) gin_trgm_ops);',
+
+                'CREATE INDEX contributions_location_description_trgm '
+                'ON contributions_location '
+                'USING GIN (UPPER(description::text) gin_trgm_ops);',
+            ],
+            [
+                'DROP INDEX IF EXISTS contributions_location_name_trgm;',
+
+                'DROP INDEX IF EXISTS contributions_location_description_trgm;',
+            ]
+        ),
+    ]
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0021_location_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [
+                'CREATE INDEX contributions_location_geometry_gist '
+                'ON contributions_location '
+                'USING GIST ((geometry::geometry));',
+
+                'CREATE INDEX contributions_observation_location_id_project '
+                'ON contributions_observation (location_id, project_id);',
+
+                'ANALYZE contributions_location;',
+            ],
+            [
+                'DROP INDEX IF EXISTS contributions_location_geometry_gist;',
+
+                'DROP INDEX IF EXISTS '
+                'contributions_observation_location_id_project;',
+            ]
+        ),
+    ]
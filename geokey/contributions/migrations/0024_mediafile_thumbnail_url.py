@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0023_historicalobservation_history_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediafile',
+            name='thumbnail_url',
+            field=models.CharField(max_length=255, null=True, blank=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contributions', '0024_mediafile_thumbnail_url'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mediafile',
+            name='status',
+            field=models.CharField(default=b'active', max_length=20, choices=[(b'active', b'active'), (b'processing', b'processing'), (b'deleted', b'deleted')]),
+        ),
+    ]
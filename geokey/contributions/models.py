@@ -1,23 +1,27 @@
 """Models for contributions."""
 
-import re
-
 from pytz import utc
 from datetime import datetime
 from iso8601 import parse_date
 from iso8601.iso8601 import ParseError
 
-from django.db import models
+from django.db import models, connection, transaction
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.dispatch import receiver
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import (
+    pre_save, post_save, post_delete, post_init
+)
 from django.contrib.gis.db import models as gis
 
 from django_pgjson.fields import JsonBField
 from simple_history.models import HistoricalRecords
 
+from geokey.core.history import CompactHistoricalRecords
+
 from geokey.core.exceptions import InputError
+from geokey.categories.schemas import get_schema
+from geokey.projects.statistics import update_statistics
 
 from .base import (
     OBSERVATION_STATUS,
@@ -34,6 +38,83 @@ from .managers import (
 )
 
 
+# Values of an observation that are counted in the project statistics
+COUNTED_FIELDS = (
+    'project_id', 'category_id', 'status', 'num_comments', 'num_media'
+)
+
+
+def reserve_ids(model, count):
+    """
+    Reserves primary keys for new instances of the model from its database
+    sequence, so that instances created with `bulk_create` have known IDs.
+
+    Parameter
+    ---------
+    model : django.db.models.Model
+        Model the instances are created for
+    count : int
+        Number of IDs to reserve
+
+    Return
+    ------
+    list
+        Reserved IDs
+    """
+    if count == 0:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+            'FROM generate_series(1, %s)',
+            [model._meta.db_table, model._meta.pk.column, count]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def update_contribution_count(observation_id, comments=0, media=0):
+    """
+    Adds to the numbers of comments and media files of the observation, or
+    subtracts negative numbers. Only `num_comments` and `num_media` are
+    incremented in the database, the observation is not saved. The project
+    statistics are updated by the same numbers.
+
+    Parameter
+    ---------
+    observation_id : int
+        Identifies the observation in the database
+    comments : int
+        Number of comments added
+    media : int
+        Number of media files added
+
+    Return
+    ------
+    Boolean
+        Indicating whether the observation exists
+    """
+    if not (comments or media):
+        return True
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'UPDATE contributions_observation '
+            'SET num_comments = num_comments + %s, '
+            'num_media = num_media + %s '
+            'WHERE id = %s '
+            'RETURNING project_id, category_id, status',
+            [comments, media, observation_id]
+        )
+        row = cursor.fetchone()
+
+    if row is None:
+        return False
+
+    update_statistics(*row, comments=comments, media=media)
+    return True
+
+
 class Location(models.Model):
     """
     Represents a location to which an arbitrary number of observations can be
@@ -91,14 +172,15 @@ class Observation(models.Model):
     num_media = models.IntegerField(default=0)
     num_comments = models.IntegerField(default=0)
 
-    history = HistoricalRecords()
+    history = CompactHistoricalRecords(
+        compact_fields=['properties', 'search_index', 'display_field'])
     objects = ObservationManager()
 
     class Meta:
         ordering = ['-updated_at', 'id']
 
     @classmethod
-    def validate_partial(cls, category, data):
+    def validate_partial(cls, category, data, fields=None):
         """
         Validates the data against the category field definition. This is a
         partial validation, which is used to validate drafts, field values
@@ -110,6 +192,9 @@ class Observation(models.Model):
             Category that the data is validated against
         data : dict
             Dictionary of key-value-pairs; incoming data that is validated
+        fields : list
+            Active fields of the category, the fields of the compiled schema
+            of the category by default
 
         Raises
         ------
@@ -119,7 +204,10 @@ class Observation(models.Model):
         is_valid = True
         error_messages = []
 
-        for field in category.fields.all().filter(status='active'):
+        if fields is None:
+            fields = get_schema(category.id).fields
+
+        for field in fields:
             if field.key in data and data.get(field.key) is not None:
                 try:
                     field.validate_input(data.get(field.key))
@@ -131,7 +219,7 @@ class Observation(models.Model):
             raise ValidationError(error_messages)
 
     @classmethod
-    def validate_full(cls, category, data):
+    def validate_full(cls, category, data, fields=None):
         """
         Validates the data against the category field definition. This is a
         full validation.
@@ -142,6 +230,9 @@ class Observation(models.Model):
             Category that the data is validated against
         data : dict
             Dictionary of key-value-pairs; incoming data that is validated
+        fields : list
+            Active fields of the category, the fields of the compiled schema
+            of the category by default
 
         Raises
         ------
@@ -151,7 +242,10 @@ class Observation(models.Model):
         is_valid = True
         error_messages = []
 
-        for field in category.fields.all().filter(status='active'):
+        if fields is None:
+            fields = get_schema(category.id).fields
+
+        for field in fields:
             try:
                 field.validate_input(data.get(field.key))
             except InputError, error:
@@ -203,6 +297,114 @@ class Observation(models.Model):
         )
         return observation
 
+    @classmethod
+    def create_many(cls, observations, creator):
+        """
+        Creates many observations and their new locations at once, using
+        one INSERT per table. The observations must have been validated.
+
+        `bulk_create` does not send any signals, so the work done by the
+        receivers is done here: the display, expiry and search index fields
+        are computed, historical records and logs are created and the
+        project statistics are updated.
+
+        Parameter
+        ---------
+        observations : list
+            geokey.contributions.models.Observation instances (not saved yet),
+            each with a saved or unsaved location
+        creator : geokey.users.models.User
+            User who creates the observations
+
+        Return
+        ------
+        list
+            The observations created
+        """
+        from geokey.core.models import (
+            LoggerHistory, generate_log, add_extra_info
+        )
+        from geokey.core.base import STATUS_ACTION
+
+        locations = [o.location for o in observations if o.location.pk is None]
+        now = datetime.utcnow().replace(tzinfo=utc)
+
+        with transaction.atomic():
+            for location, pk in zip(
+                    locations, reserve_ids(Location, len(locations))):
+                location.pk = pk
+            Location.objects.bulk_create(locations)
+
+            for observation, pk in zip(
+                    observations, reserve_ids(cls, len(observations))):
+                observation.pk = pk
+                observation.location_id = observation.location.pk
+                observation.creator = creator
+                observation.update_display_field()
+                observation.update_expiry_field()
+                observation.create_search_index()
+            cls.objects.bulk_create(observations)
+
+            statistics = {}
+            for observation in observations:
+                counted = tuple(
+                    getattr(observation, name) for name in COUNTED_FIELDS)
+                observation._counted = counted
+
+                key = counted[:3]
+                count = statistics.setdefault(key, [0, 0, 0])
+                count[0] += 1
+                count[1] += counted[3]
+                count[2] += counted[4]
+
+            for key, count in statistics.items():
+                update_statistics(*key, contributions=count[0],
+                                  comments=count[1], media=count[2])
+
+            history_model = cls.history.model
+            history = []
+            for observation, pk in zip(
+                    observations,
+                    reserve_ids(history_model, len(observations))):
+                values = dict(
+                    (field.attname, getattr(observation, field.attname))
+                    for field in cls._meta.fields
+                )
+                history.append(history_model(
+                    history_id=pk,
+                    history_date=now,
+                    history_type='+',
+                    history_user=creator,
+                    **values
+                ))
+            history_model.objects.bulk_create(history)
+
+            logs = []
+            for location in locations:
+                logs.append(generate_log(Location, location, add_extra_info({
+                    'id': STATUS_ACTION.created,
+                    'class': 'Location'
+                }, location)))
+            for observation, historical in zip(observations, history):
+                # Drafts are not logged until they are submitted
+                if observation.status == 'draft':
+                    continue
+
+                log = generate_log(cls, observation, add_extra_info({
+                    'id': STATUS_ACTION.created,
+                    'class': 'Observation',
+                    'field': 'status',
+                    'value': observation.status
+                }, observation))
+                log.historical = {
+                    'id': str(historical.history_id),
+                    'class': history_model.__name__
+                }
+                logs.append(log)
+            LoggerHistory.objects.bulk_create(logs)
+
+        return observations
+
     def update(self, properties, updator, status=None):
         """
         Updates data of the observation
@@ -239,14 +441,14 @@ class Observation(models.Model):
         contributions category and adds a string line 'key:value' to the
         display field property
         """
-        display_field = self.category.display_field
+        display_field = get_schema(self.category_id).display_field
         value = None
 
         if display_field:
             if self.properties:
-                value = self.properties.get(display_field.key)
+                value = self.properties.get(display_field)
 
-            self.display_field = '%s:%s' % (display_field.key, value)
+            self.display_field = '%s:%s' % (display_field, value)
 
     def update_expiry_field(self):
         """
@@ -254,67 +456,84 @@ class Observation(models.Model):
         contributions category and sets the date according to the value set
         for the current contribution.
         """
-        expiry_field = self.category.expiry_field
+        expiry_field = get_schema(self.category_id).expiry_field
         value = None
 
         if expiry_field and self.properties:
             try:
-                value = parse_date(self.properties.get(expiry_field.key))
+                value = parse_date(self.properties.get(expiry_field))
             except ParseError:
                 pass
 
         self.expiry_field = value
 
-    def update_count(self):
+    def increment_count(self, comments=0, media=0):
         """
-        Updates the count of media files attached and comments. Should be
-        called each time a file or comment is added/deleted.
-        """
-        self.num_media = self.files_attached.count()
-        self.num_comments = self.comments.count()
-        self.save()
-
-    def create_search_index(self):
-        search_index = []
-
-        for field in self.category.fields.all():
-            value = None
-            if self.properties and field.key in self.properties.keys():
-                if field.fieldtype == 'TextField':
-                    value = self.properties.get(field.key)
-
-                if field.fieldtype == 'NumericField':
-                    value = str(self.properties.get(field.key))
+        Adds to the numbers of comments and media files of the observation,
+        or subtracts negative numbers. Called each time a file or comment is
+        added or deleted. The numbers are incremented in the database without
+        saving the observation, so the search index, logs and history are not
+        updated, and the numbers of the instance are updated to match.
 
-                if field.fieldtype == 'LookupField':
-                    lookup_id = self.properties.get(field.key)
-                    if lookup_id:
-                        value = field.lookupvalues.get(pk=lookup_id).name
-
-                if field.fieldtype == 'MultipleLookupField':
-                    lookup_id = self.properties.get(field.key)
-                    if lookup_id:
-                        lookupvalues = field.lookupvalues.filter(
-                            pk__in=lookup_id
-                        )
+        Parameter
+        ---------
+        comments : int
+            Number of comments added
+        media : int
+            Number of media files added
+        """
+        if not update_contribution_count(self.pk, comments, media):
+            return
 
-                        value = ' '.join([val.name for val in lookupvalues])
+        if 'num_comments' in self.__dict__:
+            self.num_comments += comments
+        if 'num_media' in self.__dict__:
+            self.num_media += media
 
-            if value:
-                cleaned = re.sub(r'[\W_]+', ' ', value)
-                terms = cleaned.lower().split()
+        counted = getattr(self, '_counted', None)
+        if counted is not None:
+            self._counted = counted[:3] + (
+                counted[3] + comments, counted[4] + media)
 
-                search_index = search_index + list(
-                    set(terms) - set(search_index)
-                )
+    def update_count(self):
+        """
+        Recounts media files attached and comments and corrects the numbers
+        of the observation. The numbers are maintained by `increment_count`,
+        this is only needed if they are out of date.
+        """
+        with transaction.atomic():
+            num_comments, num_media = Observation._base_manager.filter(
+                pk=self.pk).select_for_update().values_list(
+                'num_comments', 'num_media').get()
+
+            self.num_comments = num_comments
+            self.num_media = num_media
+            counted = getattr(self, '_counted', None)
+            if counted is not None:
+                self._counted = counted[:3] + (num_comments, num_media)
+
+            self.increment_count(
+                comments=self.comments.count() - num_comments,
+                media=self.files_attached.filter(
+                    status=MEDIA_STATUS.active).count() - num_media
+            )
 
-        self.search_index = ','.join(search_index)
+    def create_search_index(self):
+        """
+        Updates the search_index attribute with the words of all values of
+        the contribution, using the compiled schema of the category.
+        """
+        self.search_index = get_schema(self.category_id).get_search_index(
+            self.properties)
 
     def delete(self):
         """
-        Deletes the observation by setting it's status to DELETED
+        Deletes the observation by setting it's status to DELETED. Also
+        updates `updated_at`, so the deletion is picked up by clients syncing
+        changes.
         """
         self.status = OBSERVATION_STATUS.deleted
+        self.updated_at = datetime.utcnow().replace(tzinfo=utc)
         self.save()
 
 
@@ -322,7 +541,8 @@ class Observation(models.Model):
 def pre_save_observation_update(sender, **kwargs):
     """
     Receiver that is called before an observation is saved. Updates
-    `search_index`, `display_field`, `expiry_field` properties.
+    `search_index`, `display_field`, `expiry_field` properties from the
+    compiled schema of the category, without any query.
     """
     observation = kwargs.get('instance')
     observation.update_display_field()
@@ -330,6 +550,74 @@ def pre_save_observation_update(sender, **kwargs):
     observation.create_search_index()
 
 
+@receiver(post_init, sender=Observation)
+def post_init_observation_counted(sender, instance, **kwargs):
+    """
+    Receiver that is called when an observation is instantiated. Remembers
+    the values that are counted in the project statistics, so that changes
+    can be applied to the statistics after the observation is saved. Values
+    that are deferred are not loaded here.
+    """
+    if instance.pk is None:
+        instance._counted = None
+    elif all(name in instance.__dict__ for name in COUNTED_FIELDS):
+        instance._counted = tuple(
+            instance.__dict__[name] for name in COUNTED_FIELDS)
+
+
+@receiver(pre_save, sender=Observation)
+def pre_save_observation_counted(sender, instance, **kwargs):
+    """
+    Receiver that is called before an observation is saved. Loads the values
+    counted in the project statistics if they were deferred when the
+    observation was loaded.
+    """
+    if instance.pk is not None and not hasattr(instance, '_counted'):
+        instance._counted = Observation._base_manager.filter(
+            pk=instance.pk).values_list(
+            'project', 'category', 'status', 'num_comments', 'num_media'
+        ).first()
+
+
+@receiver(post_save, sender=Observation)
+def post_save_observation_statistics_update(sender, instance, created,
+                                            **kwargs):
+    """
+    Receiver that is called after an observation is saved. Moves the
+    observation between the project statistics, if its category or status
+    has changed, and applies changes of the numbers of comments and media
+    files.
+    """
+    counted = None if created else getattr(instance, '_counted', None)
+    current = tuple(getattr(instance, name) for name in COUNTED_FIELDS)
+
+    if counted == current:
+        return
+
+    if counted is not None and counted[:3] == current[:3]:
+        update_statistics(
+            *current[:3],
+            comments=current[3] - counted[3],
+            media=current[4] - counted[4]
+        )
+    else:
+        if counted is not None:
+            update_statistics(
+                *counted[:3],
+                contributions=-1,
+                comments=-counted[3],
+                media=-counted[4]
+            )
+        update_statistics(
+            *current[:3],
+            contributions=1,
+            comments=current[3],
+            media=current[4]
+        )
+
+    instance._counted = current
+
+
 class Comment(models.Model):
     """
     A comment that is added to a contribution.
@@ -364,21 +652,64 @@ class Comment(models.Model):
 
     def delete(self):
         """
-        Deletes the comment by setting it's status to DELETED
+        Deletes the comment by setting it's status to DELETED. Responses are
+        removed.
         """
         self.responses.all().delete()
-        self.status = COMMENT_STATUS.deleted
-        self.save()
+
+        if self.status != COMMENT_STATUS.deleted:
+            self.status = COMMENT_STATUS.deleted
+            self.save()
+            increment_attached_count(self, Comment.commentto, comments=-1)
+
+
+def increment_attached_count(instance, relation, comments=0, media=0):
+    """
+    Increments the numbers of comments and media files of the contribution
+    a comment or media file is attached to. If the contribution has been
+    loaded with the instance, its numbers are updated too; otherwise it is
+    not loaded.
+
+    Parameter
+    ---------
+    instance : geokey.contributions.models.Comment or MediaFile
+        Comment or media file that has been added or deleted
+    relation : ReverseSingleRelatedObjectDescriptor
+        Relation of the instance to the contribution, e.g. `Comment.commentto`
+    comments : int
+        Number of comments added
+    media : int
+        Number of media files added
+    """
+    if relation.is_cached(instance):
+        getattr(instance, relation.field.name).increment_count(
+            comments=comments, media=media)
+    else:
+        update_contribution_count(
+            getattr(instance, relation.field.attname), comments, media)
 
 
 @receiver(post_save, sender=Comment)
 def post_save_comment_count_update(sender, **kwargs):
     """
-    Receiver that is called after a comment is saved. Updates num_media and
-    num_comments properties.
+    Receiver that is called after a comment is saved. Increments num_comments
+    of the contribution when an active comment is created.
+    """
+    comment = kwargs.get('instance')
+    if kwargs.get('created') and comment.status == COMMENT_STATUS.active:
+        increment_attached_count(comment, Comment.commentto, comments=1)
+
+
+@receiver(post_delete, sender=Comment)
+def post_delete_comment_count_update(sender, **kwargs):
+    """
+    Receiver that is called after a comment is removed from the database,
+    e.g. a response to a deleted comment. Decrements num_comments of the
+    contribution if the comment was active.
     """
     comment = kwargs.get('instance')
-    comment.commentto.update_count()
+    if comment.status == COMMENT_STATUS.active:
+        increment_attached_count(comment, Comment.commentto, comments=-1)
 
 
 class MediaFile(models.Model):
@@ -398,6 +729,8 @@ class MediaFile(models.Model):
         default=MEDIA_STATUS.active,
         max_length=20
     )
+    thumbnail_url = models.CharField(max_length=255, null=True, blank=True)
+    thumbnail_attempts = models.PositiveSmallIntegerField(default=0)
 
     objects = MediaFileManager()
 
@@ -419,12 +752,28 @@ class MediaFile(models.Model):
             'subclass of `MediaFile`.'
         )
 
+    def activate(self):
+        """
+        Activates a file that has been processed, e.g. an audio file that has
+        been converted to mp3.
+        """
+        if self.status == MEDIA_STATUS.processing:
+            self.status = MEDIA_STATUS.active
+            self.save()
+            increment_attached_count(self, MediaFile.contribution, media=1)
+
     def delete(self):
         """
         Deletes a file by setting its status to deleted
         """
-        self.status = MEDIA_STATUS.deleted
-        self.save()
+        if self.status != MEDIA_STATUS.deleted:
+            active = self.status == MEDIA_STATUS.active
+            self.status = MEDIA_STATUS.deleted
+            self.save()
+
+            if active:
+                increment_attached_count(
+                    self, MediaFile.contribution, media=-1)
 
 
 class AudioFile(MediaFile):
@@ -502,9 +851,25 @@ class VideoFile(MediaFile):
 @receiver(post_save)
 def post_save_media_file_count_update(sender, **kwargs):
     """
-    Receiver that is called after a media file is saved. Updates num_media and
-    num_comments properties.
+    Receiver that is called after a media file is saved. Increments
+    num_media of the contribution when an active file is created.
+    """
+    if sender.__name__ in ['ImageFile', 'VideoFile', 'AudioFile']:
+        media_file = kwargs.get('instance')
+        if (kwargs.get('created') and
+                media_file.status == MEDIA_STATUS.active):
+            increment_attached_count(
+                media_file, MediaFile.contribution, media=1)
+
+
+@receiver(post_delete)
+def post_delete_media_file_count_update(sender, **kwargs):
+    """
+    Receiver that is called after a media file is removed from the database.
+    Decrements num_media of the contribution if the file was active.
     """
     if sender.__name__ in ['ImageFile', 'VideoFile', 'AudioFile']:
         media_file = kwargs.get('instance')
-        media_file.contribution.update_count()
+        if media_file.status == MEDIA_STATUS.active:
+            increment_attached_count(
+                media_file, MediaFile.contribution, media=-1)
@@ -0,0 +1,88 @@
+"""Pagination for contributions."""
+
+from iso8601 import parse_date
+from iso8601.iso8601 import ParseError
+
+from django.db.models import Q
+
+from geokey.core.pagination import CursorPagination
+
+
+class ContributionCursorPagination(CursorPagination):
+    """
+    Keyset pagination for contributions. Contributions are ordered by
+    `updated_at` (descending) and `id` (ascending), the same way as
+    `Observation.Meta.ordering`.
+    """
+    default_limit = 100
+    max_limit = 1000
+    ordering = ('-updated_at', 'id')
+    results_key = 'features'
+
+    def get_position(self, observation):
+        """
+        Returns `updated_at` and the ID of the observation.
+        """
+        updated_at = ''
+        if observation.updated_at is not None:
+            updated_at = observation.updated_at.isoformat()
+
+        return [updated_at, str(observation.id)]
+
+    def parse_position(self, values):
+        """
+        Returns `updated_at` and the ID stored in the cursor.
+        """
+        updated_at, pk = values
+
+        try:
+            return (parse_date(updated_at) if updated_at else None, int(pk))
+        except ParseError:
+            raise ValueError('The date and time are invalid.')
+
+    def get_after(self, updated_at, pk):
+        """
+        Returns the filter for observations that follow the position.
+        """
+        if updated_at is None:
+            return Q(updated_at__isnull=True, id__gt=pk) | Q(
+                updated_at__isnull=False)
+
+        return Q(updated_at__lt=updated_at) | Q(
+            updated_at=updated_at, id__gt=pk)
+
+    def get_before(self, updated_at, pk):
+        """
+        Returns the filter for observations that precede the position.
+        """
+        if updated_at is None:
+            return Q(updated_at__isnull=True, id__lt=pk)
+
+        return Q(updated_at__gt=updated_at) | Q(
+            updated_at=updated_at, id__lt=pk) | Q(updated_at__isnull=True)
+
+
+class SyncCursorPagination(ContributionCursorPagination):
+    """
+    Keyset pagination for contributions changed since the last sync.
+    Changes are ordered by `updated_at` and `id` (both ascending), so that
+    the oldest changes come first. Changed contributions always have
+    `updated_at` set.
+    """
+    default_limit = 1000
+    max_limit = 1000
+    ordering = ('updated_at', 'id')
+
+    def get_after(self, updated_at, pk):
+        """
+        Returns the filter for changes that follow the position.
+        """
+        return Q(updated_at__gt=updated_at) | Q(
+            updated_at=updated_at, id__gt=pk)
+
+    def get_before(self, updated_at, pk):
+        """
+        Returns the filter for changes that precede the position.
+        """
+        return Q(updated_at__lt=updated_at) | Q(
+            updated_at=updated_at, id__lt=pk)
@@ -34,6 +34,37 @@ class GeoJsonRenderer(BaseRenderer):
             "features": [self.render_single(item) for item in data]
         }
 
+    def render_page(self, data):
+        """
+        Creates a `FeatureCollection` object from a page of Contributions and
+        keeps additional information of the page, e.g. pagination cursors.
+        """
+        rendered = self.render_many(data.get('features'))
+        for key, value in data.iteritems():
+            if key != 'features':
+                rendered[key] = value
+
+        return rendered
+
+    def render_stream(self, data):
+        """
+        Renders an iterable of serialised Contributions into a GeoJson
+        `FeatureCollection` piece by piece. Each feature is rendered as soon as
+        it is taken from `data`, so the whole collection is never held in
+        memory.
+        """
+        yield '{"type":"FeatureCollection","features":['
+
+        separator = ''
+        for item in data:
+            yield separator + json.dumps(
+                self.render_single(item),
+                separators=self.separators
+            )
+            separator = ','
+
+        yield ']}'
+
     def render(self, data, accepted_media_type=None, renderer_context=None):
         """
         Renders `data` into serialized GeoJson.
@@ -47,6 +78,8 @@ class GeoJsonRenderer(BaseRenderer):
 
         if 'error' in data:
             rendered = data
+        elif isinstance(data, dict) and 'features' in data:
+            rendered = self.render_page(data)
         elif isinstance(data, dict):
             rendered = self.render_single(data)
         else:
@@ -1,13 +1,9 @@
 """Serializers for contributions."""
 
-import requests
-import tempfile
+import json
 
-from django.core import files
 from django.core.exceptions import PermissionDenied, ValidationError
-
-from easy_thumbnails.files import get_thumbnailer
-from easy_thumbnails.exceptions import InvalidImageFormatError
+from django.contrib.gis.geos import GEOSGeometry
 
 from rest_framework import serializers
 from rest_framework_gis import serializers as geoserializers
@@ -16,8 +12,11 @@ from rest_framework.serializers import BaseSerializer
 
 from geokey.categories.serializers import CategorySerializer
 from geokey.categories.models import Category
+from geokey.categories.schemas import get_schema
+from geokey.core.exceptions import MalformedRequestData
 from geokey.users.serializers import UserSerializer
 
+from .base import OBSERVATION_STATUS
 from .models import (
     Observation,
     Location,
@@ -27,6 +26,7 @@ from .models import (
     VideoFile,
     AudioFile
 )
+from .thumbnails import get_thumbnail_url
 
 
 class LocationSerializer(geoserializers.GeoFeatureModelSerializer):
@@ -388,6 +388,31 @@ class ContributionSerializer(BaseSerializer):
         """
         return str(obj.expiry_field) if obj.expiry_field else None
 
+    def get_tombstone(self, obj):
+        """
+        Returns the native representation of a deleted contribution. Only
+        identifies the contribution, so clients syncing changes can remove it.
+
+        Parameter
+        ---------
+        obj : geokey.contributions.models.Observation
+            The deleted instance that is serialised
+
+        Returns
+        -------
+        dict
+            Native represenation of the deleted Contribution
+        """
+        return {
+            'id': obj.id,
+            'properties': None,
+            'geometry': None,
+            'meta': {
+                'status': obj.status,
+                'updated_at': str(obj.updated_at)
+            }
+        }
+
     def to_representation(self, obj):
         """
         Returns the native representation of a contribution
@@ -402,6 +427,9 @@ class ContributionSerializer(BaseSerializer):
         dict
             Native represenation of the Contribution
         """
+        if obj.status == OBSERVATION_STATUS.deleted:
+            return self.get_tombstone(obj)
+
         location = obj.location
 
         isowner = False
@@ -457,22 +485,31 @@ class ContributionSerializer(BaseSerializer):
                 obj.category, context=self.context)
             feature['meta']['category'] = category_serializer.data
 
+            # All comments are loaded at once, responses are looked up in
+            # the context when the reply tree is serialised
+            comments = list(obj.comments.select_related('creator'))
+            responses = {}
+            for comment in comments:
+                responses.setdefault(comment.respondsto_id, []).append(comment)
+
+            context = dict(self.context, responses=responses)
+
             comment_serializer = CommentSerializer(
-                obj.comments.filter(respondsto=None),
+                responses.get(None, []),
                 many=True,
-                context=self.context
+                context=context
             )
             feature['comments'] = comment_serializer.data
 
             review_serializer = CommentSerializer(
-                obj.comments.filter(review_status='open'),
+                [c for c in comments if c.review_status == 'open'],
                 many=True,
-                context=self.context
+                context=context
             )
             feature['review_comments'] = review_serializer.data
 
             file_serializer = FileSerializer(
-                obj.files_attached.all(),
+                obj.files_attached.select_related('creator'),
                 many=True,
                 context=self.context
             )
@@ -481,6 +518,214 @@ class ContributionSerializer(BaseSerializer):
         return feature
 
 
+class ContributionCollectionSerializer(ContributionSerializer):
+    """
+    Deserialiser for a GeoJSON FeatureCollection of new contributions. The
+    categories and fields of the project are loaded once and all features are
+    validated against them; valid collections are created in bulk.
+    """
+    max_features = 1000
+
+    def get_schema(self, project):
+        """
+        Returns the categories of the project, with the active fields of each
+        category taken from the compiled schema of the category.
+
+        Parameters
+        ----------
+        project : geokey.projects.models.Project
+            Project the contributions are added to
+
+        Returns
+        -------
+        dict
+            Categories by ID, each a tuple of category and list of fields
+        """
+        categories = project.categories.select_related(
+            'display_field', 'expiry_field')
+
+        return dict(
+            (category.id, (category, get_schema(category.id).fields))
+            for category in categories
+        )
+
+    def get_category(self, schema, meta, errors):
+        """
+        Returns the category of a feature, adds an error if the category can
+        not be used.
+        """
+        try:
+            category, fields = schema[int(meta.get('category'))]
+        except (KeyError, TypeError, ValueError):
+            errors['category'] = ['The category can not be used with the '
+                                  'project or does not exist.']
+            return None, None
+
+        if category.status == 'inactive':
+            errors['category'] = ['The category can not be used because it '
+                                  'is inactive.']
+            return None, None
+
+        return category, fields
+
+    def get_location(self, locations, feature, errors):
+        """
+        Returns the existing location referenced by a feature or a new
+        location built from its geometry, adds an error if neither is valid.
+        """
+        project = self.context.get('project')
+        data = feature.get('location') or {}
+
+        if data.get('id') is not None:
+            try:
+                return locations[int(data.get('id'))]
+            except (KeyError, TypeError, ValueError):
+                errors['location'] = ['The location can not be used with '
+                                      'the project or does not exist.']
+                return None
+
+        try:
+            geometry = GEOSGeometry(json.dumps(feature.get('geometry')))
+        except Exception:
+            errors['location'] = ['The geometry is invalid or missing.']
+            return None
+
+        private = data.get('private') is True
+        return Location(
+            name=data.get('name'),
+            description=data.get('description'),
+            geometry=geometry,
+            creator=self.context.get('user'),
+            private=private,
+            private_for_project=project if private else None
+        )
+
+    def is_valid(self, raise_exception=False):
+        """
+        Checks if all features are valid. Errors are collected per feature,
+        keyed by the position of the feature in the collection.
+
+        Parameter
+        ---------
+        raise_exception : Boolean
+            indicates if an exeption should be raised if the data is invalid.
+
+        Returns
+        -------
+        Boolean
+            indicating if data is valid
+
+        Raises
+        ------
+        MalformedRequestData
+            If the data is not a FeatureCollection or too large
+        ValidationError
+            If data is invalid. Exception is raised when raise_exception is set
+            tp True.
+        """
+        features = self.initial_data.get('features')
+        if not isinstance(features, list):
+            raise MalformedRequestData('A FeatureCollection is required.')
+        if len(features) > self.max_features:
+            raise MalformedRequestData(
+                'No more than %s features can be added at once.' %
+                self.max_features
+            )
+
+        project = self.context.get('project')
+        can_moderate = project.can_moderate(self.context.get('user'))
+        schema = self.get_schema(project)
+
+        location_ids = []
+        for feature in features:
+            location = feature.get('location') or {}
+            if location.get('id') is not None:
+                location_ids.append(location.get('id'))
+        locations = {}
+        if location_ids:
+            locations = dict(
+                (location.id, location) for location in
+                Location.objects.get_queryset().get_list(project).filter(
+                    pk__in=location_ids)
+            )
+
+        self._errors = {}
+        self._validated_data = []
+
+        for index, feature in enumerate(features):
+            errors = {}
+            meta = feature.get('meta') or {}
+
+            category, fields = self.get_category(schema, meta, errors)
+            location = self.get_location(locations, feature, errors)
+
+            if category is not None:
+                status = meta.get('status')
+                if status != 'draft' and can_moderate:
+                    status = 'active'
+                status = status or category.default_status
+
+                properties = self.replace_null(
+                    feature.get('properties') or {})
+                try:
+                    if status == 'draft':
+                        Observation.validate_partial(
+                            category, properties, fields=fields)
+                    else:
+                        Observation.validate_full(
+                            category, properties, fields=fields)
+                except ValidationError, error:
+                    errors['properties'] = [
+                        unicode(message) for message in error.messages]
+
+            if errors:
+                self._errors[str(index)] = errors
+            else:
+                self._validated_data.append(Observation(
+                    location=location,
+                    project=project,
+                    category=category,
+                    properties=properties,
+                    status=status
+                ))
+
+        if self._errors and raise_exception:
+            raise ValidationError(self._errors)
+
+        return not bool(self._errors)
+
+    def save(self):
+        """
+        Creates all observations of the collection and returns them.
+
+        Returns
+        -------
+        list
+            The observations created
+        """
+        return self.create(self._validated_data)
+
+    def create(self, validated_data):
+        """
+        Creates all observations of the collection and returns them.
+
+        Parameter
+        ---------
+        validated_data : list
+            geokey.contributions.models.Observation instances after validation
+
+        Returns
+        -------
+        list
+            The observations created
+        """
+        self.instance = Observation.create_many(
+            validated_data,
+            self.context.get('user')
+        )
+        return self.instance
+
+
 class CommentSerializer(serializers.ModelSerializer):
     """
     Serialiser for geokey.contributions.models.Comment
@@ -496,7 +741,9 @@ class CommentSerializer(serializers.ModelSerializer):
 
     def to_representation(self, obj):
         """
-        Returns native represenation of the Comment. Adds responses to comment
+        Returns native represenation of the Comment. Adds responses to comment;
+        if all comments of the contribution have been loaded, the responses
+        are taken from `responses` in the context rather than queried.
 
         Parameter
         ---------
@@ -510,8 +757,15 @@ class CommentSerializer(serializers.ModelSerializer):
 
         """
         native = super(CommentSerializer, self).to_representation(obj)
+
+        responses = self.context.get('responses')
+        if responses is None:
+            responses = obj.responses.all()
+        else:
+            responses = responses.get(obj.id, [])
+
         native['responses'] = CommentSerializer(
-            obj.responses.all(),
+            responses,
             many=True,
             context=self.context
         ).data
@@ -553,7 +807,7 @@ class FileSerializer(serializers.ModelSerializer):
         model = MediaFile
         fields = (
             'id', 'name', 'description', 'created_at', 'creator', 'isowner',
-            'url', 'thumbnail_url', 'file_type'
+            'url', 'thumbnail_url', 'file_type', 'status'
         )
 
     def get_file_type(self, obj):
@@ -613,33 +867,10 @@ class FileSerializer(serializers.ModelSerializer):
         elif isinstance(obj, AudioFile):
             return obj.audio.url
 
-    def _get_thumb(self, image, size=(300, 300)):
-        """
-        Returns the thumbnail of the media file base on the size privoded
-
-        Parameter
-        ---------
-        image : Image
-            The image to be thumbnailed
-        size : tuple
-            width and height of the thumbnail, defaults to 300 by 300
-
-        Returns
-        -------
-        Image
-            The thumbnail
-
-        """
-        thumbnailer = get_thumbnailer(image)
-        thumb = thumbnailer.get_thumbnail({
-            'crop': True,
-            'size': size
-        })
-        return thumb
-
     def get_thumbnail_url(self, obj):
         """
-        Creates and returns a thumbnail for the MediaFile object
+        Returns the URL of the thumbnail generated for the MediaFile object,
+        or a placeholder if no thumbnail has been generated yet
 
         Parameter
         ---------
@@ -651,54 +882,4 @@ class FileSerializer(serializers.ModelSerializer):
         str
             The url to embed thumbnails on client side
         """
-        if isinstance(obj, ImageFile):
-            # Some of the imported image files in the original community maps
-            # seem to be broken. The error thrown when the image can not be
-            # read is caught here.
-            try:
-                return self._get_thumb(obj.image).url
-            except (
-                IOError,
-                InvalidImageFormatError
-            ):
-                return ''
-
-        elif isinstance(obj, VideoFile):
-            if obj.thumbnail:
-                # thumbnail has been downloaded, return the link
-                return self._get_thumb(obj.thumbnail).url
-
-            request = requests.get(
-                'http://img.youtube.com/vi/%s/0.jpg' % obj.youtube_id,
-                stream=True
-            )
-
-            if request.status_code != requests.codes.ok:
-                # Image not found, return placeholder thumbnail
-                return '/static/img/play.png'
-
-            lf = tempfile.NamedTemporaryFile()
-            # Read the streamed image in sections
-            for block in request.iter_content(1024 * 8):
-
-                # If no more file then stop
-                if not block:
-                    break
-
-                # Write image block to temporary file
-                lf.write(block)
-
-            file_name = obj.youtube_id + '.jpg'
-            obj.thumbnail.save(file_name, files.File(lf))
-
-            from PIL import Image
-
-            w, h = Image.open(obj.thumbnail).size
-
-            thumb = self._get_thumb(obj.thumbnail, size=(h, h))
-            obj.thumbnail.save(file_name, thumb)
-
-            return self._get_thumb(obj.thumbnail).url
-
-        elif isinstance(obj, AudioFile):
-            return '/static/img/play.png'
+        return get_thumbnail_url(obj)
@@ -4,7 +4,9 @@ from django.test import TestCase
 
 from nose.tools import raises
 
-from geokey.contributions.models import Comment, post_save_comment_count_update
+from geokey.contributions.models import (
+    Observation, Comment, post_save_comment_count_update
+)
 from ..model_factories import ObservationFactory, CommentFactory
 
 
@@ -21,6 +23,27 @@ class TestCommentPostSave(TestCase):
         self.assertEqual(comment.commentto.num_media, 0)
         self.assertEqual(comment.commentto.num_comments, 5)
 
+    def test_count_without_saving_contribution(self):
+        observation = ObservationFactory()
+        history = observation.history.count()
+
+        comment = CommentFactory.create(**{'commentto': observation})
+        response = CommentFactory.create(**{
+            'commentto': Observation.objects.get(pk=observation.id),
+            'respondsto': comment
+        })
+        self.assertEqual(observation.history.count(), history)
+        self.assertEqual(
+            Observation.objects.get(pk=observation.id).num_comments, 2)
+        self.assertEqual(observation.num_comments, 1)
+
+        comment = Comment.objects.get(pk=comment.id)
+        comment.delete()
+        comment.delete()
+        self.assertEqual(
+            Observation.objects.get(pk=observation.id).num_comments, 0)
+        self.assertFalse(Comment.objects.filter(pk=response.id).exists())
+
 
 class CommentTest(TestCase):
     @raises(Comment.DoesNotExist)
@@ -65,3 +65,27 @@ class LocationTest(TestCase):
     def test_get_private_location_for_project2_with_admin(self):
         Location.objects.get_single(
             self.admin, self.project2.id, self.private_location.id)
+
+
+class LocationSearchTest(TestCase):
+    def setUp(self):
+        self.hyde_park = LocationFactory.create(**{'name': 'Hyde Park'})
+        self.hyde = LocationFactory.create(**{
+            'name': None,
+            'description': 'hyde'
+        })
+        self.regents_park = LocationFactory.create(**{'name': 'Regents Park'})
+
+    def test_search(self):
+        result = Location.objects.all().search('PARK')
+        self.assertEqual(len(result), 2)
+        self.assertNotIn(self.hyde, result)
+
+    def test_search_ranked(self):
+        result = Location.objects.all().search_ranked('hyde park')
+        self.assertEqual(result[0], self.hyde_park)
+        self.assertIn(self.hyde, result)
+
+    def test_search_ranked_with_misspelling(self):
+        result = Location.objects.all().search_ranked('Regent Prak')
+        self.assertEqual(result[0], self.regents_park)
@@ -123,6 +123,31 @@ class LocationQueryTest(TestCase):
         self.assertNotIn('hyde', response.content)
         self.assertNotIn('Hyde Park', response.content)
 
+    def test_hyde_park_ranked(self):
+        request = self.factory.get(self.url + '?query=hyde%20park&ranked=true')
+        force_authenticate(request, user=self.project.creator)
+        view = LocationsAPIView.as_view()
+        response = view(request, project_id=self.project.id).render()
+
+        features = json.loads(response.content).get('features')
+        self.assertEqual(
+            features[0].get('properties').get('name').lower(),
+            'hyde park'
+        )
+        self.assertEqual(
+            features[1].get('properties').get('name').lower(),
+            'hyde park'
+        )
+
+    def test_percent_ranked(self):
+        request = self.factory.get(self.url + '?query=%25&ranked=true')
+        force_authenticate(request, user=self.project.creator)
+        view = LocationsAPIView.as_view()
+        response = view(request, project_id=self.project.id).render()
+
+        response_json = json.loads(response.content)
+        self.assertEqual(len(response_json.get('features')), 0)
+
 
 class LocationUpdateApiTest(TestCase):
     def setUp(self):
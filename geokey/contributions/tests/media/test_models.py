@@ -3,7 +3,7 @@
 from django.test import TestCase
 
 from geokey.contributions.models import (
-    ImageFile, VideoFile, AudioFile,
+    Observation, ImageFile, VideoFile, AudioFile,
     post_save_media_file_count_update
 )
 from geokey.contributions.tests.model_factories import ObservationFactory
@@ -159,3 +159,20 @@ class AudioFileTest(TestCase):
         )
         audio_file.delete()
         self.assertEquals(audio_file.status, 'deleted')
+
+    def test_delete_file_updates_count(self):
+        observation = ObservationFactory.create()
+        audio_file = AudioFile.objects.create(
+            name='Test name',
+            description='Test Description',
+            contribution=observation,
+            creator=UserFactory.create(),
+            audio=get_image()
+        )
+        self.assertEqual(observation.num_media, 1)
+
+        audio_file.delete()
+        audio_file.delete()
+        self.assertEqual(observation.num_media, 0)
+        self.assertEqual(
+            Observation.objects.get(pk=observation.id).num_media, 0)
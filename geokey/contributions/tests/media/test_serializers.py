@@ -15,6 +15,7 @@ from .model_factories import (
     AudioFileFactory
 )
 from geokey.contributions.serializers import FileSerializer
+from geokey.contributions.thumbnails import generate_thumbnail
 
 
 class FileSerializerTest(TestCase):
@@ -47,6 +48,7 @@ class FileSerializerTest(TestCase):
 
     def test_get_thumb_url(self):
         image = ImageFileFactory.create()
+        generate_thumbnail(image)
 
         serializer = FileSerializer(image, context={'user': image.creator})
         self.assertEqual(
@@ -62,6 +64,7 @@ class FileSerializerTest(TestCase):
 
     def test_get_youtube_no_thumb(self):
         video = VideoFileFactory.create(**{'youtube_id': 'asadf'})
+        generate_thumbnail(video)
 
         serializer = FileSerializer(video, context={'user': video.creator})
         self.assertEqual(
@@ -71,6 +74,7 @@ class FileSerializerTest(TestCase):
 
     def test_get_youtube_thumb(self):
         video = VideoFileFactory.create(**{'youtube_id': '14emk_jPnrI'})
+        generate_thumbnail(video)
 
         serializer = FileSerializer(video, context={'user': video.creator})
 
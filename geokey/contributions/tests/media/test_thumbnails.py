@@ -0,0 +1,90 @@
+"""Tests for thumbnails of contributions (media files)."""
+
+import os
+import glob
+
+from StringIO import StringIO
+
+from django.test import TestCase, override_settings
+from django.conf import settings
+from django.core.management import call_command
+
+from geokey.contributions.models import MediaFile
+
+from ...thumbnails import generate_thumbnail, get_thumbnail_url
+from .model_factories import (
+    ImageFileFactory,
+    VideoFileFactory,
+    AudioFileFactory
+)
+
+
+class ThumbnailsTest(TestCase):
+    def tearDown(self):
+        files = glob.glob(os.path.join(
+            settings.MEDIA_ROOT,
+            'user-uploads/images/*'
+        ))
+        for f in files:
+            os.remove(f)
+
+    def test_not_generated_on_create(self):
+        image = ImageFileFactory.create()
+        self.assertIsNone(MediaFile.objects.get(pk=image.id).thumbnail_url)
+
+    def test_generate_thumbnail(self):
+        image = ImageFileFactory.create()
+        url = generate_thumbnail(image)
+
+        self.assertEqual(url, image.image.url + '.300x300_q85_crop.png')
+        self.assertEqual(MediaFile.objects.get(pk=image.id).thumbnail_url, url)
+
+        audio = AudioFileFactory.create()
+        self.assertIsNone(generate_thumbnail(audio))
+        self.assertIsNone(MediaFile.objects.get(pk=audio.id).thumbnail_url)
+
+    def test_get_thumbnail_url(self):
+        image = ImageFileFactory.create()
+        audio = AudioFileFactory.create()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_thumbnail_url(image), '/static/img/play.png')
+            self.assertEqual(get_thumbnail_url(audio), '/static/img/play.png')
+
+            image.thumbnail_url = '/media/thumbnail.png'
+            self.assertEqual(get_thumbnail_url(image), '/media/thumbnail.png')
+
+    def test_generate_thumbnails_command(self):
+        image = ImageFileFactory.create()
+        other = ImageFileFactory.create(status='deleted')
+        AudioFileFactory.create()
+
+        stdout = StringIO()
+        call_command('generate_thumbnails', stdout=stdout)
+
+        self.assertIn('Generated 1 thumbnails.', stdout.getvalue())
+        self.assertEqual(
+            MediaFile.objects.get(pk=image.id).thumbnail_url,
+            image.image.url + '.300x300_q85_crop.png'
+        )
+        self.assertIsNone(
+            MediaFile._base_manager.get(pk=other.id).thumbnail_url)
+
+    def test_count_failed_attempts(self):
+        video = VideoFileFactory.create(**{'youtube_id': 'asadf'})
+
+        self.assertIsNone(generate_thumbnail(video))
+        self.assertEqual(
+            MediaFile.objects.get(pk=video.id).thumbnail_attempts, 1)
+
+    @override_settings(THUMBNAIL_MAX_ATTEMPTS=3)
+    def test_generate_thumbnails_command_gives_up(self):
+        image = ImageFileFactory.create()
+        MediaFile._base_manager.filter(pk=image.id).update(
+            thumbnail_attempts=3)
+
+        stdout = StringIO()
+        call_command('generate_thumbnails', stdout=stdout)
+
+        self.assertIn('Generated 0 thumbnails.', stdout.getvalue())
+        self.assertIsNone(MediaFile.objects.get(pk=image.id).thumbnail_url)
@@ -0,0 +1,129 @@
+"""Tests for transcoding of contributions (media files)."""
+
+import os
+
+from os.path import dirname, normpath, abspath, join
+from StringIO import StringIO
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+
+from geokey.core.tests.helpers.encoder_helpers import get_encoder_stub
+from geokey.contributions.models import Observation, MediaFile, AudioFile
+
+from geokey.contributions.tests.model_factories import ObservationFactory
+from geokey.users.tests.model_factories import UserFactory
+
+
+class TranscodingTest(TestCase):
+    def setUp(self):
+        self.observation = ObservationFactory.create()
+        self.encoders = []
+
+    def tearDown(self):
+        for path in self.encoders:
+            os.remove(path)
+
+        for media_file in AudioFile._base_manager.all():
+            media_file.audio.delete(save=False)
+
+    def get_encoder(self, **kwargs):
+        path = get_encoder_stub(**kwargs)
+        self.encoders.append(path)
+        return path
+
+    def upload(self):
+        path = normpath(join(dirname(abspath(__file__)), 'files/audio_2.3gp'))
+        the_file = ContentFile(open(path, 'rb').read(), 'audio_2.3gp')
+        the_file.content_type = 'audio/3gpp'
+
+        return MediaFile.objects.create(
+            name='Test name',
+            description='Test Description',
+            contribution=self.observation,
+            creator=UserFactory.create(),
+            the_file=the_file
+        )
+
+    def get_num_media(self):
+        return Observation.objects.get(pk=self.observation.id).num_media
+
+    def transcode(self):
+        stdout = StringIO()
+        call_command('transcode_media', once=True, concurrency=2,
+                     stdout=stdout)
+        return stdout.getvalue()
+
+    def test_create_processing(self):
+        with override_settings(AUDIO_ENCODER=self.get_encoder()):
+            audio_file = self.upload()
+
+        self.assertEqual(audio_file.type_name, 'AudioFile')
+        self.assertEqual(audio_file.status, 'processing')
+        self.assertTrue(audio_file.audio.name.endswith('.3gp'))
+        self.assertEqual(self.get_num_media(), 0)
+
+    def test_transcode(self):
+        with override_settings(AUDIO_ENCODER=self.get_encoder()):
+            audio_files = [self.upload(), self.upload(), self.upload()]
+            output = self.transcode()
+
+        self.assertIn('Transcoded 3 audio files.', output)
+        for uploaded in audio_files:
+            audio_file = MediaFile.objects.get(pk=uploaded.id)
+            self.assertEqual(audio_file.status, 'active')
+            self.assertTrue(audio_file.audio.name.endswith('.mp3'))
+            self.assertFalse(
+                uploaded.audio.storage.exists(uploaded.audio.name))
+        self.assertEqual(self.get_num_media(), 3)
+
+    def test_transcode_activation_failed(self):
+        activate = MediaFile.activate
+
+        def activate_or_fail(media_file):
+            if media_file.id == failing.id:
+                raise ValueError('Activation failed')
+            activate(media_file)
+
+        with override_settings(AUDIO_ENCODER=self.get_encoder()):
+            failing = self.upload()
+            audio_file = self.upload()
+
+            MediaFile.activate = activate_or_fail
+            try:
+                output = self.transcode()
+            finally:
+                MediaFile.activate = activate
+
+        self.assertIn('Transcoded 2 audio files.', output)
+        self.assertEqual(
+            MediaFile._base_manager.get(pk=failing.id).status, 'deleted')
+        self.assertTrue(failing.audio.storage.exists(failing.audio.name))
+        self.assertEqual(
+            MediaFile.objects.get(pk=audio_file.id).status, 'active')
+        self.assertEqual(self.get_num_media(), 1)
+
+    def test_transcode_failed(self):
+        with override_settings(AUDIO_ENCODER=self.get_encoder()):
+            audio_file = self.upload()
+
+        with override_settings(AUDIO_ENCODER=self.get_encoder(fail=True)):
+            self.transcode()
+
+        audio_file = MediaFile.objects.get(pk=audio_file.id)
+        self.assertEqual(audio_file.status, 'active')
+        self.assertTrue(audio_file.audio.name.endswith('.3gp'))
+        self.assertEqual(self.get_num_media(), 1)
+
+    def test_transcode_deleted(self):
+        with override_settings(AUDIO_ENCODER=self.get_encoder()):
+            audio_file = self.upload()
+            audio_file.delete()
+            output = self.transcode()
+
+        self.assertIn('Transcoded 0 audio files.', output)
+        self.assertEqual(
+            MediaFile._base_manager.get(pk=audio_file.id).status, 'deleted')
+        self.assertEqual(self.get_num_media(), 0)
@@ -10,7 +10,9 @@ from PIL import Image
 from StringIO import StringIO
 
 from django.test import TestCase
+from django.test.utils import override_settings
 from django.core.urlresolvers import reverse
+from django.core.management import call_command
 from django.contrib.auth.models import AnonymousUser
 from django.core.files import File
 from django.core.files.base import ContentFile
@@ -23,6 +25,7 @@ from rest_framework.renderers import JSONRenderer
 
 from geokey.core.exceptions import MalformedRequestData
 from geokey.core.tests.helpers.image_helpers import get_image
+from geokey.core.tests.helpers.encoder_helpers import get_encoder_stub
 from geokey.projects.tests.model_factories import UserFactory, ProjectFactory
 from geokey.contributions.models import MediaFile
 from geokey.users.models import User
@@ -297,9 +300,13 @@ class MediaFileAbstractListAPIViewTest(TestCase):
         view = MediaAbstractAPIView()
         view.request = request
 
-        response = self.render(
-            view.create_and_respond(request, self.contribution)
-        )
+        encoder = get_encoder_stub()
+        with override_settings(AUDIO_ENCODER=encoder):
+            response = self.render(
+                view.create_and_respond(request, self.contribution)
+            )
+            call_command('transcode_media', once=True, stdout=StringIO())
+        os.remove(encoder)
 
         response_json = json.loads(response.content)
         self.assertEqual(
@@ -318,7 +325,12 @@ class MediaFileAbstractListAPIViewTest(TestCase):
             response_json.get('file_type'),
             'AudioFile'
         )
-        self.assertIn('audio_2.mp3', response_json.get('url'))
+        self.assertEqual(response_json.get('status'), 'processing')
+        self.assertIn('audio_2', response_json.get('url'))
+
+        audio_file = MediaFile.objects.get(pk=response_json.get('id'))
+        self.assertEqual(audio_file.status, 'active')
+        self.assertIn('audio_2.mp3', audio_file.audio.url)
 
 
 class MediaAbstractAPIViewTest(TestCase):
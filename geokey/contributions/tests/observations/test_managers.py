@@ -1,5 +1,6 @@
 """Tests for managers of contributions (observations)."""
 
+from django.db import connection
 from django.test import TestCase
 
 from geokey.contributions.models import Observation
@@ -10,7 +11,7 @@ from geokey.categories.tests.model_factories import (
     CategoryFactory, LookupFieldFactory, LookupValueFactory,
     TextFieldFactory, MultipleLookupFieldFactory, MultipleLookupValueFactory
 )
-from ..model_factories import ObservationFactory
+from ..model_factories import ObservationFactory, LocationFactory
 
 
 class ObservationTest(TestCase):
@@ -54,6 +55,14 @@ class ObservationTest(TestCase):
                 ['draft', 'pending', 'deleted']
             )
 
+    def test_iterate_in_chunks(self):
+        observations = Observation.objects.all().for_moderator(self.creator)
+        chunked = list(observations.iterate_in_chunks(chunk_size=4))
+        self.assertEqual(
+            [observation.id for observation in chunked],
+            [observation.id for observation in observations]
+        )
+
 
 class TestSearch(TestCase):
     def setUp(self):
@@ -112,6 +121,21 @@ class TestSearch(TestCase):
         for o in result:
             self.assertEqual(o.properties.get('key'), 'blub')
 
+    def test_blub_xyz_ranked(self):
+        o_type = Observation.objects.all()[0].category
+        both = ObservationFactory.create(**{
+            'properties': {'key': 'blub xyz'},
+            'category': o_type
+        })
+
+        result = Observation.objects.all().search('blub xyz')
+        self.assertEqual(len(result), 11)
+        self.assertEqual(result[0].id, both.id)
+
+    def test_search_is_parameterised(self):
+        result = Observation.objects.all().search("blah') OR ('1' = '1")
+        self.assertEqual(len(result), 5)
+
     def test_single_lookup(self):
         project = ProjectFactory.create()
         category = CategoryFactory.create(**{'project': project})
@@ -183,3 +207,40 @@ class TestSearch(TestCase):
 
         for o in result:
             self.assertIn(kermit.id, o.properties.get('lookup'))
+
+
+class BboxTest(TestCase):
+    def setUp(self):
+        self.project = ProjectFactory.create()
+        ObservationFactory.create_batch(2, **{
+            'project': self.project,
+            'location': LocationFactory.create(
+                geometry='POINT (44.0010 33)')
+        })
+        ObservationFactory.create_batch(3, **{'project': self.project})
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            # the test tables are tiny, so the planner would always prefer a
+            # sequential scan if it was allowed to
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql, params)
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def test_get_by_bbox(self):
+        observations = Observation.objects.filter(
+            project=self.project).get_by_bbox('41,32,45,35')
+        self.assertEqual(len(observations), 2)
+
+        observations = Observation.objects.filter(
+            project=self.project).get_by_bbox('-1,51,0,52')
+        self.assertEqual(len(observations), 3)
+
+    def test_get_by_bbox_uses_spatial_index(self):
+        observations = Observation.objects.filter(
+            project=self.project).get_by_bbox('41,32,45,35')
+        self.assertIn(
+            'contributions_location_geometry_gist',
+            self.explain(observations)
+        )
@@ -4,12 +4,14 @@
 import pytz
 import datetime
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.core.exceptions import ValidationError
 
 from nose.tools import raises
 
-from geokey.contributions.models import Observation
+from geokey.contributions.models import (
+    Observation, pre_save_observation_update
+)
 from geokey.projects.tests.model_factories import UserFactory
 
 from geokey.categories.models import LookupValue, MultipleLookupValue
@@ -160,6 +162,36 @@ class TestContributionsPreSave(TestCase):
         )
 
 
+    @override_settings(SCHEMA_VERSION_TTL=60)
+    def test_pre_save_without_queries(self):
+        category = CategoryFactory.create()
+        text = TextFieldFactory.create(
+            **{'key': 'text_1', 'category': category, 'order': 0}
+        )
+        lookup = LookupFieldFactory.create(
+            **{'category': category, 'key': 'lookup', 'order': 1}
+        )
+        kermit = LookupValueFactory.create(**{
+            'field': lookup,
+            'name': 'Kermit'
+        })
+        category.display_field = text
+        category.save()
+
+        o = ObservationFactory.create(**{
+            'properties': {'text_1': 'blah', 'lookup': kermit.id},
+            'category': category
+        })
+        o = Observation.objects.get(pk=o.id)
+        o.properties['text_1'] = 'blubb'
+
+        with self.assertNumQueries(0):
+            pre_save_observation_update(Observation, instance=o)
+
+        self.assertEqual(o.display_field, 'text_1:blubb')
+        self.assertEqual(o.search_index, 'blubb,kermit')
+
+
 class ObservationTest(TestCase):
     @raises(Observation.DoesNotExist)
     def test_delete_observation(self):
@@ -0,0 +1,89 @@
+"""Tests for pagination of contributions (observations)."""
+
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from nose.tools import raises
+
+from geokey.core.exceptions import MalformedRequestData
+from geokey.projects.tests.model_factories import ProjectFactory
+from geokey.contributions.models import Observation
+from geokey.contributions.pagination import ContributionCursorPagination
+
+from ..model_factories import ObservationFactory
+
+
+class ContributionCursorPaginationTest(TestCase):
+    def setUp(self):
+        self.project = ProjectFactory.create()
+        now = timezone.now()
+
+        self.observations = []
+        for x in range(0, 5):
+            observation = ObservationFactory.create(**{
+                'project': self.project
+            })
+            # two observations share the same timestamp
+            Observation.objects.filter(pk=observation.id).update(
+                updated_at=now - timedelta(minutes=min(x, 3))
+            )
+            self.observations.append(observation)
+
+        self.queryset = Observation.objects.filter(project=self.project)
+        self.expected = [o.id for o in self.queryset]
+
+    def test_parse_limit(self):
+        pagination = ContributionCursorPagination()
+        self.assertEqual(pagination.limit, pagination.default_limit)
+
+        pagination = ContributionCursorPagination(limit='2')
+        self.assertEqual(pagination.limit, 2)
+
+        pagination = ContributionCursorPagination(limit='100000')
+        self.assertEqual(pagination.limit, pagination.max_limit)
+
+    @raises(MalformedRequestData)
+    def test_parse_invalid_limit(self):
+        ContributionCursorPagination(limit='abc')
+
+    @raises(MalformedRequestData)
+    def test_parse_negative_limit(self):
+        ContributionCursorPagination(limit='-1')
+
+    @raises(MalformedRequestData)
+    def test_decode_invalid_cursor(self):
+        ContributionCursorPagination(cursor='not-a-cursor')
+
+    def test_paginate_forward_and_backward(self):
+        pagination = ContributionCursorPagination(limit=2)
+        page = pagination.paginate_queryset(self.queryset)
+        data = pagination.get_paginated_data([])
+        self.assertEqual([o.id for o in page], self.expected[0:2])
+        self.assertIsNone(data.get('previous'))
+        self.assertIsNotNone(data.get('next'))
+
+        pagination = ContributionCursorPagination(
+            limit=2, cursor=data.get('next'))
+        page = pagination.paginate_queryset(self.queryset)
+        data = pagination.get_paginated_data([])
+        self.assertEqual([o.id for o in page], self.expected[2:4])
+        self.assertIsNotNone(data.get('previous'))
+        self.assertIsNotNone(data.get('next'))
+
+        next_cursor = data.get('next')
+
+        pagination = ContributionCursorPagination(
+            limit=2, cursor=data.get('previous'))
+        page = pagination.paginate_queryset(self.queryset)
+        data = pagination.get_paginated_data([])
+        self.assertEqual([o.id for o in page], self.expected[0:2])
+        self.assertIsNone(data.get('previous'))
+
+        pagination = ContributionCursorPagination(
+            limit=2, cursor=next_cursor)
+        page = pagination.paginate_queryset(self.queryset)
+        data = pagination.get_paginated_data([])
+        self.assertEqual([o.id for o in page], self.expected[4:5])
+        self.assertIsNone(data.get('next'))
@@ -2,6 +2,8 @@
 
 import json
 
+from copy import deepcopy
+
 from django.test import TestCase
 from django.template.loader import render_to_string
 
@@ -197,3 +199,19 @@ class GeoJsonRendererTest(TestCase):
 
         self.assertEqual(result.get('type'), 'FeatureCollection')
         self.assertEqual(len(result.get('features')), 1)
+
+    def test_render_stream(self):
+        renderer = GeoJsonRenderer()
+        result = json.loads(''.join(renderer.render_stream(
+            iter([deepcopy(self.contrib), deepcopy(self.contrib)])
+        )))
+
+        self.assertEqual(result.get('type'), 'FeatureCollection')
+        self.assertEqual(len(result.get('features')), 2)
+
+    def test_render_stream_with_empty(self):
+        renderer = GeoJsonRenderer()
+        result = json.loads(''.join(renderer.render_stream(iter([]))))
+
+        self.assertEqual(result.get('type'), 'FeatureCollection')
+        self.assertEqual(len(result.get('features')), 0)
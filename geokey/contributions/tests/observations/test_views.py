@@ -5,6 +5,7 @@ import json
 from django.test import TestCase
 from django.core.exceptions import PermissionDenied
 from django.core.urlresolvers import reverse
+from django.utils import timezone
 from django.contrib.auth.models import AnonymousUser
 
 from nose.tools import raises
@@ -25,7 +26,8 @@ from ..model_factories import (
 
 from geokey.contributions.views.observations import (
     SingleAllContributionAPIView, SingleContributionAPIView,
-    ProjectObservations
+    ProjectObservations, ProjectObservationsTile, ProjectObservationsClusters,
+    ProjectObservationsBulk
 )
 from geokey.contributions.models import Observation
 
@@ -1213,6 +1215,28 @@ class TestProjectPublicApi(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(json.loads(response.content).get('features')), 2)
 
+    def test_get_with_bbox_returns_contributions_inside(self):
+        inside = LocationFactory.create(geometry='POINT (44.0010 33)')
+        outside = LocationFactory.create(geometry='POINT (-55.555 -66.666)')
+
+        observation = ObservationFactory.create(**{
+            'project': self.project,
+            'location': inside
+        })
+        ObservationFactory.create(**{
+            'project': self.project,
+            'location': outside
+        })
+        ObservationFactory.create(**{'location': inside})
+
+        response = self.get(self.admin, bbox='41,32,45,35')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [feature['id'] for feature in
+             json.loads(response.content).get('features')],
+            [observation.id]
+        )
+
     def test_get_with_wrong_bbox(self):
         category = CategoryFactory(**{'project': self.project})
         TextFieldFactory.create(**{'key': 'text', 'category': category})
@@ -1289,6 +1313,269 @@ class TestProjectPublicApi(TestCase):
         response = self.get(self.admin)
         self.assertEqual(response.status_code, 200)
 
+    def test_get_paginated(self):
+        category = CategoryFactory(**{'project': self.project})
+        ObservationFactory.create_batch(3, **{
+            'project': self.project,
+            'category': category
+        })
+
+        url = reverse('api:project_observations', kwargs={
+            'project_id': self.project.id
+        })
+        theview = ProjectObservations.as_view()
+
+        request = self.factory.get(url + '?limit=2')
+        force_authenticate(request, user=self.admin)
+        response = theview(request, project_id=self.project.id).render()
+        self.assertEqual(response.status_code, 200)
+
+        content = json.loads(response.content)
+        self.assertEqual(content.get('type'), 'FeatureCollection')
+        self.assertEqual(len(content.get('features')), 2)
+        self.assertIsNone(content.get('previous'))
+        self.assertIsNotNone(content.get('next'))
+
+        request = self.factory.get(
+            url + '?limit=2&cursor=' + content.get('next'))
+        force_authenticate(request, user=self.admin)
+        response = theview(request, project_id=self.project.id).render()
+        self.assertEqual(response.status_code, 200)
+
+        content = json.loads(response.content)
+        self.assertEqual(len(content.get('features')), 1)
+        self.assertIsNotNone(content.get('previous'))
+        self.assertIsNone(content.get('next'))
+
+    def test_get_paginated_with_invalid_cursor(self):
+        url = reverse('api:project_observations', kwargs={
+            'project_id': self.project.id
+        })
+        request = self.factory.get(url + '?cursor=abc')
+        force_authenticate(request, user=self.admin)
+        theview = ProjectObservations.as_view()
+        response = theview(request, project_id=self.project.id).render()
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_changed_since(self):
+        category = CategoryFactory(**{'project': self.project})
+        ObservationFactory.create(**{
+            'project': self.project,
+            'category': category
+        })
+        since = timezone.now()
+
+        updated = ObservationFactory.create(**{
+            'project': self.project,
+            'category': category
+        })
+        deleted = ObservationFactory.create(**{
+            'project': self.project,
+            'category': category
+        })
+        deleted.delete()
+
+        url = reverse('api:project_observations', kwargs={
+            'project_id': self.project.id
+        })
+        request = self.factory.get(url, {'since': since.isoformat()})
+        force_authenticate(request, user=self.admin)
+        theview = ProjectObservations.as_view()
+        response = theview(request, project_id=self.project.id).render()
+        self.assertEqual(response.status_code, 200)
+
+        content = json.loads(response.content)
+        features = content.get('features')
+        self.assertEqual(len(features), 2)
+        self.assertEqual(features[0].get('id'), updated.id)
+        self.assertEqual(features[1].get('id'), deleted.id)
+        self.assertEqual(features[1].get('meta').get('status'), 'deleted')
+        self.assertIsNone(features[1].get('properties'))
+
+        request = self.factory.get(url, {'since': content.get('since')})
+        force_authenticate(request, user=self.admin)
+        response = theview(request, project_id=self.project.id).render()
+        self.assertEqual(len(json.loads(response.content).get('features')), 0)
+
+    def test_get_changed_since_hidden(self):
+        category = CategoryFactory(**{'project': self.project})
+        hidden = ObservationFactory.create(**{
+            'project': self.project,
+            'category': category,
+            'creator': self.admin
+        })
+        since = timezone.now()
+        hidden.update(None, self.admin, status='pending')
+
+        url = reverse('api:project_observations', kwargs={
+            'project_id': self.project.id
+        })
+        request = self.factory.get(url, {'since': since.isoformat()})
+        force_authenticate(request, user=self.contributor)
+        theview = ProjectObservations.as_view()
+        response = theview(request, project_id=self.project.id).render()
+        self.assertEqual(response.status_code, 200)
+
+        features = json.loads(response.content).get('features')
+        self.assertEqual(len(features), 1)
+        self.assertEqual(features[0].get('id'), hidden.id)
+        self.assertEqual(features[0].get('meta').get('status'), 'deleted')
+        self.assertIsNone(features[0].get('properties'))
+
+    def test_get_changed_since_hidden_only_if_received_before(self):
+        user = UserFactory.create()
+        allowed = CategoryFactory(**{'project': self.project})
+        other = CategoryFactory(**{'project': self.project})
+        UserGroupFactory.create(add_users=[user], **{
+            'project': self.project,
+            'filters': {allowed.id: {}}
+        })
+
+        received = ObservationFactory.create(**{
+            'project': self.project,
+            'category': allowed,
+            'creator': self.admin
+        })
+        filtered = ObservationFactory.create(**{
+            'project': self.project,
+            'category': other,
+            'creator': self.admin
+        })
+        since = timezone.now()
+
+        received.update(None, self.admin, status='pending')
+        filtered.update(None, self.admin, status='pending')
+        ObservationFactory.create(**{
+            'project': self.project,
+            'category': allowed,
+            'creator': self.admin,
+            'status': 'pending'
+        })
+
+        url = reverse('api:project_observations', kwargs={
+            'project_id': self.project.id
+        })
+        request = self.factory.get(url, {'since': since.isoformat()})
+        force_authenticate(request, user=user)
+        theview = ProjectObservations.as_view()
+        response = theview(request, project_id=self.project.id).render()
+        self.assertEqual(response.status_code, 200)
+
+        features = json.loads(response.content).get('features')
+        self.assertEqual([f.get('id') for f in features], [received.id])
+        self.assertEqual(features[0].get('meta').get('status'), 'deleted')
+
+    def test_get_changed_since_paged(self):
+        category = CategoryFactory(**{'project': self.project})
+        since = timezone.now()
+        observations = ObservationFactory.create_batch(3, **{
+            'project': self.project,
+            'category': category
+        })
+
+        url = reverse('api:project_observations', kwargs={
+            'project_id': self.project.id
+        })
+        theview = ProjectObservations.as_view()
+        ids = []
+        cursor = None
+
+        for x in range(0, 3):
+            params = {'since': since.isoformat(), 'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            request = self.factory.get(url, params)
+            force_authenticate(request, user=self.admin)
+            response = theview(request, project_id=self.project.id).render()
+            self.assertEqual(response.status_code, 200)
+
+            content = json.loads(response.content)
+            ids.extend(f.get('id') for f in content.get('features'))
+            cursor = content.get('next')
+            if cursor is None:
+                break
+            self.assertEqual(content.get('since'), since.isoformat())
+
+        self.assertEqual(ids, [o.id for o in observations])
+        self.assertEqual(
+            content.get('since'),
+            Observation.objects.get(pk=observations[-1].id).updated_at
+            .isoformat()
+        )
+
+    def test_get_changed_since_with_search(self):
+        category = CategoryFactory(**{'project': self.project})
+        TextFieldFactory.create(**{'key': 'text', 'category': category})
+        since = timezone.now()
+
+        ObservationFactory.create(**{
+            'project': self.project,
+            'category': category,
+            'properties': {'text': 'blah blah'}
+        })
+        latest = ObservationFactory.create(**{
+            'project': self.project,
+            'category': category,
+            'properties': {'text': 'blah'}
+        })
+
+        url = reverse('api:project_observations', kwargs={
+            'project_id': self.project.id
+        })
+        request = self.factory.get(url, {
+            'since': since.isoformat(),
+            'search': 'blah'
+        })
+        force_authenticate(request, user=self.admin)
+        theview = ProjectObservations.as_view()
+        response = theview(request, project_id=self.project.id).render()
+
+        content = json.loads(response.content)
+        self.assertEqual(len(content.get('features')), 2)
+        self.assertEqual(content.get('features')[1].get('id'), latest.id)
+        self.assertEqual(
+            content.get('since'),
+            Observation.objects.get(pk=latest.id).updated_at.isoformat()
+        )
+
+    def test_get_changed_since_with_invalid_date(self):
+        url = reverse('api:project_observations', kwargs={
+            'project_id': self.project.id
+        })
+        request = self.factory.get(url, {'since': 'yesterday'})
+        force_authenticate(request, user=self.admin)
+        theview = ProjectObservations.as_view()
+        response = theview(request, project_id=self.project.id).render()
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_streamed(self):
+        category = CategoryFactory(**{'project': self.project})
+        ObservationFactory.create_batch(3, **{
+            'project': self.project,
+            'category': category
+        })
+
+        url = reverse('api:project_observations', kwargs={
+            'project_id': self.project.id
+        })
+        request = self.factory.get(url + '?stream=true')
+        force_authenticate(request, user=self.admin)
+        theview = ProjectObservations.as_view()
+        response = theview(request, project_id=self.project.id)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+
+        content = json.loads(''.join(response.streaming_content))
+        self.assertEqual(content.get('type'), 'FeatureCollection')
+        self.assertEqual(len(content.get('features')), 3)
+        for feature in content.get('features'):
+            self.assertEqual(feature.get('type'), 'Feature')
+            self.assertEqual(
+                feature.get('meta').get('category').get('id'),
+                category.id
+            )
+
     def test_get_with_contributor(self):
         response = self.get(self.contributor)
         self.assertEqual(response.status_code, 200)
@@ -1301,3 +1588,234 @@ class TestProjectPublicApi(TestCase):
     def test_get_with_anonymous(self):
         response = self.get(AnonymousUser())
         self.assertEqual(response.status_code, 404)
+
+
+class ProjectObservationsTileTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.admin = UserFactory.create()
+        self.project = ProjectFactory.create(add_admins=[self.admin])
+
+        category = CategoryFactory(**{'project': self.project})
+        ObservationFactory.create_batch(2, **{
+            'project': self.project,
+            'category': category
+        })
+
+    def get(self, user, zoom, x, y):
+        url = reverse('api:project_observations_tile', kwargs={
+            'project_id': self.project.id,
+            'zoom': zoom,
+            'x': x,
+            'y': y
+        })
+        request = self.factory.get(url)
+        force_authenticate(request, user=user)
+        theview = ProjectObservationsTile.as_view()
+        return theview(
+            request,
+            project_id=self.project.id,
+            zoom=zoom,
+            x=x,
+            y=y
+        )
+
+    def test_get_with_admin(self):
+        # the factory locations are in London, on tile 10/511/340
+        response = self.get(self.admin, 10, 511, 340)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['Content-Type'],
+            'application/vnd.mapbox-vector-tile'
+        )
+        self.assertTrue(len(response.content) > 0)
+
+    def test_get_empty_tile(self):
+        response = self.get(self.admin, 10, 0, 0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.content), 0)
+
+    def test_get_invalid_tile(self):
+        response = self.get(self.admin, 1, 5, 0).render()
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_invalid_zoom(self):
+        response = self.get(self.admin, 999999999, 0, 0).render()
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_with_some_dude(self):
+        response = self.get(UserFactory.create(), 0, 0, 0).render()
+        self.assertEqual(response.status_code, 404)
+
+
+class ProjectObservationsClustersTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.admin = UserFactory.create()
+        self.project = ProjectFactory.create(add_admins=[self.admin])
+
+        category = CategoryFactory(**{'project': self.project})
+        ObservationFactory.create_batch(3, **{
+            'project': self.project,
+            'category': category
+        })
+
+    def get(self, user, **params):
+        url = reverse('api:project_observations_clusters', kwargs={
+            'project_id': self.project.id
+        })
+        request = self.factory.get(url, params)
+        force_authenticate(request, user=user)
+        theview = ProjectObservationsClusters.as_view()
+        return theview(request, project_id=self.project.id).render()
+
+    def test_get_grid(self):
+        response = self.get(self.admin, zoom=2)
+        self.assertEqual(response.status_code, 200)
+
+        features = json.loads(response.content).get('features')
+        self.assertEqual(len(features), 1)
+        self.assertEqual(features[0]['properties']['count'], 3)
+        self.assertEqual(features[0]['geometry']['type'], 'Point')
+
+    def test_get_kmeans(self):
+        response = self.get(self.admin, zoom=2, method='kmeans', k=2)
+        self.assertEqual(response.status_code, 200)
+
+        features = json.loads(response.content).get('features')
+        self.assertEqual(
+            sum(f['properties']['count'] for f in features), 3)
+
+    def test_get_kmeans_with_more_clusters_than_contributions(self):
+        response = self.get(self.admin, zoom=2, method='kmeans', k=10)
+        self.assertEqual(response.status_code, 200)
+
+        features = json.loads(response.content).get('features')
+        self.assertLessEqual(len(features), 3)
+        self.assertEqual(
+            sum(f['properties']['count'] for f in features), 3)
+
+        response = self.get(self.admin, zoom=2, method='kmeans')
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_with_bbox(self):
+        response = self.get(self.admin, zoom=2, bbox='0,0,1,1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content).get('features'), [])
+
+    def test_get_without_zoom(self):
+        response = self.get(self.admin)
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_with_invalid_method(self):
+        response = self.get(self.admin, zoom=2, method='voronoi')
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_with_some_dude(self):
+        response = self.get(UserFactory.create(), zoom=2)
+        self.assertEqual(response.status_code, 404)
+
+
+class ProjectObservationsBulkTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.admin = UserFactory.create()
+        self.project = ProjectFactory(add_admins=[self.admin])
+        self.category = CategoryFactory(**{
+            'status': 'active',
+            'project': self.project
+        })
+
+        TextFieldFactory.create(**{
+            'key': 'key_1',
+            'category': self.category,
+            'required': True,
+            'order': 1
+        })
+        NumericFieldFactory.create(**{
+            'key': 'key_2',
+            'category': self.category,
+            'minval': 0,
+            'maxval': 1000,
+            'order': 2
+        })
+
+    def get_feature(self, key_1='value 1', key_2=12):
+        return {
+            'type': 'Feature',
+            'geometry': {
+                'type': 'Point',
+                'coordinates': [-0.13404607772827148, 51.52439200896907]
+            },
+            'properties': {'key_1': key_1, 'key_2': key_2},
+            'meta': {'category': self.category.id},
+            'location': {'name': 'UCL'}
+        }
+
+    def post(self, features, user):
+        url = reverse('api:project_observations_bulk', kwargs={
+            'project_id': self.project.id
+        })
+        request = self.factory.post(
+            url,
+            json.dumps({'type': 'FeatureCollection', 'features': features}),
+            content_type='application/json'
+        )
+        force_authenticate(request, user=user)
+        view = ProjectObservationsBulk.as_view()
+        return view(request, project_id=self.project.id).render()
+
+    def test_post_with_admin(self):
+        response = self.post(
+            [self.get_feature(), self.get_feature('blah blub', 14)],
+            self.admin
+        )
+        self.assertEqual(response.status_code, 201)
+
+        created = json.loads(response.content).get('created')
+        self.assertEqual(len(created), 2)
+
+        observation = Observation.objects.get(pk=created[1])
+        self.assertEqual(observation.status, 'active')
+        self.assertEqual(observation.creator, self.admin)
+        self.assertEqual(observation.location.name, 'UCL')
+        self.assertIn('blub', observation.search_index)
+        self.assertEqual(observation.history.count(), 1)
+
+    def test_post_with_existing_location(self):
+        location = LocationFactory.create()
+        feature = self.get_feature()
+        feature['location'] = {'id': location.id}
+
+        response = self.post([feature], self.admin)
+        self.assertEqual(response.status_code, 201)
+
+        created = json.loads(response.content).get('created')
+        self.assertEqual(
+            Observation.objects.get(pk=created[0]).location, location)
+
+    def test_post_with_invalid_features(self):
+        invalid_category = self.get_feature()
+        invalid_category['meta']['category'] = 3864
+
+        response = self.post(
+            [self.get_feature(), self.get_feature(key_2=5000),
+             invalid_category],
+            self.admin
+        )
+        self.assertEqual(response.status_code, 400)
+
+        errors = json.loads(response.content).get('errors')
+        self.assertEqual(sorted(errors.keys()), ['1', '2'])
+        self.assertIn('properties', errors['1'])
+        self.assertIn('category', errors['2'])
+        self.assertEqual(
+            Observation.objects.filter(project=self.project).count(), 0)
+
+    def test_post_without_collection(self):
+        response = self.post(None, self.admin)
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_with_non_member(self):
+        response = self.post([self.get_feature()], UserFactory.create())
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,229 @@
+"""Tests for commands of contributions."""
+
+import os
+import json
+import shutil
+import tempfile
+
+from StringIO import StringIO
+
+from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from nose.tools import raises
+
+from geokey.core.models import LoggerHistory
+from geokey.users.tests.model_factories import UserFactory
+from geokey.projects.tests.model_factories import ProjectFactory
+from geokey.categories.tests.model_factories import (
+    CategoryFactory,
+    TextFieldFactory,
+    NumericFieldFactory,
+    LookupFieldFactory,
+    LookupValueFactory
+)
+
+from ..models import Observation
+from ..management.commands.import_contributions import read_geojson
+
+
+class ImportContributionsTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.user = UserFactory.create()
+        self.project = ProjectFactory.create(add_admins=[self.user])
+        self.category = CategoryFactory.create(**{
+            'project': self.project,
+            'default_status': 'active'
+        })
+
+        TextFieldFactory.create(**{
+            'key': 'name',
+            'category': self.category,
+            'required': True
+        })
+        NumericFieldFactory.create(**{
+            'key': 'height',
+            'category': self.category,
+            'minval': 0,
+            'maxval': 100
+        })
+        self.lookup = LookupFieldFactory.create(**{
+            'key': 'type',
+            'category': self.category
+        })
+        self.oak = LookupValueFactory.create(**{
+            'name': 'Oak',
+            'field': self.lookup
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as output:
+            output.write(content)
+        return path
+
+    def get_feature(self, name, height):
+        return {
+            'type': 'Feature',
+            'geometry': {
+                'type': 'Point',
+                'coordinates': [-0.134, 51.524]
+            },
+            'properties': {'title': name, 'height': height, 'type': 'oak'}
+        }
+
+    def write_geojson(self, features):
+        return self.write('trees.geojson', json.dumps({
+            'type': 'FeatureCollection',
+            'crs': {'type': 'name', 'properties': {'name': 'EPSG:4326'}},
+            'features': features
+        }))
+
+    def call(self, path, **options):
+        stdout = StringIO()
+        stderr = StringIO()
+        call_command(
+            'import_contributions',
+            str(self.project.id),
+            str(self.category.id),
+            path,
+            user=self.user.email,
+            stdout=stdout,
+            stderr=stderr,
+            **options
+        )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_read_geojson_in_chunks(self):
+        features = [self.get_feature('Tree %s' % x, x) for x in range(0, 5)]
+        path = self.write_geojson(features)
+
+        self.assertEqual(list(read_geojson(path, chunk_size=7)), features)
+
+    @raises(CommandError)
+    def test_read_geojson_without_features(self):
+        list(read_geojson(self.write('empty.geojson', '{"type": "Feature"}')))
+
+    def test_import_geojson(self):
+        path = self.write_geojson([
+            self.get_feature('Tree %s' % x, x) for x in range(0, 5)
+        ] + [self.get_feature('Too tall', 500)])
+
+        stdout, stderr = self.call(
+            path, map=['title=name'], batch_size=2)
+
+        observations = Observation.objects.filter(category=self.category)
+        self.assertEqual(observations.count(), 5)
+        self.assertIn('Feature 5 is invalid', stderr)
+        self.assertIn('Imported 5 contributions, 1 features were invalid.',
+                      stdout)
+        self.assertFalse(os.path.exists('%s.import' % path))
+
+        observation = [
+            o for o in observations if o.properties.get('height') == 3][0]
+        self.assertEqual(observation.properties.get('name'), 'Tree 3')
+        self.assertEqual(observation.properties.get('type'), self.oak.id)
+        self.assertEqual(observation.status, 'active')
+        self.assertEqual(observation.creator, self.user)
+        self.assertIsNotNone(observation.location.id)
+        self.assertEqual(observation.history.count(), 1)
+        self.assertEqual(LoggerHistory.objects.filter(
+            observation__id=str(observation.id)).count(), 1)
+
+    def test_import_csv(self):
+        path = self.write(
+            'trees.csv',
+            'title,height,type,longitude,latitude\n'
+            'Oak tree,12,Oak,-0.134,51.524\n'
+            'Old tree,12.5,,-0.135,51.525\n'
+            'Lost tree,1,Oak,,\n'
+        )
+
+        stdout, stderr = self.call(path, map=['title=name'])
+
+        observations = Observation.objects.filter(category=self.category)
+        self.assertEqual(observations.count(), 2)
+        self.assertIn('Feature 2 is invalid', stderr)
+
+        observation = [
+            o for o in observations if o.properties.get('height') == 12][0]
+        self.assertEqual(observation.properties.get('name'), 'Oak tree')
+        self.assertEqual(observation.properties.get('type'), self.oak.id)
+        self.assertEqual(observation.location.geometry.x, -0.134)
+
+    def test_import_csv_with_geometry_column(self):
+        path = self.write(
+            'trees.csv',
+            'name;wkt\n'
+            'Oak tree;POINT (-0.134 51.524)\n'
+        )
+
+        self.call(path, geometry='wkt', delimiter=';')
+
+        observation = Observation.objects.get(category=self.category)
+        self.assertEqual(observation.properties.get('name'), 'Oak tree')
+        self.assertEqual(observation.location.geometry.y, 51.524)
+
+    def test_resume_import(self):
+        path = self.write_geojson([
+            self.get_feature('Tree %s' % x, x) for x in range(0, 5)
+        ])
+        with open('%s.import' % path, 'w') as state:
+            json.dump({
+                'project': self.project.id,
+                'category': self.category.id,
+                'position': 3,
+                'created': 3,
+                'invalid': 0
+            }, state)
+
+        stdout, stderr = self.call(path, map=['title=name'], resume=True)
+
+        names = sorted(o.properties.get('name') for o in
+                       Observation.objects.filter(category=self.category))
+        self.assertEqual(names, ['Tree 3', 'Tree 4'])
+        self.assertIn('Resuming at feature 3.', stdout)
+        self.assertIn('Imported 5 contributions', stdout)
+
+    def test_batch_rolled_back_if_progress_not_stored(self):
+        path = self.write_geojson([self.get_feature('Tree', 1)])
+        state = os.path.join(self.directory, 'missing', 'trees.import')
+
+        with self.assertRaises(IOError):
+            self.call(path, map=['title=name'], state=state)
+
+        self.assertEqual(
+            Observation.objects.filter(category=self.category).count(), 0)
+
+    @raises(CommandError)
+    def test_interrupted_import_without_resume(self):
+        path = self.write_geojson([self.get_feature('Tree', 1)])
+        with open('%s.import' % path, 'w') as state:
+            json.dump({
+                'project': self.project.id,
+                'category': self.category.id,
+                'position': 1,
+                'created': 1,
+                'invalid': 0
+            }, state)
+
+        self.call(path)
+
+    @raises(CommandError)
+    def test_import_with_unknown_category(self):
+        path = self.write_geojson([self.get_feature('Tree', 1)])
+        category = CategoryFactory.create()
+
+        call_command(
+            'import_contributions',
+            str(self.project.id),
+            str(category.id),
+            path,
+            user=self.user.email,
+            stdout=StringIO()
+        )
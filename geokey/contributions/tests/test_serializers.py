@@ -3,14 +3,17 @@
 import json
 
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import AnonymousUser
 
 from nose.tools import raises
 
 from geokey.projects.tests.model_factories import UserFactory, ProjectFactory
 from geokey.categories.tests.model_factories import (
-    CategoryFactory, TextFieldFactory, NumericFieldFactory
+    CategoryFactory, TextFieldFactory, NumericFieldFactory,
+    LookupFieldFactory, LookupValueFactory
 )
 
 from ..serializers import (
@@ -21,6 +24,7 @@ from ..models import Observation, Location
 from .model_factories import (
     LocationFactory, ObservationFactory, CommentFactory
 )
+from .media.model_factories import AudioFileFactory
 
 
 class LocationContributionSerializerTest(TestCase):
@@ -458,6 +462,56 @@ class ContributionSerializerIntegrationTests(TestCase):
             json.loads(result['location']['geometry'])
         )
 
+    @override_settings(SCHEMA_VERSION_TTL=60)
+    def test_serialize_instance_with_fixed_queries(self):
+        observation = ObservationFactory.create(**{
+            'project': self.project,
+            'category': self.category
+        })
+
+        def count_queries():
+            instance = Observation.objects.get(pk=observation.id)
+            with CaptureQueriesContext(connection) as queries:
+                result = ContributionSerializer(
+                    instance,
+                    context={'user': self.contributor}
+                ).data
+            return len(queries), result
+
+        CommentFactory.create(**{'commentto': observation})
+        # The first call compiles the schema of the category
+        count_queries()
+        expected, result = count_queries()
+
+        lookup = LookupFieldFactory.create(**{
+            'key': 'key_3',
+            'category': self.category,
+            'order': 2
+        })
+        LookupValueFactory.create_batch(3, **{'field': lookup})
+
+        for x in range(0, 3):
+            comment = CommentFactory.create(**{
+                'commentto': observation,
+                'review_status': 'open'
+            })
+            CommentFactory.create_batch(2, **{
+                'commentto': observation,
+                'respondsto': comment
+            })
+        AudioFileFactory.create_batch(3, **{'contribution': observation})
+
+        count_queries()
+        queries, result = count_queries()
+
+        self.assertEqual(queries, expected)
+        self.assertEqual(len(result['comments']), 4)
+        self.assertEqual(len(result['comments'][1]['responses']), 2)
+        self.assertEqual(len(result['review_comments']), 3)
+        self.assertEqual(len(result['media']), 3)
+        self.assertEqual(
+            len(result['meta']['category']['fields'][2]['lookupvalues']), 3)
+
     def test_serialize_bulk(self):
         number = 20
 
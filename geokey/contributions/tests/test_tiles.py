@@ -0,0 +1,96 @@
+"""Test all tile utils."""
+
+from django.test import TestCase
+
+from nose.tools import raises
+
+from geokey.core.exceptions import MalformedRequestData
+from geokey.contributions.tiles import (
+    WEB_MERCATOR_MAX,
+    validate_tile,
+    get_tile_bbox,
+    get_tile_envelope,
+    validate_clusters,
+    get_cluster_grid_size
+)
+
+
+class ValidateTileTest(TestCase):
+    """Test for method 'validate_tile'."""
+
+    def test_method(self):
+        """Test method."""
+        self.assertEqual(validate_tile('3', '7', '0'), (3, 7, 0))
+
+    @raises(MalformedRequestData)
+    def test_method_with_column_outside(self):
+        """Test method with column outside the grid."""
+        validate_tile('1', '2', '0')
+
+    @raises(MalformedRequestData)
+    def test_method_with_zoom_too_high(self):
+        """Test method with zoom level too high."""
+        validate_tile('30', '0', '0')
+
+
+class GetTileBboxTest(TestCase):
+    """Test for method 'get_tile_bbox'."""
+
+    def test_method(self):
+        """Test method."""
+        bbox = [float(c) for c in get_tile_bbox(1, 1, 0).split(',')]
+
+        self.assertEqual(bbox[0], 0.0)
+        self.assertAlmostEqual(bbox[1], 0.0)
+        self.assertEqual(bbox[2], 180.0)
+        self.assertAlmostEqual(bbox[3], 85.0511287798, places=6)
+
+
+class GetTileEnvelopeTest(TestCase):
+    """Test for method 'get_tile_envelope'."""
+
+    def test_method(self):
+        """Test method."""
+        self.assertEqual(
+            get_tile_envelope(0, 0, 0),
+            (-WEB_MERCATOR_MAX, -WEB_MERCATOR_MAX,
+             WEB_MERCATOR_MAX, WEB_MERCATOR_MAX)
+        )
+        self.assertEqual(
+            get_tile_envelope(1, 0, 1),
+            (-WEB_MERCATOR_MAX, -WEB_MERCATOR_MAX, 0.0, 0.0)
+        )
+
+
+class ValidateClustersTest(TestCase):
+    """Test for method 'validate_clusters'."""
+
+    def test_method(self):
+        """Test method."""
+        self.assertEqual(validate_clusters('3'), (3, 'grid', 50))
+        self.assertEqual(
+            validate_clusters('3', 'kmeans', '10'), (3, 'kmeans', 10))
+
+    @raises(MalformedRequestData)
+    def test_method_without_zoom(self):
+        """Test method without zoom level."""
+        validate_clusters(None)
+
+    @raises(MalformedRequestData)
+    def test_method_with_invalid_method(self):
+        """Test method with invalid clustering method."""
+        validate_clusters('3', 'voronoi')
+
+    @raises(MalformedRequestData)
+    def test_method_with_k_too_high(self):
+        """Test method with too many clusters."""
+        validate_clusters('3', 'kmeans', '100000')
+
+
+class GetClusterGridSizeTest(TestCase):
+    """Test for method 'get_cluster_grid_size'."""
+
+    def test_method(self):
+        """Test method."""
+        self.assertEqual(get_cluster_grid_size(0), 90.0)
+        self.assertEqual(get_cluster_grid_size(2), 22.5)
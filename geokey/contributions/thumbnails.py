@@ -0,0 +1,167 @@
+"""Thumbnails of media files."""
+
+import requests
+import tempfile
+
+from django.conf import settings
+from django.core import files
+
+from easy_thumbnails.files import get_thumbnailer
+from easy_thumbnails.exceptions import InvalidImageFormatError
+
+
+THUMBNAIL_SIZE = (300, 300)
+PLACEHOLDER_URL = '/static/img/play.png'
+# Seconds to wait for YouTube when downloading the preview image of a video
+DOWNLOAD_TIMEOUT = 10
+
+
+def get_max_attempts():
+    """
+    Returns how often the generation of a thumbnail is attempted before the
+    media file is given up on, configured by `THUMBNAIL_MAX_ATTEMPTS`.
+
+    Returns
+    -------
+    int
+        Maximum number of attempts
+    """
+    return getattr(settings, 'THUMBNAIL_MAX_ATTEMPTS', 24)
+
+
+def get_thumbnail(image, size=THUMBNAIL_SIZE):
+    """
+    Returns the thumbnail of the image based on the size provided. The
+    thumbnail is generated when it does not exist yet.
+
+    Parameters
+    ----------
+    image : django.db.models.fields.files.ImageFieldFile
+        The image to be thumbnailed
+    size : tuple
+        Width and height of the thumbnail, defaults to 300 by 300
+
+    Returns
+    -------
+    easy_thumbnails.files.ThumbnailFile
+        The thumbnail
+    """
+    thumbnailer = get_thumbnailer(image)
+    return thumbnailer.get_thumbnail({
+        'crop': True,
+        'size': size
+    })
+
+
+def download_youtube_thumbnail(video_file):
+    """
+    Downloads the preview image of the video from YouTube and stores it as
+    square image in `thumbnail` of the video file.
+
+    Parameters
+    ----------
+    video_file : geokey.contributions.models.VideoFile
+        The video file
+
+    Returns
+    -------
+    Boolean
+        Indicating whether the image is available
+    """
+    try:
+        request = requests.get(
+            'http://img.youtube.com/vi/%s/0.jpg' % video_file.youtube_id,
+            stream=True,
+            timeout=DOWNLOAD_TIMEOUT
+        )
+    except requests.RequestException:
+        return False
+
+    if request.status_code != requests.codes.ok:
+        return False
+
+    lf = tempfile.NamedTemporaryFile()
+    # Read the streamed image in sections
+    for block in request.iter_content(1024 * 8):
+
+        # If no more file then stop
+        if not block:
+            break
+
+        # Write image block to temporary file
+        lf.write(block)
+
+    file_name = video_file.youtube_id + '.jpg'
+    video_file.thumbnail.save(file_name, files.File(lf))
+
+    from PIL import Image
+
+    w, h = Image.open(video_file.thumbnail).size
+
+    thumb = get_thumbnail(video_file.thumbnail, size=(h, h))
+    video_file.thumbnail.save(file_name, thumb)
+    return True
+
+
+def generate_thumbnail(media_file):
+    """
+    Generates the thumbnail of the media file and stores its URL in
+    `thumbnail_url`. Audio files have no thumbnail; the thumbnail of a video
+    can only be generated once YouTube has processed the video. Failed
+    attempts are counted in `thumbnail_attempts`.
+
+    Parameters
+    ----------
+    media_file : geokey.contributions.models.MediaFile
+        The media file, an instance of one of the child classes
+
+    Returns
+    -------
+    str
+        The URL of the thumbnail; an empty string if the image is broken, or
+        None if no thumbnail is available
+    """
+    url = None
+
+    if media_file.type_name == 'ImageFile':
+        # Some of the imported image files in the original community maps
+        # seem to be broken. The error thrown when the image can not be
+        # read is caught here.
+        try:
+            url = get_thumbnail(media_file.image).url
+        except (IOError, InvalidImageFormatError):
+            url = ''
+
+    elif media_file.type_name == 'VideoFile':
+        if media_file.thumbnail or download_youtube_thumbnail(media_file):
+            url = get_thumbnail(media_file.thumbnail).url
+
+    if url is not None:
+        media_file.thumbnail_url = url
+        media_file.save(update_fields=['thumbnail_url'])
+    else:
+        media_file.thumbnail_attempts += 1
+        media_file.save(update_fields=['thumbnail_attempts'])
+
+    return url
+
+
+def get_thumbnail_url(media_file):
+    """
+    Returns the stored URL of the thumbnail of the media file, or the
+    placeholder if no thumbnail has been generated yet.
+
+    Parameters
+    ----------
+    media_file : geokey.contributions.models.MediaFile
+        The media file, an instance of one of the child classes
+
+    Returns
+    -------
+    str
+        The URL to embed the thumbnail on client side
+    """
+    if media_file.thumbnail_url is not None:
+        return media_file.thumbnail_url
+
+    return PLACEHOLDER_URL
@@ -0,0 +1,200 @@
+"""Tiles for contributions."""
+
+import re
+
+from math import atan, degrees, pi, sinh
+
+from django.db import connection
+
+from geokey.core.exceptions import MalformedRequestData
+
+
+MAX_ZOOM = 22
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+WEB_MERCATOR_MAX = 20037508.342789244
+CLUSTER_CELLS_PER_TILE = 4
+DEFAULT_CLUSTER_COUNT = 50
+MAX_CLUSTER_COUNT = 1000
+MIN_POSTGIS_VERSION = (2, 4)
+
+_vector_tiles_supported = None
+
+
+def validate_tile(zoom, x, y):
+    """
+    Validates the tile coordinates.
+
+    Parameters
+    ----------
+    zoom : int
+        Zoom level of the tile
+    x : int
+        Column of the tile
+    y : int
+        Row of the tile
+
+    Returns
+    -------
+    tuple
+        zoom, x and y as integers
+
+    Raises
+    ------
+    MalformedRequestData
+        If the tile does not exist
+    """
+    zoom, x, y = int(zoom), int(x), int(y)
+
+    # The zoom is checked first, so that the size of the grid stays small
+    if zoom > MAX_ZOOM or x >= 2 ** zoom or y >= 2 ** zoom:
+        raise MalformedRequestData(
+            'The tile %s/%s/%s does not exist.' % (zoom, x, y))
+
+    return zoom, x, y
+
+
+def supports_vector_tiles():
+    """
+    Returns whether the database can encode vector tiles, which requires
+    PostGIS 2.4 or later.
+
+    Returns
+    -------
+    Boolean
+        Indicating whether vector tiles are supported
+    """
+    global _vector_tiles_supported
+
+    if _vector_tiles_supported is None:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT PostGIS_Lib_Version()')
+            version = cursor.fetchone()[0]
+
+        numbers = tuple(
+            int(number) for number in re.findall(r'\d+', version)[:2])
+        _vector_tiles_supported = numbers >= MIN_POSTGIS_VERSION
+
+    return _vector_tiles_supported
+
+
+def get_tile_bbox(zoom, x, y):
+    """
+    Returns the bounding box of the tile in WGS84 coordinates.
+
+    Parameters
+    ----------
+    zoom : int
+        Zoom level of the tile
+    x : int
+        Column of the tile
+    y : int
+        Row of the tile
+
+    Returns
+    -------
+    str
+        xmin,ymin,xmax,ymax as accepted by ObservationQuerySet.get_by_bbox
+    """
+    size = 2.0 ** zoom
+
+    def latitude(row):
+        return degrees(atan(sinh(pi * (1 - 2 * row / size))))
+
+    return '%s,%s,%s,%s' % (
+        x / size * 360.0 - 180.0,
+        latitude(y + 1),
+        (x + 1) / size * 360.0 - 180.0,
+        latitude(y)
+    )
+
+
+def get_tile_envelope(zoom, x, y):
+    """
+    Returns the bounds of the tile in Web Mercator (EPSG:3857) coordinates.
+
+    Parameters
+    ----------
+    zoom : int
+        Zoom level of the tile
+    x : int
+        Column of the tile
+    y : int
+        Row of the tile
+
+    Returns
+    -------
+    tuple
+        xmin, ymin, xmax, ymax
+    """
+    tile_size = 2 * WEB_MERCATOR_MAX / (2 ** zoom)
+
+    return (
+        -WEB_MERCATOR_MAX + x * tile_size,
+        WEB_MERCATOR_MAX - (y + 1) * tile_size,
+        -WEB_MERCATOR_MAX + (x + 1) * tile_size,
+        WEB_MERCATOR_MAX - y * tile_size
+    )
+
+
+def validate_clusters(zoom, method=None, k=None):
+    """
+    Validates the parameters used to cluster contributions.
+
+    Parameters
+    ----------
+    zoom : str or int
+        Zoom level the clusters are shown on
+    method : str
+        `grid` (default) or `kmeans`
+    k : str or int
+        Number of clusters for `kmeans`
+
+    Returns
+    -------
+    tuple
+        zoom, method and k
+
+    Raises
+    ------
+    MalformedRequestData
+        If any of the parameters is invalid
+    """
+    try:
+        zoom = int(zoom)
+        k = int(k) if k else DEFAULT_CLUSTER_COUNT
+    except (TypeError, ValueError):
+        raise MalformedRequestData('Zoom and k must be integers.')
+
+    if zoom < 0 or zoom > MAX_ZOOM:
+        raise MalformedRequestData(
+            'The zoom must be between 0 and %s.' % MAX_ZOOM)
+
+    if k < 1 or k > MAX_CLUSTER_COUNT:
+        raise MalformedRequestData(
+            'k must be between 1 and %s.' % MAX_CLUSTER_COUNT)
+
+    method = method or 'grid'
+    if method not in ['grid', 'kmeans']:
+        raise MalformedRequestData(
+            'The clustering method must be `grid` or `kmeans`.')
+
+    return zoom, method, k
+
+
+def get_cluster_grid_size(zoom):
+    """
+    Returns the size of grid cells used to cluster points on the zoom level.
+    Each tile is split into `CLUSTER_CELLS_PER_TILE` columns and rows.
+
+    Parameters
+    ----------
+    zoom : int
+        Zoom level the clusters are shown on
+
+    Returns
+    -------
+    float
+        Width and height of a grid cell in degrees
+    """
+    return 360.0 / (2 ** zoom) / CLUSTER_CELLS_PER_TILE
@@ -0,0 +1,230 @@
+"""Transcoding of audio files."""
+
+import os
+import re
+import logging
+import tempfile
+import subprocess
+
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+
+from .base import MEDIA_STATUS
+
+
+logger = logging.getLogger(__name__)
+
+VIDEO_STREAM = re.compile(r"Stream #\d*\.\d*.*\:\s*Video", re.MULTILINE)
+
+
+def get_encoder():
+    """
+    Returns the path of the encoder used to probe and convert audio files,
+    configured by `AUDIO_ENCODER`.
+
+    Returns
+    -------
+    str
+        Path of the encoder binary, `avconv` by default
+    """
+    return getattr(settings, 'AUDIO_ENCODER', 'avconv')
+
+
+def get_concurrency():
+    """
+    Returns the number of files converted at the same time, configured by
+    `AUDIO_TRANSCODING_CONCURRENCY`.
+
+    Returns
+    -------
+    int
+        Number of concurrent conversions
+    """
+    return max(getattr(settings, 'AUDIO_TRANSCODING_CONCURRENCY', 2), 1)
+
+
+def run_encoder(*arguments):
+    """
+    Runs the encoder with the arguments provided.
+
+    Parameters
+    ----------
+    *arguments : str
+        Arguments of the encoder
+
+    Returns
+    -------
+    int, str
+        Return code and error output of the encoder
+    """
+    cmd = [get_encoder()] + list(arguments)
+    pipe = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    output, error = pipe.communicate()
+    return pipe.returncode, error
+
+
+def has_video_stream(path):
+    """
+    Returns whether the 3gpp/3gpp2 file contains a video stream, i.e. it is
+    a video rather than an audio recording.
+
+    Parameters
+    ----------
+    path : str
+        Path to the file
+
+    Returns
+    -------
+    Boolean
+        Indicating whether the file contains a video stream
+    """
+    # Using error because output file is not specified
+    returncode, error = run_encoder('-i', path)
+    return VIDEO_STREAM.search(error) is not None
+
+
+def convert_audio(path):
+    """
+    Converts the audio file to mp3.
+
+    Parameters
+    ----------
+    path : str
+        Path to the file
+
+    Returns
+    -------
+    str
+        Path to the converted file, or None if the conversion failed
+    """
+    handle, converted = tempfile.mkstemp(suffix='.mp3')
+    os.close(handle)
+
+    try:
+        returncode, error = run_encoder(
+            '-nostats', '-loglevel', '0', '-y', '-i', path,
+            '-c:a', 'libmp3lame', '-q:a', '4', '-ar', '44100', converted
+        )
+    except Exception as error:
+        returncode = None
+
+    if returncode == 0 and os.path.getsize(converted) > 0:
+        return converted
+
+    logger.error('Converting %s failed: %s', path, error)
+    os.remove(converted)
+    return None
+
+
+def finish(audio_file, converted):
+    """
+    Replaces the uploaded file with the converted file and activates the
+    audio file. If the conversion failed, the uploaded file is kept. Files
+    deleted during the conversion are left unchanged. The uploaded file is
+    only removed from the storage once the audio file has been activated.
+
+    Parameters
+    ----------
+    audio_file : geokey.contributions.models.AudioFile
+        The audio file being processed
+    converted : str
+        Path to the converted file, or None if the conversion failed
+    """
+    from geokey.contributions.models import MediaFile
+
+    uploaded = audio_file.audio.name
+    storage = audio_file.audio.storage
+
+    try:
+        with transaction.atomic():
+            status = MediaFile._base_manager.select_for_update().filter(
+                pk=audio_file.id).values_list('status', flat=True).first()
+
+            if status == MEDIA_STATUS.processing:
+                if converted is not None:
+                    filename = os.path.splitext(os.path.basename(uploaded))[0]
+
+                    with open(converted, 'rb') as the_file:
+                        audio_file.audio.save(
+                            '%s.mp3' % filename,
+                            File(the_file),
+                            save=False
+                        )
+
+                audio_file.activate()
+    except Exception:
+        # Keep the uploaded file, the converted file is not referenced
+        if audio_file.audio.name != uploaded:
+            storage.delete(audio_file.audio.name)
+        raise
+    finally:
+        if converted is not None:
+            os.remove(converted)
+
+    if audio_file.audio.name != uploaded:
+        storage.delete(uploaded)
+
+
+def fail(audio_file):
+    """
+    Marks the audio file as deleted after processing it failed, so that it
+    is not processed again. The uploaded file is kept in the storage.
+
+    Parameters
+    ----------
+    audio_file : geokey.contributions.models.AudioFile
+        The audio file that could not be processed
+    """
+    from geokey.contributions.models import MediaFile
+
+    MediaFile._base_manager.filter(
+        pk=audio_file.id,
+        status=MEDIA_STATUS.processing
+    ).update(status=MEDIA_STATUS.deleted)
+
+
+def transcode(audio_files, concurrency=None):
+    """
+    Converts the audio files to mp3 and activates them. The encoder runs for
+    up to `concurrency` files at the same time. Files that can not be
+    activated are marked as deleted and the remaining files are processed.
+
+    Parameters
+    ----------
+    audio_files : list
+        Audio files that are processed
+    concurrency : int
+        Number of concurrent conversions, `AUDIO_TRANSCODING_CONCURRENCY` by
+        default
+
+    Returns
+    -------
+    int
+        Number of files processed
+    """
+    audio_files = list(audio_files)
+    if not audio_files:
+        return 0
+
+    pool = ThreadPool(concurrency or get_concurrency())
+    try:
+        paths = [audio_file.audio.path for audio_file in audio_files]
+        for index, converted in enumerate(pool.imap(convert_audio, paths)):
+            try:
+                finish(audio_files[index], converted)
+            except Exception:
+                logger.exception(
+                    'Activating audio file %s failed', audio_files[index].id)
+                fail(audio_files[index])
+    finally:
+        pool.close()
+        pool.join()
+
+    return len(audio_files)
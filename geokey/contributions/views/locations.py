@@ -1,7 +1,5 @@
 """Views for locations of contributions."""
 
-from django.db.models import Q
-
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -47,7 +45,9 @@ class LocationsAPIView(LocationAbstractAPIView):
         Handle GET request.
 
         Return a list of all locations of the project, that can be used for
-        contributions.
+        contributions. If `query` is passed, only locations with matching name
+        or description are returned; with `ranked=true` also similar ones,
+        ordered by similarity.
 
         Parameters
         ----------
@@ -68,10 +68,10 @@ class LocationsAPIView(LocationAbstractAPIView):
         )
 
         if query:
-            query = query.lower()
-            locations = locations.filter(
-                Q(name__icontains=query) | Q(description__icontains=query)
-            )
+            if request.GET.get('ranked') == 'true':
+                locations = locations.search_ranked(query)
+            else:
+                locations = locations.search(query)
 
         serializer = LocationSerializer(locations, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -1,6 +1,13 @@
 """Views for observations of categories."""
 
+import json
+
+from iso8601 import parse_date
+from iso8601.iso8601 import ParseError
+
 from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
 from django.views.decorators.gzip import gzip_page
 
 from rest_framework import status
@@ -10,13 +17,24 @@ from rest_framework.views import APIView
 from geokey.core.decorators import handle_exceptions_for_ajax
 from geokey.users.models import User
 from geokey.projects.models import Project
-from geokey.core.exceptions import InputError
+from geokey.core.exceptions import InputError, MalformedRequestData
 
+from ..pagination import (
+    ContributionCursorPagination, SyncCursorPagination
+)
 from ..renderers.geojson import GeoJsonRenderer
 from ..parsers.geojson import GeoJsonParser
 
+from ..tiles import (
+    MIN_POSTGIS_VERSION, validate_tile, validate_clusters,
+    supports_vector_tiles
+)
 from .base import SingleAllContribution
-from ..serializers import ContributionSerializer
+from ..base import OBSERVATION_STATUS
+from ..models import Observation
+from ..serializers import (
+    ContributionSerializer, ContributionCollectionSerializer
+)
 
 
 class GZipView(object):
@@ -83,7 +101,12 @@ class ProjectObservations(GZipView, GeoJsonView):
         Handle GET request.
 
         Return a list of all contributions of the project accessible to the
-        user.
+        user. If `since` is passed, only contributions created, updated or
+        deleted after that date and time are returned (see `sync`). If
+        `limit` or `cursor` are passed, only one page of contributions is
+        returned, together with `next` and `previous` cursors. If
+        `stream=true` is passed, the contributions are fetched in chunks and
+        the response is streamed feature by feature.
 
         Parameters
         ----------
@@ -94,31 +117,378 @@ class ProjectObservations(GZipView, GeoJsonView):
 
         Returns
         -------
-        rest_framework.response.Respone
+        rest_framework.response.Respone or django.http.StreamingHttpResponse
             Contains the serialized contributions.
         """
         project = Project.objects.get_single(request.user, project_id)
+        since = self.get_since(request.GET.get('since'))
         try:
             contributions = project.get_all_contributions(
                 request.user,
                 search=request.GET.get('search'),
                 subset=request.GET.get('subset'),
-                bbox=request.GET.get('bbox')
-            ).select_related('location', 'creator', 'updator', 'category') 
+                bbox=request.GET.get('bbox'),
+                since=since
+            ).select_related('location', 'creator', 'updator', 'category')
         except InputError as e:
             return Response(e, status=status.HTTP_406_NOT_ACCEPTABLE)
+
+        context = {
+            'user': request.user,
+            'project': project,
+            'search': request.GET.get('search'),
+            'bbox': request.GET.get('bbox')
+        }
+
+        if since is not None:
+            return self.sync(
+                project,
+                contributions,
+                context,
+                since,
+                subset=request.GET.get('subset'),
+                limit=request.GET.get('limit'),
+                cursor=request.GET.get('cursor')
+            )
+
+        if request.GET.get('limit') or request.GET.get('cursor'):
+            return self.paginate(
+                contributions,
+                context,
+                request.GET.get('limit'),
+                request.GET.get('cursor')
+            )
+
+        if request.GET.get('stream') == 'true':
+            return self.stream(contributions, context)
+
         serializer = ContributionSerializer(
             contributions,
             many=True,
-            context={
-                'user': request.user,
-                'project': project,
-                'search': request.GET.get('search'),
-                'bbox': request.GET.get('bbox')
-            }
-        )  
+            context=context
+        )
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    def get_since(self, since):
+        """
+        Parses the `since` parameter.
+
+        Parameters
+        ----------
+        since : str
+            ISO 8601 date and time provided with the request.
+
+        Returns
+        -------
+        datetime.datetime
+            Date and time of the last sync, None if not provided.
+
+        Raises
+        ------
+        MalformedRequestData
+            If the date and time can not be parsed.
+        """
+        if not since:
+            return None
+
+        try:
+            return parse_date(since)
+        except ParseError:
+            raise MalformedRequestData('The value for since must be an ISO '
+                                       '8601 date and time.')
+
+    def sync(self, project, contributions, context, since, subset=None,
+             limit=None, cursor=None):
+        """
+        Returns the contributions changed since the last sync, oldest change
+        first. Contributions that were deleted, or changed so that they are
+        no longer returned to the user (e.g. moved to pending or out of the
+        search results), are included as tombstones with status `deleted`,
+        as long as the user could have received them with the last sync.
+
+        Changes are returned in pages of up to `limit` contributions. While
+        `next` is set, the same `since` should be requested again with `next`
+        as `cursor`. Once `next` is empty, `since` in the response is the
+        time of the latest change and should be used for the next sync.
+
+        Contributions that are hidden without being changed themselves, e.g.
+        because they expired or the permissions of the user changed, are not
+        reported; clients need to load all contributions again to notice.
+
+        Parameters
+        ----------
+        project : geokey.projects.models.Project
+            Project the contributions belong to.
+        contributions : django.db.models.query.QuerySet
+            Contributions changed since the last sync.
+        context : dict
+            Context for the serializer.
+        since : datetime.datetime
+            Date and time of the last sync.
+        subset : str
+            Identifies the subset the contributions are limited to.
+        limit : str
+            Maximum number of contributions on the page.
+        cursor : str
+            Cursor pointing at the page.
+
+        Returns
+        -------
+        rest_framework.response.Respone
+            Contains the serialized changes and the cursors.
+        """
+        pagination = SyncCursorPagination(limit=limit, cursor=cursor)
+
+        hidden = project.get_hidden_contributions(
+            context.get('user'), contributions, since, subset=subset)
+        changes = Observation.objects.including_deleted().filter(
+            Q(id__in=contributions.order_by().values('id')) |
+            Q(id__in=hidden.values('id'))
+        ).prefetch_related(None).select_related(
+            'location', 'creator', 'updator', 'category')
+
+        page = pagination.paginate_queryset(changes)
+        visible = set(contributions.filter(
+            id__in=[contribution.id for contribution in page]
+        ).order_by().values_list('id', flat=True))
+
+        for contribution in page:
+            if contribution.id not in visible:
+                # Only serialised as a tombstone, the status is not saved
+                contribution.status = OBSERVATION_STATUS.deleted
+
+        serializer = ContributionSerializer(page, many=True, context=context)
+        data = pagination.get_paginated_data(serializer.data)
+
+        if page and data.get('next') is None:
+            since = page[-1].updated_at
+
+        data['since'] = since.isoformat()
+        return Response(data, status=status.HTTP_200_OK)
+
+    def paginate(self, contributions, context, limit, cursor):
+        """
+        Returns a single page of contributions using keyset pagination on
+        `updated_at` and `id`.
+
+        Parameters
+        ----------
+        contributions : django.db.models.query.QuerySet
+            Contributions to be paginated.
+        context : dict
+            Context for the serializer.
+        limit : str
+            Maximum number of contributions on the page.
+        cursor : str
+            Cursor pointing at the page.
+
+        Returns
+        -------
+        rest_framework.response.Respone
+            Contains the serialized contributions and the cursors.
+        """
+        pagination = ContributionCursorPagination(limit=limit, cursor=cursor)
+        page = pagination.paginate_queryset(contributions)
+
+        serializer = ContributionSerializer(page, many=True, context=context)
+        return Response(
+            pagination.get_paginated_data(serializer.data),
+            status=status.HTTP_200_OK
+        )
+
+    def stream(self, contributions, context):
+        """
+        Streams contributions as a GeoJSON `FeatureCollection`. Contributions
+        are serialised one at a time while the response is being sent.
+
+        Parameters
+        ----------
+        contributions : django.db.models.query.QuerySet
+            Contributions to be streamed.
+        context : dict
+            Context for the serializer.
+
+        Returns
+        -------
+        django.http.StreamingHttpResponse
+            Streams the serialized contributions.
+        """
+        context['many'] = True
+        serializer = ContributionSerializer(context=context)
+        features = (
+            serializer.to_representation(contribution)
+            for contribution in contributions.iterate_in_chunks()
+        )
+
+        renderer = GeoJsonRenderer()
+        return StreamingHttpResponse(
+            renderer.render_stream(features),
+            content_type=renderer.media_type,
+            status=status.HTTP_200_OK
+        )
+
+
+class ProjectObservationsBulk(APIView):
+    """
+    Public API endpoint to add many new contributions to a project at once
+    /api/projects/:project_id/contributions/bulk/
+    """
+    @handle_exceptions_for_ajax
+    def post(self, request, project_id):
+        """
+        Adds all features of a GeoJSON FeatureCollection as new contributions
+        to a project. The contributions are only created if all features are
+        valid; otherwise the errors are returned for each invalid feature,
+        keyed by its position in the collection.
+
+        Parameters
+        ----------
+        request : rest_framework.request.Request
+            Represents the request
+        project_id : int
+            identifies the project in the data base
+
+        Returns
+        -------
+        rest_framework.response.Respone
+            Contains the IDs of the contributions created, in the order of the
+            features, or the errors
+        """
+        user = request.user
+        if user.is_anonymous():
+            user = User.objects.get(display_name='AnonymousUser')
+
+        project = Project.objects.as_contributor(request.user, project_id)
+        serializer = ContributionCollectionSerializer(
+            data=request.data, context={'user': user, 'project': project}
+        )
+
+        if not serializer.is_valid():
+            return Response(
+                {'errors': serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        observations = serializer.save()
+        return Response(
+            {'created': [observation.id for observation in observations]},
+            status=status.HTTP_201_CREATED
+        )
+
+
+class ProjectObservationsTile(GZipView, APIView):
+    """
+    Public API endpoint for vector tiles of contributions of a project
+    /api/projects/:project_id/contributions/tiles/:zoom/:x/:y.mvt
+    """
+    @gzip_page
+    @handle_exceptions_for_ajax
+    def get(self, request, project_id, zoom, x, y):
+        """
+        Handle GET request.
+
+        Return a Mapbox Vector Tile with all contributions of the project
+        accessible to the user that are located on the tile. Accepts the same
+        `search` and `subset` parameters as the list of contributions.
+
+        Parameters
+        ----------
+        request : rest_framework.request.Request
+            Represents the request.
+        project_id : int
+            Identifies the project in the database.
+        zoom : int
+            Zoom level of the tile.
+        x : int
+            Column of the tile.
+        y : int
+            Row of the tile.
+
+        Returns
+        -------
+        django.http.HttpResponse
+            Contains the encoded vector tile.
+        """
+        zoom, x, y = validate_tile(zoom, x, y)
+
+        if not supports_vector_tiles():
+            return Response(
+                {'error': 'Vector tiles require PostGIS %s.%s or later.' %
+                    MIN_POSTGIS_VERSION},
+                status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+
+        project = Project.objects.get_single(request.user, project_id)
+        contributions = project.get_all_contributions(
+            request.user,
+            search=request.GET.get('search'),
+            subset=request.GET.get('subset')
+        )
+
+        return HttpResponse(
+            contributions.get_vector_tile(zoom, x, y),
+            content_type='application/vnd.mapbox-vector-tile',
+            status=status.HTTP_200_OK
+        )
+
+
+class ProjectObservationsClusters(GZipView, APIView):
+    """
+    Public API endpoint for clusters of contributions of a project
+    /api/projects/:project_id/contributions/clusters/
+    """
+    @gzip_page
+    @handle_exceptions_for_ajax
+    def get(self, request, project_id):
+        """
+        Handle GET request.
+
+        Return the contributions of the project accessible to the user
+        grouped into clusters, each cluster as a point feature at the centroid
+        of its contributions with the number of contributions. Accepts `zoom`
+        (required), `method` (`grid` or `kmeans`), `k` (number of clusters for
+        `kmeans`) and the `search`, `subset` and `bbox` parameters of the
+        list of contributions.
+
+        Parameters
+        ----------
+        request : rest_framework.request.Request
+            Represents the request.
+        project_id : int
+            Identifies the project in the database.
+
+        Returns
+        -------
+        rest_framework.response.Respone
+            Contains the clusters as GeoJSON FeatureCollection.
+        """
+        zoom, method, k = validate_clusters(
+            request.GET.get('zoom'),
+            request.GET.get('method'),
+            request.GET.get('k')
+        )
+        project = Project.objects.get_single(request.user, project_id)
+        try:
+            contributions = project.get_all_contributions(
+                request.user,
+                search=request.GET.get('search'),
+                subset=request.GET.get('subset'),
+                bbox=request.GET.get('bbox')
+            )
+        except InputError as e:
+            return Response(e, status=status.HTTP_406_NOT_ACCEPTABLE)
+
+        clusters = contributions.get_clusters(zoom, method=method, k=k)
+
+        return Response({
+            'type': 'FeatureCollection',
+            'features': [{
+                'type': 'Feature',
+                'geometry': json.loads(cluster['centroid']),
+                'properties': {'count': cluster['count']}
+            } for cluster in clusters]
+        }, status=status.HTTP_200_OK)
+
 
 # ############################################################################
 #
@@ -0,0 +1,304 @@
+"""Compact historical records."""
+
+from django.conf import settings
+from django.db import models
+from django.db.models import Max
+from django.contrib.postgres.fields import ArrayField
+from django.utils.timezone import now
+
+from simple_history.manager import HistoryDescriptor, HistoryManager
+from simple_history.models import HistoricalRecords
+
+
+# Historical models storing compact records, see `CompactHistoricalRecords`
+compact_models = []
+
+
+def get_snapshot_interval():
+    """
+    Returns the number of revisions after which a full snapshot is stored in
+    `diff` mode, configured by `HISTORY_SNAPSHOT_INTERVAL`.
+
+    Returns
+    -------
+    int
+        Number of revisions
+    """
+    return max(getattr(settings, 'HISTORY_SNAPSHOT_INTERVAL', 20), 1)
+
+
+def is_diff_mode():
+    """
+    Returns whether only changed fields are stored in new historical records,
+    i.e. `HISTORY_MODE` is `diff`.
+
+    Returns
+    -------
+    Boolean
+        Indicating whether the `diff` mode is set
+    """
+    return getattr(settings, 'HISTORY_MODE', 'full') == 'diff'
+
+
+def get_blank(field):
+    """
+    Returns the value stored in a historical record instead of the value of
+    a field that has not changed.
+
+    Parameters
+    ----------
+    field : django.db.models.Field
+        Field of the historical model
+
+    Returns
+    -------
+    object
+        None, or the default of the field if it is not nullable
+    """
+    return None if field.null else field.get_default()
+
+
+def reconstruct(record, fields):
+    """
+    Returns the values of all fields at the revision of the record. Values
+    of compact fields not stored with the record are taken from the earlier
+    records, back to the last full snapshot.
+
+    Parameters
+    ----------
+    record : django.db.models.Model
+        Historical record
+    fields : list
+        Fields of the historical model copied from the original model
+
+    Returns
+    -------
+    dict
+        Values by attribute name
+    """
+    values = dict(
+        (field.attname, getattr(record, field.attname)) for field in fields)
+
+    if record.history_fields is None:
+        return values
+
+    missing = set(record.compact_fields) - set(record.history_fields)
+    if not missing:
+        return values
+
+    history_model = type(record)
+    pk_name = record.instance_type._meta.pk.attname
+    earlier = history_model.objects.filter(**{
+        pk_name: values[pk_name],
+        'history_id__lt': record.history_id
+    })
+    snapshot = earlier.filter(history_fields__isnull=True).aggregate(
+        snapshot=Max('history_id')).get('snapshot')
+
+    if snapshot is not None:
+        earlier = earlier.filter(history_id__gte=snapshot)
+
+    for older in earlier.order_by('-history_id'):
+        for name in list(missing):
+            if older.history_fields is None or name in older.history_fields:
+                values[name] = getattr(older, name)
+                missing.remove(name)
+
+        if not missing:
+            break
+
+    return values
+
+
+def compact(records, compact_fields, interval):
+    """
+    Converts the historical records of one object to compact records: full
+    snapshots are kept for the first record, for created and deleted objects
+    and every `interval` revisions; other records only keep the compact
+    fields that have changed. Compact records are converted back to full
+    snapshots where needed, so records can be compacted again.
+
+    Parameters
+    ----------
+    records : list
+        Historical records of the object, ordered by `history_id`
+    compact_fields : list
+        Names of the compact fields
+    interval : int
+        Number of revisions after which a full snapshot is stored
+
+    Returns
+    -------
+    list
+        Records that have been changed and need to be saved
+    """
+    blanks = dict(
+        (name, get_blank(records[0]._meta.get_field(name)))
+        for name in compact_fields
+    ) if records else {}
+
+    changed = []
+    current = None
+    since_snapshot = 0
+
+    for record in records:
+        values = dict(current or {})
+        for name in compact_fields:
+            if record.history_fields is None or name in record.history_fields:
+                values[name] = getattr(record, name)
+
+        if (current is None or record.history_type != '~' or
+                since_snapshot >= interval - 1):
+            if record.history_fields is not None:
+                for name, value in values.items():
+                    setattr(record, name, value)
+                record.history_fields = None
+                changed.append(record)
+            since_snapshot = 0
+        else:
+            stored = [
+                name for name in compact_fields
+                if values[name] != current[name]
+            ]
+            if (record.history_fields is None or
+                    set(stored) != set(record.history_fields)):
+                for name in compact_fields:
+                    setattr(
+                        record, name,
+                        values[name] if name in stored else blanks[name])
+                record.history_fields = stored
+                changed.append(record)
+            since_snapshot += 1
+
+        current = values
+
+    return changed
+
+
+class CompactHistoryManager(HistoryManager):
+    """
+    Manager for historical records that reconstructs the values of compact
+    records.
+    """
+    def most_recent(self):
+        """
+        Returns the most recent copy of the instance available in the history.
+        """
+        if not self.instance:
+            raise TypeError("Can't use most_recent() without a %s instance." %
+                            self.model._meta.object_name)
+        try:
+            record = self.get_queryset().order_by('-history_id')[0]
+        except IndexError:
+            raise self.instance.DoesNotExist(
+                '%s has no historical record.' %
+                self.instance._meta.object_name)
+
+        return record.instance
+
+
+class CompactHistoryDescriptor(HistoryDescriptor):
+    """Returns the `CompactHistoryManager` for historical records."""
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return CompactHistoryManager(self.model)
+        return CompactHistoryManager(self.model, instance)
+
+
+class CompactHistoricalRecords(HistoricalRecords):
+    """
+    Historical records that can store only the changed values of large
+    fields. With `HISTORY_MODE` set to `diff`, a changed record stores the
+    compact fields that have changed since the previous revision, the other
+    compact fields are left blank; the names of the stored fields are kept
+    in `history_fields`. Every `HISTORY_SNAPSHOT_INTERVAL` revisions, as well
+    as for created and deleted objects, a full snapshot is stored, which has
+    no `history_fields`. All other fields are always stored.
+
+    `instance` and `history_object` of a record, and therefore `as_of` and
+    `most_recent`, reconstruct the full object from the last snapshot.
+
+    Parameters
+    ----------
+    compact_fields : list
+        Names of the fields that are only stored when they change
+    """
+    def __init__(self, compact_fields, **kwargs):
+        super(CompactHistoricalRecords, self).__init__(**kwargs)
+        self.compact_fields = tuple(compact_fields)
+
+    def finalize(self, sender, **kwargs):
+        super(CompactHistoricalRecords, self).finalize(sender, **kwargs)
+
+        if sender is self.cls:
+            history_model = getattr(sender, self.manager_name).model
+            setattr(
+                sender,
+                self.manager_name,
+                CompactHistoryDescriptor(history_model)
+            )
+            models.signals.pre_save.connect(
+                self.pre_save, sender=sender, weak=False)
+            compact_models.append(history_model)
+
+    def get_extra_fields(self, model, fields):
+        extra = super(CompactHistoricalRecords, self).get_extra_fields(
+            model, fields)
+        copied = list(fields.values())
+
+        def get_instance(record):
+            return model(**reconstruct(record, copied))
+
+        extra.update({
+            'history_fields': ArrayField(
+                models.CharField(max_length=100), null=True, blank=True),
+            'compact_fields': self.compact_fields,
+            'instance': property(get_instance),
+            'history_object': property(get_instance)
+        })
+        return extra
+
+    def pre_save(self, instance, **kwargs):
+        """
+        Loads the values of the compact fields before the instance is saved,
+        in `diff` mode.
+        """
+        if is_diff_mode() and instance.pk is not None:
+            instance._history_previous = type(instance)._base_manager.filter(
+                pk=instance.pk).values(*self.compact_fields).first()
+
+    def create_historical_record(self, instance, history_type):
+        previous = instance.__dict__.pop('_history_previous', None)
+        manager = getattr(instance, self.manager_name)
+
+        if history_type == '~' and previous is not None:
+            interval = get_snapshot_interval()
+            recent = manager.order_by('-history_id').values_list(
+                'history_fields', flat=True)[:interval - 1]
+
+            if interval > 1 and None in list(recent):
+                stored = [
+                    name for name in self.compact_fields
+                    if getattr(instance, name) != previous[name]
+                ]
+
+                attrs = {}
+                for field in instance._meta.fields:
+                    attrs[field.attname] = getattr(instance, field.attname)
+                for name in self.compact_fields:
+                    if name not in stored:
+                        attrs[name] = get_blank(
+                            manager.model._meta.get_field(name))
+
+                manager.create(
+                    history_date=getattr(instance, '_history_date', now()),
+                    history_type=history_type,
+                    history_user=self.get_history_user(instance),
+                    history_fields=stored,
+                    **attrs
+                )
+                return
+
+        super(CompactHistoricalRecords, self).create_historical_record(
+            instance, history_type)
@@ -0,0 +1,116 @@
+"""Command `archive_logs`."""
+
+import os
+import gzip
+import json
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from geokey.core.models import LoggerHistory
+from geokey.core.serializers import LoggerHistorySerializer
+
+
+class Command(BaseCommand):
+    """
+    A command to archive and delete old logs. Logs older than the retention
+    period are written to a compressed JSON lines file, one log per line, and
+    deleted in batches, so that the table does not grow without bound.
+    """
+
+    help = 'Archives and deletes logs older than the retention period.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            help='Number of days logs are kept, LOGGER_RETENTION_DAYS by '
+                 'default.')
+        parser.add_argument(
+            '--directory',
+            help='Directory the archive is written to, LOGGER_ARCHIVE_DIR '
+                 'by default.')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Number of logs archived and deleted at once.')
+        parser.add_argument(
+            '--no-archive', action='store_true', default=False,
+            help='Deletes old logs without archiving them.')
+
+    def get_path(self, directory, cutoff):
+        """Returns the path of a new archive file in the directory."""
+        if not os.path.isdir(directory):
+            raise CommandError('The directory %s does not exist.' % directory)
+
+        return os.path.join(directory, 'logs-%s-%s.jsonl.gz' % (
+            cutoff.strftime('%Y%m%d'),
+            timezone.now().strftime('%Y%m%d%H%M%S')
+        ))
+
+    def archive(self, logs, archive):
+        """Writes the logs to the archive, one JSON object per line."""
+        for log in LoggerHistorySerializer(logs, many=True).data:
+            archive.write(json.dumps(log))
+            archive.write('\n')
+
+        # The logs are deleted next, make sure they are on disk first
+        archive.flush()
+        os.fsync(archive.fileno())
+
+    def handle(self, *args, **options):
+        days = options.get('days')
+        if days is None:
+            days = getattr(settings, 'LOGGER_RETENTION_DAYS', None)
+
+        if days is None:
+            self.stdout.write('No retention period set, logs are kept.')
+            return
+
+        batch_size = options.get('batch_size')
+        if days < 0 or batch_size < 1:
+            raise CommandError(
+                'The number of days and the batch size must be positive.')
+
+        cutoff = timezone.now() - timedelta(days=days)
+        logs = LoggerHistory.objects.filter(created__lt=cutoff).order_by('id')
+
+        archive = None
+        if not options.get('no_archive'):
+            directory = options.get('directory') or getattr(
+                settings, 'LOGGER_ARCHIVE_DIR', None)
+
+            if not directory:
+                raise CommandError(
+                    'Set the directory for the archive or use --no-archive.')
+
+            path = self.get_path(directory, cutoff)
+            archive = gzip.open(path, 'wb')
+
+        deleted = 0
+        try:
+            while True:
+                batch = list(logs[:batch_size])
+                if not batch:
+                    break
+
+                if archive is not None:
+                    self.archive(batch, archive)
+
+                with transaction.atomic():
+                    LoggerHistory.objects.filter(
+                        id__in=[log.id for log in batch]).delete()
+
+                deleted += len(batch)
+                self.stdout.write('Deleted %s logs.' % deleted)
+        finally:
+            if archive is not None:
+                archive.close()
+
+                if deleted == 0:
+                    os.remove(path)
+
+        self.stdout.write('Deleted %s logs created before %s.' % (
+            deleted, cutoff.isoformat()))
@@ -0,0 +1,82 @@
+"""Command `compact_history`."""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from geokey.core.history import (
+    compact_models, compact, get_snapshot_interval
+)
+
+
+class Command(BaseCommand):
+    """
+    A command to convert existing historical records to compact records,
+    which only store the compact fields that have changed, with a full
+    snapshot every `HISTORY_SNAPSHOT_INTERVAL` revisions. Objects are
+    processed in batches, each in one transaction; the command can be
+    stopped and run again.
+    """
+
+    help = 'Stores only changed values in historical records.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of objects of which records are compacted at once.')
+        parser.add_argument(
+            '--interval', type=int,
+            help='Number of revisions after which a full snapshot is kept, '
+                 'HISTORY_SNAPSHOT_INTERVAL by default.')
+
+    def compact_model(self, history_model, batch_size, interval):
+        """Compacts the records of all objects of the historical model."""
+        pk_name = history_model.instance_type._meta.pk.attname
+        objects = history_model.objects.order_by(pk_name).values_list(
+            pk_name, flat=True).distinct()
+
+        compacted = 0
+        last = None
+
+        while True:
+            batch = objects if last is None else objects.filter(
+                **{'%s__gt' % pk_name: last})
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+
+            with transaction.atomic():
+                records = {}
+                for record in history_model.objects.filter(**{
+                        '%s__in' % pk_name: batch}).order_by('history_id'):
+                    records.setdefault(
+                        getattr(record, pk_name), []).append(record)
+
+                for pk in batch:
+                    changed = compact(
+                        records.get(pk, []),
+                        history_model.compact_fields,
+                        interval
+                    )
+
+                    for record in changed:
+                        record.save(
+                            update_fields=list(history_model.compact_fields) +
+                            ['history_fields'])
+
+                    compacted += len(changed)
+
+            last = batch[-1]
+
+        self.stdout.write('Compacted %s records of %s.' % (
+            compacted, history_model._meta.verbose_name_plural))
+
+    def handle(self, *args, **options):
+        batch_size = options.get('batch_size')
+        interval = options.get('interval') or get_snapshot_interval()
+
+        if batch_size < 1 or interval < 1:
+            raise CommandError(
+                'The batch size and the interval must be positive.')
+
+        for history_model in compact_models:
+            self.compact_model(history_model, batch_size, interval)
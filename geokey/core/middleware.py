@@ -1,6 +1,8 @@
 """Core middleware."""
 # https://gist.github.com/barrabinfc/426829
 
+import threading
+
 from django import http
 from django.db import connection
 
@@ -58,15 +60,47 @@ class TerminalLogging(object):
 
 class RequestProvider(object):
     def __init__(self):
-        self._request = None
+        # The middleware instance is shared by all threads serving requests
+        self._local = threading.local()
         request_accessor.connect(self)
 
+    def is_atomic(self, view_func):
+        """Return whether the view runs in a transaction (ATOMIC_REQUESTS)."""
+        non_atomic = getattr(view_func, '_non_atomic_requests', set())
+        return bool(connection.settings_dict.get('ATOMIC_REQUESTS') and
+                    connection.alias not in non_atomic)
+
     def process_view(self, request, view_func, view_args, view_kwargs):
-        self._request = request
+        self._local.request = request
+        request._atomic_view = self.is_atomic(view_func)
+        return None
+
+    def process_exception(self, request, exception):
+        # The exception left the transaction of the view, which has been
+        # rolled back
+        from .models import discard_logs
+        if getattr(request, '_atomic_view', False):
+            discard_logs(request)
         return None
 
+    def process_response(self, request, response):
+        # Save logs deferred while handling the request, unless the
+        # transaction of the view has been rolled back; REST framework rolls
+        # back when it turns an exception into the response
+        from .models import flush_logs, discard_logs
+        if (getattr(request, '_atomic_view', False) and
+                getattr(response, 'exception', False)):
+            discard_logs(request)
+        else:
+            flush_logs(request)
+
+        # Do not keep the request (and anything memoized on it) around once
+        # it has been answered
+        self._local.request = None
+        return response
+
     def __call__(self, **kwargs):
-        return self._request
+        return getattr(self._local, 'request', None)
 
 
 def show_debug_toolbar(request):
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loggerhistory',
+            name='project_id',
+            field=models.IntegerField(null=True, blank=True),
+        ),
+        migrations.RunSQL(
+            ["UPDATE core_loggerhistory "
+             "SET project_id = (project -> 'id')::integer "
+             "WHERE project -> 'id' ~ '^[0-9]+$'"],
+            []
+        ),
+        migrations.AlterIndexTogether(
+            name='loggerhistory',
+            index_together=set([('project_id', 'id')]),
+        ),
+    ]
@@ -22,21 +22,46 @@ class FilterMixin(object):
                 if field_filter:
                     self.save()
 
-    def save(self, *args, **kwargs):
-        """Overwrite `save` to implement integrity ensurance."""
-        self.where_clause = None
+    def get_where(self):
+        """
+        Return the compiled filter.
 
-        if self.filters is not None:
-            queries = []
+        Returns
+        -------
+        tuple
+            SQL where clause, with placeholders for all values, and the list
+            of values. The where clause is `None` if there is no filter.
+        """
+        return self.where_clause, self.where_params or []
 
-            for key in self.filters:
-                category = self.project.categories.get(pk=key)
-                queries.append(category.get_query(self.filters[key]))
+    def compile_filters(self):
+        """
+        Compile the filters to an SQL where clause.
 
-            if len(queries) > 0:
-                query = ' OR '.join(queries)
-                self.where_clause = query
-            else:
-                self.where_clause = 'FALSE'
+        Returns
+        -------
+        tuple
+            SQL where clause, with placeholders for all values, and the list
+            of values. Both are `None` if there are no filters.
+        """
+        if self.filters is None:
+            return None, None
 
+        queries = []
+        params = []
+
+        for key in self.filters:
+            category = self.project.categories.get(pk=key)
+            query, query_params = category.get_query(self.filters[key])
+            queries.append(query)
+            params.extend(query_params)
+
+        if len(queries) > 0:
+            return ' OR '.join(queries), params
+        else:
+            return 'FALSE', params
+
+    def save(self, *args, **kwargs):
+        """Overwrite `save` to implement integrity ensurance."""
+        self.where_clause, self.where_params = self.compile_filters()
         super(FilterMixin, self).save(*args, **kwargs)
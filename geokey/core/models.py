@@ -6,6 +6,8 @@ from django.db.models.signals import (
     post_delete,
     m2m_changed,
 )
+from django.db import models
+from django.conf import settings
 from django.dispatch import receiver
 from django.contrib.postgres.fields import HStoreField
 
@@ -31,6 +33,10 @@ class LoggerHistory(TimeStampedModel):
     subset = HStoreField(null=True, blank=True)
     action = HStoreField(null=True, blank=True)
     historical = HStoreField(null=True, blank=True)
+    project_id = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        index_together = [['project_id', 'id']]
 
 
 def get_class_name(instance_class):
@@ -148,6 +154,10 @@ def generate_log(sender, instance, action):
 
         setattr(log, field, value)
 
+    # Project is also stored as an indexed column, used to query its logs
+    if 'project' in fields:
+        log.project_id = fields['project'].id
+
     return log
 
 
@@ -214,6 +224,40 @@ def cross_check_fields(new_instance, old_instance):
     return changed_fields
 
 
+def save_logs(logs):
+    """
+    Save logs. When `LOGGER_DEFERRED` is enabled, logs created while
+    handling a request are collected on the request and saved at once when
+    the response is returned (see `flush_logs`); otherwise they are saved
+    straight away.
+    """
+    if not logs:
+        return
+
+    request = get_request()
+    if getattr(settings, 'LOGGER_DEFERRED', False) and request is not None:
+        if not hasattr(request, '_logs'):
+            request._logs = []
+        request._logs.extend(logs)
+    elif len(logs) == 1:
+        logs[0].save()
+    else:
+        LoggerHistory.objects.bulk_create(logs)
+
+
+def flush_logs(request):
+    """Save all logs collected on the request with one query."""
+    logs = getattr(request, '_logs', None)
+    if logs:
+        request._logs = []
+        LoggerHistory.objects.bulk_create(logs)
+
+
+def discard_logs(request):
+    """Drop all logs collected on the request without saving them."""
+    request._logs = []
+
+
 @receiver(pre_save)
 def logs_on_pre_save(sender, instance, **kwargs):
     """Initiate logs when instance get updated."""
@@ -221,10 +265,12 @@ def logs_on_pre_save(sender, instance, **kwargs):
         logs = []
 
         try:
-            old_instance = sender.objects.get(pk=instance.pk)
-            for field in cross_check_fields(instance, old_instance):
-                action = add_extra_info(field, instance)
-                logs.append(generate_log(sender, instance, action))
+            # New instances have nothing to compare against
+            if instance.pk is not None:
+                old_instance = sender.objects.get(pk=instance.pk)
+                for field in cross_check_fields(instance, old_instance):
+                    action = add_extra_info(field, instance)
+                    logs.append(generate_log(sender, instance, action))
         except sender.DoesNotExist:
             pass
 
@@ -256,10 +302,15 @@ def log_on_post_save(sender, instance, created, **kwargs):
             logs.append(generate_log(sender, instance, action))
         elif hasattr(instance, '_logs') and instance._logs is not None:
             logs = instance._logs
+            instance._logs = None
 
-        for log in logs:
-            log.historical = get_history(instance)
-            log.save()
+        if logs:
+            # All logs of one save refer to the same historical record
+            historical = get_history(instance)
+            for log in logs:
+                log.historical = historical
+
+        save_logs(logs)
 
 
 @receiver(post_delete)
@@ -270,19 +321,19 @@ def log_on_post_delete(sender, instance, **kwargs):
             'id': STATUS_ACTION.deleted,
             'class': get_class_name(sender),
         }, instance)
-        log = generate_log(sender, instance, action)
-        log.save()
+        save_logs([generate_log(sender, instance, action)])
 
 
 @receiver(m2m_changed)
 def log_on_m2m_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
     """Create a log when object is added to or removed from M2M relation."""
     if sender.__name__ in LOG_M2M_RELATIONS and 'post_' in action:
-        for pk in pk_set:
-            action = add_extra_info({
+        logs = []
+        for related in model.objects.filter(pk__in=pk_set):
+            log_action = add_extra_info({
                 'id': STATUS_ACTION.updated,
                 'class': sender.__name__,
                 'subaction': action.replace('post_', ''),
-            }, model.objects.get(pk=pk))
-            log = generate_log(sender, instance, action)
-            log.save()
+            }, related)
+            logs.append(generate_log(sender, instance, log_action))
+        save_logs(logs)
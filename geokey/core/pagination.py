@@ -0,0 +1,263 @@
+"""Keyset pagination."""
+
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+
+from django.db.models import Q
+
+from geokey.core.exceptions import MalformedRequestData
+
+
+class CursorPagination(object):
+    """
+    Base class for keyset pagination. Items are ordered by `ordering` and
+    each page is selected by comparing against the position stored in the
+    cursor, so no OFFSET is used and the index of the ordering is scanned
+    from the position of the cursor.
+
+    Subclasses define the ordering, how the position of an item is stored
+    in the cursor and which items follow or precede a position.
+
+    Cursors are opaque strings; clients should only pass on cursors that have
+    been returned as `next` or `previous` in an earlier response.
+    """
+    default_limit = 100
+    max_limit = 1000
+    ordering = ('-id',)
+    results_key = 'results'
+
+    def __init__(self, limit=None, cursor=None):
+        """
+        Initiates the pagination.
+
+        Parameters
+        ----------
+        limit : str or int
+            Maximum number of items on a page
+        cursor : str
+            Cursor as returned in `next` or `previous` of a previous page
+
+        Raises
+        ------
+        MalformedRequestData
+            If the limit or the cursor are invalid
+        """
+        self.limit = self.parse_limit(limit)
+        self.cursor = self.decode_cursor(cursor) if cursor else None
+        self.has_next = False
+        self.has_previous = False
+        self.page = []
+
+    def parse_limit(self, limit):
+        """
+        Returns the limit as integer.
+
+        Parameters
+        ----------
+        limit : str or int
+            Limit provided with the request
+
+        Returns
+        -------
+        int
+            Number of items on a page
+
+        Raises
+        ------
+        MalformedRequestData
+            If the limit is not a positive integer
+        """
+        if limit is None or limit == '':
+            return self.default_limit
+
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise MalformedRequestData('The limit must be an integer.')
+
+        if limit < 1:
+            raise MalformedRequestData('The limit must be greater than 0.')
+
+        return min(limit, self.max_limit)
+
+    def get_position(self, item):
+        """
+        Returns the values that identify the position of the item in the
+        ordering, as stored in the cursor.
+
+        Parameters
+        ----------
+        item : django.db.models.Model
+            Item on the page
+
+        Returns
+        -------
+        list
+            Values of the position as strings
+        """
+        return [str(item.id)]
+
+    def parse_position(self, values):
+        """
+        Returns the position stored in the cursor.
+
+        Parameters
+        ----------
+        values : list
+            Values of the position as strings
+
+        Returns
+        -------
+        tuple
+            The position
+
+        Raises
+        ------
+        ValueError
+            If the values do not describe a position
+        """
+        pk, = values
+        return (int(pk),)
+
+    def get_after(self, pk):
+        """
+        Returns the filter for items that follow the position.
+        """
+        return Q(id__lt=pk)
+
+    def get_before(self, pk):
+        """
+        Returns the filter for items that precede the position.
+        """
+        return Q(id__gt=pk)
+
+    def encode_cursor(self, direction, item):
+        """
+        Returns an opaque cursor pointing at the item.
+
+        Parameters
+        ----------
+        direction : str
+            `next` or `previous`
+        item : django.db.models.Model
+            Last (next) or first (previous) item on the page
+
+        Returns
+        -------
+        str
+            Encoded cursor
+        """
+        return urlsafe_b64encode(
+            '|'.join([direction[0]] + self.get_position(item)))
+
+    def decode_cursor(self, cursor):
+        """
+        Decodes the cursor.
+
+        Parameters
+        ----------
+        cursor : str
+            Encoded cursor
+
+        Returns
+        -------
+        tuple
+            Direction (`n` or `p`) and the position
+
+        Raises
+        ------
+        MalformedRequestData
+            If the cursor can not be decoded
+        """
+        try:
+            values = urlsafe_b64decode(str(cursor)).split('|')
+            direction = values.pop(0)
+
+            if direction not in ['n', 'p']:
+                raise ValueError()
+
+            return direction, self.parse_position(values)
+        except (TypeError, ValueError):
+            raise MalformedRequestData('The cursor is invalid.')
+
+    def paginate_queryset(self, queryset):
+        """
+        Returns the page of the queryset selected by the cursor.
+
+        Parameters
+        ----------
+        queryset : django.db.models.query.QuerySet
+            Items to be paginated
+
+        Returns
+        -------
+        list
+            Items on the page
+        """
+        forward = self.cursor is None or self.cursor[0] == 'n'
+
+        if self.cursor is None:
+            queryset = queryset.order_by(*self.ordering)
+        elif forward:
+            queryset = queryset.filter(
+                self.get_after(*self.cursor[1])
+            ).order_by(*self.ordering)
+        else:
+            queryset = queryset.filter(
+                self.get_before(*self.cursor[1])
+            ).order_by(*[
+                field[1:] if field.startswith('-') else '-' + field
+                for field in self.ordering
+            ])
+
+        page = list(queryset[:self.limit + 1])
+        has_more = len(page) > self.limit
+        page = page[:self.limit]
+
+        if forward:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        else:
+            page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+
+        self.page = page
+        return page
+
+    def get_paginated_data(self, data):
+        """
+        Adds the cursors to the serialised page.
+
+        Parameters
+        ----------
+        data : list
+            Serialised items of the page
+
+        Returns
+        -------
+        dict
+            Serialised page with `next` and `previous` cursors
+        """
+        next_cursor = None
+        if self.has_next and self.page:
+            next_cursor = self.encode_cursor('next', self.page[-1])
+
+        previous_cursor = None
+        if self.has_previous and self.page:
+            previous_cursor = self.encode_cursor('previous', self.page[0])
+
+        return {
+            self.results_key: data,
+            'next': next_cursor,
+            'previous': previous_cursor
+        }
+
+
+class LogCursorPagination(CursorPagination):
+    """
+    Keyset pagination for logs. Logs are ordered by `id` (descending), so the
+    latest logs come first and the index on `project_id` and `id` is used.
+    """
+    default_limit = 50
+    max_limit = 500
+    results_key = 'logs'
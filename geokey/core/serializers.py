@@ -2,6 +2,8 @@
 
 from rest_framework import serializers
 
+from .models import LoggerHistory
+
 
 class FieldSelectorSerializer(serializers.ModelSerializer):
     """
@@ -25,3 +27,17 @@ class FieldSelectorSerializer(serializers.ModelSerializer):
             existing = set(self.fields.keys())
             for field in existing - allowed:
                 self.fields.pop(field)
+
+
+class LoggerHistorySerializer(serializers.ModelSerializer):
+    """Serializer for event logs."""
+
+    class Meta:
+        """Serializer meta."""
+
+        model = LoggerHistory
+        fields = (
+            'id', 'created', 'user', 'project', 'usergroup', 'category',
+            'field', 'location', 'observation', 'comment', 'mediafile',
+            'subset', 'action', 'historical'
+        )
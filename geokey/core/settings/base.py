@@ -99,6 +99,50 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Caches; roles of users in projects are shared between requests using the
+# cache set in ROLE_CACHE, entries expire after ROLE_CACHE_TIMEOUT seconds.
+# Changed roles are invalidated in the cache straight away, but with a cache
+# local to each process, other processes may use the old roles until their
+# entries expire. When running several processes, use caches shared between
+# them (e.g. memcached) to be able to raise the timeout.
+# see: https://docs.djangoproject.com/en/1.8/topics/cache/
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'roles': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'geokey-roles',
+    }
+}
+ROLE_CACHE = 'roles'
+ROLE_CACHE_TIMEOUT = 10
+
+# Compiled category schemas are kept in each process; the version of a schema
+# is read from the database again after SCHEMA_VERSION_TTL seconds, so that
+# changes made in other processes are picked up.
+SCHEMA_VERSION_TTL = 5
+
+# Event logs are saved as soon as an object changes. With LOGGER_DEFERRED,
+# logs created while handling a request are collected and saved with one
+# query when the response is returned. Logs are only dropped when the view
+# runs in a transaction (ATOMIC_REQUESTS) that has been rolled back.
+LOGGER_DEFERRED = False
+
+# Event logs older than LOGGER_RETENTION_DAYS are archived as compressed JSON
+# lines files to LOGGER_ARCHIVE_DIR and deleted by the `archive_logs`
+# command, which runs daily. Logs are kept forever when it is None.
+LOGGER_RETENTION_DAYS = None
+LOGGER_ARCHIVE_DIR = None
+
+# Historical records of contributions copy all values with each revision.
+# With HISTORY_MODE set to 'diff', only the properties, search index and
+# display field that have changed are stored, with a full snapshot every
+# HISTORY_SNAPSHOT_INTERVAL revisions. Existing records are converted using
+# the `compact_history` command.
+HISTORY_MODE = 'full'
+HISTORY_SNAPSHOT_INTERVAL = 20
+
 # Avaiable message tags; for use with Django's messages Framework
 # see: https://docs.djangoproject.com/en/1.8/ref/settings/#message-tags
 MESSAGE_TAGS = {
@@ -172,6 +216,21 @@ TEMPLATES = [
 # endabled by overwriting in local settings
 ENABLE_VIDEO = False
 
+# Encoder used to convert 3gpp/3gpp2 audio uploads to mp3, and the number of
+# files converted at the same time by the `transcode_media` worker
+AUDIO_ENCODER = 'avconv'
+AUDIO_TRANSCODING_CONCURRENCY = 2
+
+# Thumbnails of media files are generated by the `generate_thumbnails` cron
+# job; files whose thumbnail could not be generated after
+# THUMBNAIL_MAX_ATTEMPTS runs are no longer attempted
+THUMBNAIL_MAX_ATTEMPTS = 24
+
 CRONJOBS = [
     ('*/5 * * * *', 'geokey.socialinteractions.utils.start2pull'),
+    ('0 3 * * *', 'django.core.management.call_command', ['archive_logs']),
+    ('*/10 * * * *', 'django.core.management.call_command',
+     ['update_filter_indexes']),
+    ('*/5 * * * *', 'django.core.management.call_command',
+     ['generate_thumbnails']),
 ]
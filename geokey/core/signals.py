@@ -21,9 +21,7 @@ request_accessor = RequestAccessorSignal()
 
 def get_request():
     """Get the current request."""
-    entry = request_accessor.send(None)
-    if entry:
-        entry = entry[0]
-        if entry:
-            return entry[1]
+    for receiver, request in request_accessor.send(None):
+        if request is not None:
+            return request
     return None
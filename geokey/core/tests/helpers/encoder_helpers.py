@@ -0,0 +1,36 @@
+"""Core encoder helpers."""
+
+import os
+import sys
+import stat
+import tempfile
+
+
+STUB = '''#!%(python)s
+import shutil
+import sys
+
+arguments = sys.argv[1:]
+if '-c:a' not in arguments:
+    sys.stderr.write('Stream #0.0: %(stream)s\\n')
+    sys.exit(1)
+if %(fail)s:
+    sys.exit(1)
+shutil.copy(arguments[arguments.index('-i') + 1], arguments[-1])
+'''
+
+
+def get_encoder_stub(video=False, fail=False):
+    """
+    Creates an executable that replaces avconv in tests. Probing reports an
+    audio or a video stream, converting copies the input file.
+    """
+    handle, path = tempfile.mkstemp(suffix='.py')
+    with os.fdopen(handle, 'w') as stub:
+        stub.write(STUB % {
+            'python': sys.executable,
+            'stream': 'Video: h263' if video else 'Audio: amrnb',
+            'fail': fail
+        })
+    os.chmod(path, stat.S_IRWXU)
+    return path
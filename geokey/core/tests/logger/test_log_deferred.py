@@ -0,0 +1,135 @@
+"""Tests for logger: deferred logs."""
+
+import threading
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.http import (
+    HttpRequest, HttpResponse, HttpResponseBadRequest
+)
+
+from geokey.core.models import LoggerHistory
+from geokey.core.middleware import RequestProvider
+from geokey.users.tests.model_factories import UserFactory
+from geokey.projects.tests.model_factories import ProjectFactory
+
+
+@override_settings(LOGGER_DEFERRED=True)
+class LogDeferredTest(TestCase):
+    """Test logs deferred to the end of the request."""
+
+    def setUp(self):
+        """Set up test."""
+        self.user = UserFactory.create()
+        self.project = ProjectFactory.create(**{'creator': self.user})
+
+        self.request = HttpRequest()
+        self.request.user = self.user
+        self.provider = RequestProvider()
+        self.provider.process_view(self.request, None, None, None)
+
+    def tearDown(self):
+        """Tear down test."""
+        self.provider.process_response(self.request, HttpResponse())
+
+    def test_log_flushed_with_response(self):
+        """Test when logs are saved once the response is returned."""
+        log_count_init = LoggerHistory.objects.count()
+
+        self.project.name = 'New name'
+        self.project.save()
+        self.project.isprivate = not self.project.isprivate
+        self.project.save()
+
+        self.assertEqual(LoggerHistory.objects.count(), log_count_init)
+        self.assertEqual(len(self.request._logs), 2)
+
+        with self.assertNumQueries(1):
+            self.provider.process_response(self.request, HttpResponse())
+
+        self.assertEqual(LoggerHistory.objects.count(), log_count_init + 2)
+        self.assertEqual(self.request._logs, [])
+
+        logs = LoggerHistory.objects.order_by('-id')[:2]
+        self.assertEqual(logs[1].action, {
+            'id': 'updated',
+            'class': 'Project',
+            'field': 'name'})
+        self.assertEqual(logs[0].action.get('field'), 'isprivate')
+        self.assertEqual(logs[0].user, {
+            'id': str(self.user.id),
+            'display_name': self.user.display_name})
+
+    def test_log_saved_without_request(self):
+        """Test when logs are saved straight away outside of requests."""
+        self.provider.process_response(self.request, HttpResponse())
+        log_count_init = LoggerHistory.objects.count()
+
+        self.project.name = 'New name'
+        self.project.save()
+
+        self.assertEqual(LoggerHistory.objects.count(), log_count_init + 1)
+
+    def test_log_flushed_with_error_response(self):
+        """Test when a view saves changes and then answers with an error."""
+        log_count_init = LoggerHistory.objects.count()
+        project = self.project
+
+        def view(request):
+            project.name = 'New name'
+            project.save()
+            return HttpResponseBadRequest()
+
+        self.provider.process_view(self.request, view, (), {})
+        response = view(self.request)
+        self.provider.process_response(self.request, response)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(LoggerHistory.objects.count(), log_count_init + 1)
+
+    def test_log_flushed_with_exception_outside_transaction(self):
+        """Test when the view raised an error without a transaction."""
+        log_count_init = LoggerHistory.objects.count()
+
+        self.project.name = 'New name'
+        self.project.save()
+
+        self.provider.process_exception(self.request, ValueError())
+        self.provider.process_response(self.request, HttpResponse())
+        self.assertEqual(LoggerHistory.objects.count(), log_count_init + 1)
+
+    def test_log_discarded_with_rollback(self):
+        """Test when logs are dropped because the transaction rolled back."""
+        log_count_init = LoggerHistory.objects.count()
+
+        connection.settings_dict['ATOMIC_REQUESTS'] = True
+        try:
+            self.provider.process_view(self.request, None, (), {})
+        finally:
+            connection.settings_dict['ATOMIC_REQUESTS'] = False
+
+        self.project.name = 'New name'
+        self.project.save()
+        self.provider.process_exception(self.request, ValueError())
+        self.assertEqual(self.request._logs, [])
+
+        self.project.name = 'Other name'
+        self.project.save()
+        response = HttpResponseBadRequest()
+        response.exception = True
+        self.provider.process_response(self.request, response)
+
+        self.assertEqual(LoggerHistory.objects.count(), log_count_init)
+
+    def test_request_not_shared_between_threads(self):
+        """Test when the request is only provided to its own thread."""
+        requests = []
+
+        thread = threading.Thread(target=lambda: requests.append(
+            self.provider()))
+        thread.start()
+        thread.join()
+
+        self.assertEqual(requests, [None])
+        self.assertIs(self.provider(), self.request)
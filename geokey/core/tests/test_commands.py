@@ -0,0 +1,100 @@
+"""Tests for core commands."""
+
+import os
+import gzip
+import json
+import shutil
+import tempfile
+
+from datetime import timedelta
+from StringIO import StringIO
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.core.management import call_command
+from django.utils import timezone
+
+from geokey.core.models import LoggerHistory
+
+
+class ArchiveLogsTest(TestCase):
+    """Test command archiving old logs."""
+
+    def setUp(self):
+        """Set up test."""
+        self.directory = tempfile.mkdtemp()
+
+        for x in range(0, 5):
+            LoggerHistory.objects.create(**{
+                'project': {'id': '1', 'name': 'Project'},
+                'action': {'id': 'updated', 'class': 'Project'},
+                'project_id': 1
+            })
+
+        self.old = list(LoggerHistory.objects.order_by('id')[:3])
+        LoggerHistory.objects.filter(
+            id__in=[log.id for log in self.old]
+        ).update(created=timezone.now() - timedelta(days=100))
+
+    def tearDown(self):
+        """Tear down test."""
+        shutil.rmtree(self.directory)
+
+    def call(self, **options):
+        """Helper to run the command."""
+        stdout = StringIO()
+        call_command('archive_logs', stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_archive_logs(self):
+        """Test when old logs are archived and deleted."""
+        count = LoggerHistory.objects.count()
+        self.call(days=30, directory=self.directory, batch_size=2)
+
+        self.assertEqual(LoggerHistory.objects.count(), count - 3)
+        self.assertFalse(LoggerHistory.objects.filter(
+            id__in=[log.id for log in self.old]).exists())
+
+        files = os.listdir(self.directory)
+        self.assertEqual(len(files), 1)
+
+        archive = gzip.open(os.path.join(self.directory, files[0]))
+        logs = [json.loads(line) for line in archive]
+        archive.close()
+
+        self.assertEqual(
+            [log.get('id') for log in logs], [log.id for log in self.old])
+        self.assertEqual(
+            logs[0].get('project'), {'id': '1', 'name': 'Project'})
+
+    def test_archive_without_old_logs(self):
+        """Test when there are no logs to archive."""
+        count = LoggerHistory.objects.count()
+        self.call(days=365, directory=self.directory)
+
+        self.assertEqual(LoggerHistory.objects.count(), count)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_delete_without_archive(self):
+        """Test when old logs are deleted without archiving them."""
+        count = LoggerHistory.objects.count()
+        self.call(days=30, no_archive=True)
+
+        self.assertEqual(LoggerHistory.objects.count(), count - 3)
+
+    @override_settings(LOGGER_RETENTION_DAYS=None)
+    def test_without_retention(self):
+        """Test when no retention period is set."""
+        count = LoggerHistory.objects.count()
+        output = self.call(directory=self.directory)
+
+        self.assertEqual(LoggerHistory.objects.count(), count)
+        self.assertIn('No retention period set', output)
+
+    @override_settings(LOGGER_RETENTION_DAYS=30)
+    def test_with_retention_setting(self):
+        """Test when the retention period is set in the settings."""
+        count = LoggerHistory.objects.count()
+        self.call(directory=self.directory)
+
+        self.assertEqual(LoggerHistory.objects.count(), count - 3)
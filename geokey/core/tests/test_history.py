@@ -0,0 +1,108 @@
+"""Tests for compact historical records."""
+
+from StringIO import StringIO
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.core.management import call_command
+
+from geokey.contributions.tests.model_factories import ObservationFactory
+
+
+class CompactHistoryTest(TestCase):
+    """Test historical records of observations."""
+
+    def update(self, observation, properties=None, status=None):
+        """Change and save the observation."""
+        if properties is not None:
+            observation.properties = properties
+        if status is not None:
+            observation.status = status
+        observation.save()
+
+    def make_changes(self, observation):
+        """Save the observation with five changes."""
+        self.update(observation, properties={'name': 'Oak', 'height': 2})
+        self.update(observation, status='pending')
+        self.update(observation, properties={'name': 'Oak', 'height': 3})
+        self.update(observation, status='active')
+        self.update(observation, properties={'name': 'Pine'})
+
+    def get_records(self, observation):
+        """Return the records of the observation in order."""
+        return list(observation.history.order_by('history_id'))
+
+    @override_settings(HISTORY_MODE='diff', HISTORY_SNAPSHOT_INTERVAL=3)
+    def test_store_changed_fields(self):
+        """Test storing only changed fields with periodic snapshots."""
+        observation = ObservationFactory.create(
+            properties={'name': 'Oak', 'height': 1})
+        self.make_changes(observation)
+
+        records = self.get_records(observation)
+        self.assertEqual(
+            [record.history_fields for record in records],
+            [None, ['properties'], [], None, [], ['properties']]
+        )
+        self.assertEqual(records[2].properties, {})
+        self.assertEqual(records[2].status, 'pending')
+
+        self.assertEqual(
+            [record.instance.properties for record in records],
+            [
+                {'name': 'Oak', 'height': 1},
+                {'name': 'Oak', 'height': 2},
+                {'name': 'Oak', 'height': 2},
+                {'name': 'Oak', 'height': 3},
+                {'name': 'Oak', 'height': 3},
+                {'name': 'Pine'}
+            ]
+        )
+        self.assertEqual(records[2].instance.status, 'pending')
+        self.assertEqual(
+            observation.history.most_recent().properties, {'name': 'Pine'})
+
+    def test_full_mode(self):
+        """Test storing full snapshots by default."""
+        observation = ObservationFactory.create(
+            properties={'name': 'Oak', 'height': 1})
+        self.make_changes(observation)
+
+        for record in self.get_records(observation):
+            self.assertIsNone(record.history_fields)
+
+    def test_compact_history(self):
+        """Test compacting existing records."""
+        observation = ObservationFactory.create(
+            properties={'name': 'Oak', 'height': 1})
+        self.make_changes(observation)
+        other = ObservationFactory.create(properties={'name': 'Beech'})
+
+        expected = [
+            (record.status, record.properties)
+            for record in self.get_records(observation)
+        ]
+
+        stdout = StringIO()
+        call_command('compact_history', interval=3, batch_size=1,
+                     stdout=stdout)
+
+        records = self.get_records(observation)
+        self.assertEqual(
+            [record.history_fields for record in records],
+            [None, ['properties'], [], None, [], ['properties']]
+        )
+        self.assertEqual(
+            [(r.instance.status, r.instance.properties) for r in records],
+            expected
+        )
+        self.assertIsNone(self.get_records(other)[0].history_fields)
+        self.assertIn('Compacted 4 records', stdout.getvalue())
+
+        # Records are converted back to snapshots for a shorter interval
+        call_command('compact_history', interval=1, stdout=StringIO())
+        records = self.get_records(observation)
+        self.assertEqual(
+            [(r.status, r.properties) for r in records],
+            expected
+        )
@@ -11,7 +11,9 @@ from django.contrib.sites.shortcuts import get_current_site
 
 from geokey.version import get_version
 from geokey import version
-from geokey.core.views import InfoAPIView, LoggerList
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from geokey.core.views import InfoAPIView, ProjectLogsAPIView, LoggerList
 from geokey.extensions.base import register, deregister
 from geokey.users.tests.model_factories import UserFactory
 from geokey.projects.tests.model_factories import ProjectFactory
@@ -71,6 +73,91 @@ class InfoAPIViewTest(TestCase):
         self.assertTrue(self.contains_extension('S', installed_extensions))
 
 
+class ProjectLogsAPIViewTest(TestCase):
+    """Test public API for logs of a project."""
+
+    def setUp(self):
+        """Set up test."""
+        self.factory = APIRequestFactory()
+        self.view = ProjectLogsAPIView.as_view()
+        self.admin = UserFactory.create()
+        self.project = ProjectFactory.create(**{'creator': self.admin})
+
+        for x in range(0, 4):
+            self.project.name = 'Name %s' % x
+            self.project.save()
+
+        ProjectFactory.create()
+
+        self.expected = list(LoggerHistory.objects.filter(
+            project__contains={'id': str(self.project.id)}
+        ).order_by('-id').values_list('id', flat=True))
+
+    def get(self, user, **params):
+        """Helper to request the logs."""
+        request = self.factory.get(
+            '/api/projects/%s/logs/' % self.project.id, params)
+        force_authenticate(request, user=user)
+        response = self.view(request, project_id=self.project.id).render()
+        return response, json.loads(response.content)
+
+    def test_get_with_admin(self):
+        """Test GET with project admin."""
+        response, content = self.get(self.admin)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [log.get('id') for log in content.get('logs')], self.expected)
+        self.assertEqual(content.get('logs')[0].get('action'), {
+            'id': 'updated',
+            'class': 'Project',
+            'field': 'name'})
+        self.assertIsNone(content.get('next'))
+        self.assertIsNone(content.get('previous'))
+
+    def test_get_pages(self):
+        """Test GET with limit and cursors."""
+        response, content = self.get(self.admin, limit=2)
+        self.assertEqual(
+            [log.get('id') for log in content.get('logs')],
+            self.expected[0:2])
+        self.assertIsNone(content.get('previous'))
+
+        response, content = self.get(
+            self.admin, limit=2, cursor=content.get('next'))
+        self.assertEqual(
+            [log.get('id') for log in content.get('logs')],
+            self.expected[2:4])
+
+        next_cursor = content.get('next')
+
+        response, content = self.get(
+            self.admin, limit=2, cursor=content.get('previous'))
+        self.assertEqual(
+            [log.get('id') for log in content.get('logs')],
+            self.expected[0:2])
+        self.assertIsNone(content.get('previous'))
+
+        response, content = self.get(self.admin, limit=2, cursor=next_cursor)
+        self.assertEqual(
+            [log.get('id') for log in content.get('logs')],
+            self.expected[4:6])
+        self.assertIsNone(content.get('next'))
+
+    def test_get_with_invalid_cursor(self):
+        """Test GET with an invalid cursor."""
+        response, content = self.get(self.admin, cursor='not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_with_user(self):
+        """Test GET with user who is not project admin."""
+        self.project.isprivate = False
+        self.project.save()
+
+        response, content = self.get(UserFactory.create())
+        self.assertEqual(response.status_code, 403)
+
+
 # ############################################################################
 #
 # ADMIN PAGES
@@ -138,25 +225,42 @@ class LoggerListTest(TestCase):
         project = ProjectFactory.create()
         user = project.creator
 
-        logs = LoggerHistory.objects.filter(
-            project__contains={'id': str(project.id)})
+        logs = LoggerHistory.objects.filter(project_id=project.id)
 
         logger_list = LoggerList()
 
         self.request.user = user
         response = self.view(self.request, project_id=project.id).render()
 
-        rendered = render_to_string(
-            'logger/logger_list.html',
-            {
-                'project': project,
-                'user': user,
-                'PLATFORM_NAME': get_current_site(self.request).name,
-                'GEOKEY_VERSION': version.get_version(),
-                'logs': logger_list.paginate_logs(
-                    logs[::-1],
-                    self.request.GET.get('page'))
-            }
-        )
+        context = {
+            'project': project,
+            'user': user,
+            'PLATFORM_NAME': get_current_site(self.request).name,
+            'GEOKEY_VERSION': version.get_version()
+        }
+        context.update(logger_list.paginate_logs(logs, None))
+        rendered = render_to_string('logger/logger_list.html', context)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.content.decode('utf-8'), rendered)
+
+    def test_paginate_logs(self):
+        """Logs should be paged with cursors, latest first."""
+        project = ProjectFactory.create()
+        for x in range(0, 25):
+            project.name = 'Name %s' % x
+            project.save()
+
+        logs = LoggerHistory.objects.filter(project_id=project.id)
+        logger_list = LoggerList()
+
+        first = logger_list.paginate_logs(logs, None)
+        self.assertEqual(len(first.get('logs')), 20)
+        self.assertIsNone(first.get('previous_cursor'))
+
+        second = logger_list.paginate_logs(logs, first.get('next_cursor'))
+        self.assertEqual(len(second.get('logs')), logs.count() - 20)
+        self.assertLess(second.get('logs')[0].id, first.get('logs')[-1].id)
+        self.assertIsNone(second.get('next_cursor'))
+
+        invalid = logger_list.paginate_logs(logs, 'not-a-cursor')
+        self.assertEqual(invalid.get('logs'), first.get('logs'))
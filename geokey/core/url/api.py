@@ -2,7 +2,7 @@
 
 from django.conf.urls import url
 
-from geokey.core.views import InfoAPIView
+from geokey.core.views import InfoAPIView, ProjectLogsAPIView
 
 from geokey.projects import views as project_views
 from geokey.categories import views as category_views
@@ -43,6 +43,10 @@ urlpatterns = [
         r'^projects/(?P<project_id>[0-9]+)/$',
         project_views.SingleProject.as_view(),
         name='project_single'),
+    url(
+        r'^projects/(?P<project_id>[0-9]+)/logs/$',
+        ProjectLogsAPIView.as_view(),
+        name='project_logs'),
 
     # ###########################
     # CATEGORIES
@@ -61,6 +65,22 @@ urlpatterns = [
         r'contributions/$',
         observations.ProjectObservations.as_view(),
         name='project_observations'),
+    url(
+        r'^projects/(?P<project_id>[0-9]+)/'
+        r'contributions/bulk/$',
+        observations.ProjectObservationsBulk.as_view(),
+        name='project_observations_bulk'),
+    url(
+        r'^projects/(?P<project_id>[0-9]+)/'
+        r'contributions/tiles/(?P<zoom>[0-9]+)/(?P<x>[0-9]+)/(?P<y>[0-9]+)'
+        r'\.mvt$',
+        observations.ProjectObservationsTile.as_view(),
+        name='project_observations_tile'),
+    url(
+        r'^projects/(?P<project_id>[0-9]+)/'
+        r'contributions/clusters/$',
+        observations.ProjectObservationsClusters.as_view(),
+        name='project_observations_clusters'),
     url(
         r'^projects/(?P<project_id>[0-9]+)/'
         r'contributions/(?P<observation_id>[0-9]+)/$',
@@ -1,5 +1,6 @@
 """Core views."""
 
+from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
@@ -9,10 +10,13 @@ from braces.views import LoginRequiredMixin
 
 from geokey.version import get_version
 from geokey.extensions.base import extensions
+from geokey.projects.models import Project
 from geokey.projects.views import ProjectContext
+from geokey.core.decorators import handle_exceptions_for_ajax
+from geokey.core.exceptions import MalformedRequestData
 from geokey.core.models import LoggerHistory
-
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from geokey.core.pagination import LogCursorPagination
+from geokey.core.serializers import LoggerHistorySerializer
 
 
 class LoggerList(LoginRequiredMixin, ProjectContext, TemplateView):
@@ -39,27 +43,29 @@ class LoggerList(LoginRequiredMixin, ProjectContext, TemplateView):
             **kwargs
         )
 
-        logs = LoggerHistory.objects.filter(
-            project__contains={'id': str(project_id)})
+        logs = LoggerHistory.objects.filter(project_id=project_id)
 
-        context['logs'] = self.paginate_logs(
-            logs[::-1],
-            self.request.GET.get('page'))
+        context.update(self.paginate_logs(
+            logs,
+            self.request.GET.get('cursor')))
 
         return context
 
-    def paginate_logs(self, logs, page):
-            """Paginate all logs."""
-            paginator = Paginator(logs, 20)
+    def paginate_logs(self, logs, cursor):
+        """Paginate all logs, latest first, using keyset pagination."""
+        try:
+            pagination = LogCursorPagination(limit=20, cursor=cursor)
+        except MalformedRequestData:
+            pagination = LogCursorPagination(limit=20)
 
-            try:
-                logs = paginator.page(page)
-            except PageNotAnInteger:
-                logs = paginator.page(1)
-            except EmptyPage:
-                logs = paginator.page(paginator.num_pages)
+        page = pagination.paginate_queryset(logs)
+        data = pagination.get_paginated_data(page)
 
-            return logs
+        return {
+            'logs': page,
+            'next_cursor': data.get('next'),
+            'previous_cursor': data.get('previous')
+        }
 
 
 # ############################################################################
@@ -98,3 +104,45 @@ class InfoAPIView(APIView):
         )
 
         return Response(info)
+
+
+class ProjectLogsAPIView(APIView):
+    """
+    Public API for logs of a project, available to project administrators.
+    /api/projects/:project_id/logs/
+    """
+
+    @handle_exceptions_for_ajax
+    def get(self, request, project_id):
+        """
+        Handle GET request.
+
+        Return the logs of the project, latest first. Accepts `limit` and
+        `cursor` to page through the logs.
+
+        Parameters
+        ----------
+        request : rest_framework.request.Request
+            Object representing the request.
+        project_id : int
+            Identifies the project in the database.
+
+        Returns
+        -------
+        rest_framework.response.Response
+            Contains the serialized logs and the cursors.
+        """
+        project = Project.objects.as_admin(request.user, project_id)
+
+        pagination = LogCursorPagination(
+            limit=request.GET.get('limit'),
+            cursor=request.GET.get('cursor')
+        )
+        page = pagination.paginate_queryset(
+            LoggerHistory.objects.filter(project_id=project.id))
+
+        serializer = LoggerHistorySerializer(page, many=True)
+        return Response(
+            pagination.get_paginated_data(serializer.data),
+            status=status.HTTP_200_OK
+        )
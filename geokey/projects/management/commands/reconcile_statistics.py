@@ -0,0 +1,33 @@
+"""Command `reconcile_statistics`."""
+
+from django.core.management.base import BaseCommand
+
+from geokey.projects.statistics import reconcile_statistics
+
+
+class Command(BaseCommand):
+    """
+    A command to recount the statistics of projects. The statistics are
+    updated incrementally, the command corrects statistics that are out of
+    date, e.g. after contributions have been changed directly in the
+    database.
+    """
+
+    help = 'Recounts contributions, comments and media files of projects.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--project', type=int, action='append', dest='projects',
+            help='ID of a project that is reconciled, all projects by '
+                 'default. Can be used more than once.')
+
+    def handle(self, *args, **options):
+        outdated = reconcile_statistics(options.get('projects'))
+
+        for project_id in outdated:
+            self.stdout.write(
+                'Statistics of project %s were out of date.' % project_id)
+
+        self.stdout.write(
+            'Reconciled statistics, %s projects were out of date.' %
+            len(outdated))
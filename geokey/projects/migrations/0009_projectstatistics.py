@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0018_historicalcategory'),
+        ('contributions', '0022_location_geometry_gist_index'),
+        ('projects', '0008_historicalproject'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectStatistics',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('status', models.CharField(max_length=20)),
+                ('contributions', models.IntegerField(default=0)),
+                ('comments', models.IntegerField(default=0)),
+                ('media', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(related_name='+', to='categories.Category')),
+                ('project', models.ForeignKey(related_name='statistics', to='projects.Project')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='projectstatistics',
+            unique_together=set([('project', 'category', 'status')]),
+        ),
+        # Counts the same way as geokey.projects.statistics.count_statistics:
+        # comments that are not deleted and active media files
+        migrations.RunSQL(
+            [
+                "INSERT INTO projects_projectstatistics "
+                "(project_id, category_id, status, contributions, comments, "
+                "media) "
+                "SELECT o.project_id, o.category_id, o.status, COUNT(*), "
+                "COALESCE(SUM(c.count), 0), COALESCE(SUM(m.count), 0) "
+                "FROM contributions_observation o "
+                "LEFT JOIN (SELECT commentto_id, COUNT(*) AS count "
+                "FROM contributions_comment WHERE status != 'deleted' "
+                "GROUP BY commentto_id) c ON c.commentto_id = o.id "
+                "LEFT JOIN (SELECT contribution_id, COUNT(*) AS count "
+                "FROM contributions_mediafile WHERE status = 'active' "
+                "GROUP BY contribution_id) m ON m.contribution_id = o.id "
+                "WHERE o.status != 'deleted' "
+                "GROUP BY o.project_id, o.category_id, o.status;"
+            ],
+            []
+        ),
+    ]
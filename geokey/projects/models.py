@@ -1,6 +1,8 @@
 """Models for projects."""
 
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.conf import settings
 from django.contrib.gis.db import models as gis
 
@@ -8,6 +10,7 @@ from geokey.core import signals
 from simple_history.models import HistoricalRecords
 
 from .managers import ProjectManager
+from .roles import get_membership, invalidate_memberships
 from .base import STATUS, EVERYONE_CONTRIBUTES
 
 
@@ -169,7 +172,7 @@ class Project(models.Model):
         Boolean
             Indicating if user is admin
         """
-        return user in self.admins.all()
+        return get_membership(self, user)['is_admin']
 
     def can_access(self, user):
         """
@@ -188,14 +191,10 @@ class Project(models.Model):
         Boolean
             Indicating if user is can access
         """
-        return self.status == STATUS.active and (self.is_admin(user) or (
-            not self.isprivate) or (
-            not user.is_anonymous() and (
-                self.usergroups.filter(
-                    can_contribute=True, users=user).exists() or
-                self.usergroups.filter(
-                    can_moderate=True, users=user).exists())
-        ))
+        membership = get_membership(self, user)
+        return self.status == STATUS.active and (
+            membership['is_admin'] or (not self.isprivate) or
+            membership['can_contribute'] or membership['can_moderate'])
 
     def can_contribute(self, user):
         """
@@ -214,14 +213,12 @@ class Project(models.Model):
         Boolean
             Indicating if user can contribute
         """
+        membership = get_membership(self, user)
         return self.status == STATUS.active and (
             (self.everyone_contributes != EVERYONE_CONTRIBUTES.false and (
                 not user.is_anonymous() or
                 not self.everyone_contributes == EVERYONE_CONTRIBUTES.auth)
-             ) or self.is_admin(user) or (
-                not user.is_anonymous() and (
-                    self.usergroups.filter(
-                        can_contribute=True, users=user).exists())))
+             ) or membership['is_admin'] or membership['can_contribute'])
 
     def can_moderate(self, user):
         """
@@ -238,11 +235,9 @@ class Project(models.Model):
         Boolean
             Indicating if user can moderate
         """
+        membership = get_membership(self, user)
         return self.status == STATUS.active and (
-            self.is_admin(user) or (
-                not user.is_anonymous() and (
-                    self.usergroups.filter(
-                        can_moderate=True, users=user).exists())))
+            membership['is_admin'] or membership['can_moderate'])
 
     def is_involved(self, user):
         """
@@ -260,11 +255,11 @@ class Project(models.Model):
         Boolean
             Indicating if user is involved
         """
-        return self.is_admin(user) or (
-            not user.is_anonymous() and (
-                self.usergroups.filter(users=user).exists()))
+        membership = get_membership(self, user)
+        return membership['is_admin'] or membership['is_member']
 
-    def get_all_contributions(self, user, search=None, subset=None, bbox=None):
+    def get_all_contributions(self, user, search=None, subset=None, bbox=None,
+                              since=None):
         """
         Returns all contributions a user can access in a project. It gets
         the SQL clauses of all data groupings in the project and combines them
@@ -274,48 +269,134 @@ class Project(models.Model):
         ----------
         user : geokey.users.models.User
             User that contributions are queried for
+        since : datetime.datetime
+            If provided, only contributions created, updated or deleted after
+            this date and time are returned, including deleted contributions
 
         Returns
         -------
         django.db.models.query.QuerySet
             List of geokey.contributions.models.Observations
         """
-        is_admin = self.is_admin(user)
         data = self.observations
 
-        if is_admin or self.can_moderate(user):
+        if since is not None:
+            data = data.including_deleted().filter(
+                project=self).changed_since(since)
+
+        if self.is_admin(user) or self.can_moderate(user):
             data = data.for_moderator(user)
         else:
             data = data.for_viewer(user)
 
+        where_clause, where_params = self.get_where_clause(user, subset)
+        if where_clause:
+            data = data.extra(where=[where_clause], params=where_params)
+
+        if search:
+            data = data.search(search)
+
+        if bbox:
+            data = data.get_by_bbox(bbox)
+
+        return data.distinct()
+
+    def get_where_clause(self, user, subset=None):
+        """
+        Returns the SQL where clause combining the filters of the user groups
+        of the user and of the subset, which limit the contributions the user
+        can access.
+
+        Parameters
+        ----------
+        user : geokey.users.models.User
+            User that contributions are queried for
+        subset : int
+            Identifies the subset in the database, if contributions are
+            limited to a subset
+
+        Returns
+        -------
+        tuple
+            SQL where clause, with placeholders for all values, and the list
+            of values. The where clause is `None` if there is no filter.
+        """
         where_clause = None
-        if not is_admin and self.isprivate and not user.is_anonymous():
+        where_params = []
+        if (not self.is_admin(user) and self.isprivate and
+                not user.is_anonymous()):
             clauses = []
 
             for group in self.usergroups.filter(users=user):
-                if group.where_clause is not None:
-                    clauses.append(group.where_clause)
+                clause, params = group.get_where()
+                if clause is not None:
+                    clauses.append(clause)
+                    where_params.extend(params)
 
             if clauses:
                 where_clause = '(' + ') OR ('.join(clauses) + ')'
 
         if subset:
             sub = self.subsets.get(pk=subset)
-            if where_clause:
-                where_clause = '(' + sub.where_clause + ') AND ' + where_clause
-            else:
-                where_clause = sub.where_clause
+            clause, params = sub.get_where()
+            if clause is not None:
+                if where_clause:
+                    where_clause = '(' + clause + ') AND ' + where_clause
+                    where_params = params + where_params
+                else:
+                    where_clause = clause
+                    where_params = params
+
+        return where_clause, where_params
+
+    def get_hidden_contributions(self, user, contributions, since,
+                                 subset=None):
+        """
+        Returns contributions changed since the last sync that are no longer
+        in `contributions`, but that the user could have received with the
+        last sync: they existed at that time, and they were created by the
+        user or match the filters of the user groups of the user and of the
+        subset.
 
-        if where_clause:
-            data = data.extra(where=[where_clause])
+        Parameters
+        ----------
+        user : geokey.users.models.User
+            User that contributions are queried for
+        contributions : django.db.models.query.QuerySet
+            Contributions changed since the last sync accessible to the user
+        since : datetime.datetime
+            Date and time of the last sync
+        subset : int
+            Identifies the subset in the database, if contributions are
+            limited to a subset
 
-        if search:
-            data = data.search(search)
+        Returns
+        -------
+        django.db.models.query.QuerySet
+            List of geokey.contributions.models.Observations
+        """
+        data = self.observations.including_deleted().filter(
+            project=self,
+            created_at__lte=since
+        ).changed_since(since).exclude(
+            id__in=contributions.order_by().values('id')
+        )
 
-        if bbox:
-            data = data.get_by_bbox(bbox)
+        if user.is_anonymous():
+            data = data.exclude(status='draft')
+        else:
+            data = data.for_moderator(user)
 
-        return data.distinct()
+        where_clause, where_params = self.get_where_clause(user, subset)
+        if where_clause and user.is_anonymous():
+            data = data.extra(where=[where_clause], params=where_params)
+        elif where_clause:
+            data = data.extra(
+                where=['(creator_id = %s OR ' + where_clause + ')'],
+                params=[user.id] + where_params
+            )
+
+        return data.order_by()
 
 
 class Admins(models.Model):
@@ -332,3 +413,34 @@ class Admins(models.Model):
     class Meta:
         ordering = ['project__name']
         unique_together = ('project', 'user')
+
+
+class ProjectStatistics(models.Model):
+    """
+    Numbers of contributions of a project, and of the comments and media
+    files attached to them, for each category and status of contributions.
+    Rows are updated incrementally when contributions, comments and media
+    files change; deleted contributions are not counted.
+    """
+    project = models.ForeignKey('Project', related_name='statistics')
+    category = models.ForeignKey('categories.Category', related_name='+')
+    status = models.CharField(max_length=20)
+    contributions = models.IntegerField(default=0)
+    comments = models.IntegerField(default=0)
+    media = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('project', 'category', 'status')
+
+
+@receiver(post_save, sender=Project)
+def invalidate_roles_on_project_save(sender, instance, **kwargs):
+    """Invalidate cached roles in the project when it is saved."""
+    invalidate_memberships(instance.id)
+
+
+@receiver(post_save, sender=Admins)
+@receiver(post_delete, sender=Admins)
+def invalidate_roles_on_admins_change(sender, instance, **kwargs):
+    """Invalidate cached roles in the project when admins change."""
+    invalidate_memberships(instance.project_id)
@@ -0,0 +1,194 @@
+"""Roles of users in projects."""
+
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+
+from geokey.core.signals import get_request
+
+
+VERSION_KEY = 'geokey:roles:%s'
+MEMBERSHIP_KEY = 'geokey:roles:%s:%s:%s'
+
+NO_MEMBERSHIP = {
+    'is_admin': False,
+    'is_member': False,
+    'can_contribute': False,
+    'can_moderate': False
+}
+
+
+def query_membership(project_id, user_id):
+    """
+    Queries the memberships of the user in the project: whether the user is
+    administrator of the project, and whether the user is member of any user
+    group of the project and with which permissions. Uses one query.
+
+    Parameters
+    ----------
+    project_id : int
+        Identifies the project in the database
+    user_id : int
+        Identifies the user in the database
+
+    Returns
+    -------
+    dict
+        `is_admin`, `is_member`, `can_contribute` and `can_moderate`
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT EXISTS ('
+            'SELECT 1 FROM projects_admins '
+            'WHERE project_id = %s AND user_id = %s'
+            '), COUNT(g.id) > 0, '
+            'COALESCE(bool_or(g.can_contribute), FALSE), '
+            'COALESCE(bool_or(g.can_moderate), FALSE) '
+            'FROM users_usergroup g '
+            'JOIN users_usergroup_users u ON u.usergroup_id = g.id '
+            'WHERE g.project_id = %s AND u.user_id = %s',
+            [project_id, user_id, project_id, user_id]
+        )
+        row = cursor.fetchone()
+
+    return {
+        'is_admin': row[0],
+        'is_member': row[1],
+        'can_contribute': row[2],
+        'can_moderate': row[3]
+    }
+
+
+def get_cache():
+    """
+    Returns the cache shared between requests, configured by `ROLE_CACHE`.
+    Falls back to the default cache if the cache is not configured.
+
+    Returns
+    -------
+    django.core.cache.backends.base.BaseCache
+        Cache for memberships
+    """
+    alias = getattr(settings, 'ROLE_CACHE', 'default')
+
+    if alias not in settings.CACHES:
+        alias = 'default'
+
+    return caches[alias]
+
+
+def get_version(cache, project_id):
+    """
+    Returns the current version of the cached memberships of the project.
+    All memberships cached for a project are invalidated at once by
+    replacing its version.
+
+    Parameters
+    ----------
+    cache : django.core.cache.backends.base.BaseCache
+        Cache for memberships
+    project_id : int
+        Identifies the project in the database
+
+    Returns
+    -------
+    str
+        Version of the memberships
+    """
+    version = cache.get(VERSION_KEY % project_id)
+
+    if version is None:
+        version = uuid4().hex
+        cache.set(VERSION_KEY % project_id, version, None)
+
+    return version
+
+
+def get_cached_membership(project_id, user_id):
+    """
+    Returns the memberships of the user in the project from the shared cache,
+    and queries and caches them if they have not been cached yet.
+
+    Parameters
+    ----------
+    project_id : int
+        Identifies the project in the database
+    user_id : int
+        Identifies the user in the database
+
+    Returns
+    -------
+    dict
+        `is_admin`, `is_member`, `can_contribute` and `can_moderate`
+    """
+    cache = get_cache()
+    key = MEMBERSHIP_KEY % (
+        project_id, get_version(cache, project_id), user_id)
+    membership = cache.get(key)
+
+    if membership is None:
+        membership = query_membership(project_id, user_id)
+        cache.set(
+            key, membership, getattr(settings, 'ROLE_CACHE_TIMEOUT', 10))
+
+    return membership
+
+
+def invalidate_memberships(project_id):
+    """
+    Invalidates all memberships of the project, in the shared cache and the
+    ones memoized on the current request. Called whenever administrators,
+    user groups or members of user groups of the project change.
+
+    Parameters
+    ----------
+    project_id : int
+        Identifies the project in the database
+    """
+    get_cache().set(VERSION_KEY % project_id, uuid4().hex, None)
+
+    request = get_request()
+    if hasattr(request, '_project_memberships'):
+        for key in request._project_memberships.keys():
+            if key[0] == project_id:
+                del request._project_memberships[key]
+
+
+def get_membership(project, user):
+    """
+    Returns the memberships of the user in the project. The result is shared
+    between requests using the cache and memoized on the current request, so
+    that all permission checks for a project during a request share the
+    same lookup.
+
+    Parameters
+    ----------
+    project : geokey.projects.models.Project
+        Project that is examined
+    user : geokey.users.models.User
+        User that is examined
+
+    Returns
+    -------
+    dict
+        `is_admin`, `is_member`, `can_contribute` and `can_moderate`
+    """
+    if user is None or user.is_anonymous() or project.id is None:
+        return NO_MEMBERSHIP
+
+    request = get_request()
+
+    if request is None:
+        return get_cached_membership(project.id, user.id)
+
+    if not hasattr(request, '_project_memberships'):
+        request._project_memberships = {}
+
+    key = (project.id, user.id)
+    if key not in request._project_memberships:
+        request._project_memberships[key] = get_cached_membership(
+            project.id, user.id)
+
+    return request._project_memberships[key]
@@ -2,7 +2,7 @@
 
 import json
 
-from django.db.models import Q
+from django.db.models import Q, Count
 
 from rest_framework import serializers
 
@@ -12,6 +12,7 @@ from geokey.subsets.serializers import SubsetSerializer
 from geokey.contributions.models import Location
 
 from .models import Project
+from .statistics import get_statistics
 
 
 class ProjectSerializer(FieldSelectorSerializer):
@@ -108,10 +109,34 @@ class ProjectSerializer(FieldSelectorSerializer):
             Q(private_for_project=project)).count()
         return locations
 
+    def get_statistics(self, project):
+        """
+        Returns the statistics of the project. The statistics are loaded
+        once for each project serialised.
+
+        Parameters
+        ----------
+        project : geokey.projects.models.Project
+            Project that is serialised
+
+        Returns
+        -------
+        geokey.projects.statistics.Statistics
+            Statistics of the project
+        """
+        if not hasattr(self, '_statistics'):
+            self._statistics = {}
+
+        if project.id not in self._statistics:
+            self._statistics[project.id] = get_statistics(project.id)
+
+        return self._statistics[project.id]
+
     def get_num_contributions(self, project):
         """
         Method for SerializerMethodField `num_observations`. Returns the
-        overall number of observations contributed to the project.
+        overall number of observations contributed to the project, read from
+        the project statistics.
 
         Parameters
         ----------
@@ -123,8 +148,8 @@ class ProjectSerializer(FieldSelectorSerializer):
         int
             number of contributions in the project
         """
-        return project.observations.exclude(
-            status='draft').exclude(status='pending').count()
+        statistics = self.get_statistics(project)
+        return statistics.contributions - statistics.count('draft', 'pending')
 
     def get_user_contributions(self, project):
         """
@@ -151,7 +176,8 @@ class ProjectSerializer(FieldSelectorSerializer):
     def get_contribution_info(self, project):
         """
         Method for SerializerMethodField `contribution_info`. Returns numbers
-        on user's contributions.
+        on user's contributions, counted by status in one query. Numbers of
+        all contributions are read from the project statistics.
 
         Parameters
         ----------
@@ -170,15 +196,15 @@ class ProjectSerializer(FieldSelectorSerializer):
 
         user = self.context.get('user')
         if not user.is_anonymous():
-            personal = project.observations.filter(creator=user).count()
-            pending_personal = project.observations.filter(
-                creator=user, status='pending').count()
-            drafts = project.observations.filter(
-                creator=user, status='draft').count()
+            statuses = dict(project.observations.filter(
+                creator=user).order_by().values_list('status').annotate(
+                count=Count('id')))
+            personal = sum(statuses.values())
+            pending_personal = statuses.get('pending', 0)
+            drafts = statuses.get('draft', 0)
 
             if project.can_moderate(user):
-                pending_all = project.observations.filter(
-                    status='pending').count()
+                pending_all = self.get_statistics(project).count('pending')
 
         return {
             'total': self.get_num_contributions(project),
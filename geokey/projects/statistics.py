@@ -0,0 +1,234 @@
+"""Statistics of projects."""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from geokey.contributions.base import OBSERVATION_STATUS, MEDIA_STATUS
+
+from .models import ProjectStatistics
+
+
+class Statistics(object):
+    """
+    Numbers of contributions, comments and media files of a project, summed
+    up from the statistics rows of the project.
+
+    Parameters
+    ----------
+    rows : list
+        geokey.projects.models.ProjectStatistics instances of the project
+    """
+    def __init__(self, rows):
+        self.statuses = {}
+        self.categories = {}
+        self.comments = 0
+        self.media = 0
+
+        for row in rows:
+            self.statuses[row.status] = self.statuses.get(
+                row.status, 0) + row.contributions
+            self.categories[row.category_id] = self.categories.get(
+                row.category_id, 0) + row.contributions
+            self.comments += row.comments
+            self.media += row.media
+
+    @property
+    def contributions(self):
+        """Returns the number of all contributions that are not deleted."""
+        return sum(self.statuses.values())
+
+    def count(self, *statuses):
+        """
+        Returns the number of contributions with any of the statuses.
+
+        Parameters
+        ----------
+        *statuses : str
+            Statuses of contributions, e.g. `pending` or `draft`
+
+        Returns
+        -------
+        int
+            Number of contributions
+        """
+        return sum(self.statuses.get(status, 0) for status in statuses)
+
+
+def get_statistics(project_id):
+    """
+    Returns the statistics of the project. Uses one query.
+
+    Parameters
+    ----------
+    project_id : int
+        Identifies the project in the database
+
+    Returns
+    -------
+    geokey.projects.statistics.Statistics
+        Statistics of the project
+    """
+    return Statistics(ProjectStatistics.objects.filter(project_id=project_id))
+
+
+def update_statistics(project_id, category_id, status, contributions=0,
+                      comments=0, media=0):
+    """
+    Adds to the numbers of contributions, comments and media files of the
+    project for the category and status. The numbers are incremented (or
+    decremented for negative values) in the database, so that concurrent
+    updates are not lost. Deleted contributions are not counted.
+
+    Parameters
+    ----------
+    project_id : int
+        Identifies the project in the database
+    category_id : int
+        Identifies the category in the database
+    status : str
+        Status of the contributions
+    contributions : int
+        Number of contributions to add
+    comments : int
+        Number of comments to add
+    media : int
+        Number of media files to add
+    """
+    if status == OBSERVATION_STATUS.deleted:
+        return
+
+    if not (contributions or comments or media):
+        return
+
+    rows = ProjectStatistics.objects.filter(
+        project_id=project_id,
+        category_id=category_id,
+        status=status
+    )
+    values = {
+        'contributions': F('contributions') + contributions,
+        'comments': F('comments') + comments,
+        'media': F('media') + media
+    }
+
+    if rows.update(**values):
+        return
+
+    try:
+        with transaction.atomic():
+            ProjectStatistics.objects.create(
+                project_id=project_id,
+                category_id=category_id,
+                status=status,
+                contributions=contributions,
+                comments=comments,
+                media=media
+            )
+    except IntegrityError:
+        # The row has been created by a concurrent update
+        rows.update(**values)
+
+
+def count_statistics(project_ids=None):
+    """
+    Counts contributions, comments and media files from their tables, for
+    each project, category and status of contributions.
+
+    Parameters
+    ----------
+    project_ids : list
+        Identify the projects that are counted, all projects if not set
+
+    Returns
+    -------
+    dict
+        Numbers of `contributions`, `comments` and `media` by project ID,
+        category ID and status
+    """
+    from geokey.contributions.models import Observation, Comment, MediaFile
+
+    observations = Observation.objects.all()
+    comments = Comment.objects.exclude(
+        commentto__status=OBSERVATION_STATUS.deleted)
+    media = MediaFile._base_manager.filter(
+        status=MEDIA_STATUS.active).exclude(
+        contribution__status=OBSERVATION_STATUS.deleted)
+
+    if project_ids:
+        observations = observations.filter(project_id__in=project_ids)
+        comments = comments.filter(commentto__project_id__in=project_ids)
+        media = media.filter(contribution__project_id__in=project_ids)
+
+    counts = {}
+
+    def add(queryset, relation, name):
+        keys = [relation + key for key in ['project', 'category', 'status']]
+        rows = queryset.order_by().values(*keys).annotate(count=Count('id'))
+
+        for row in rows:
+            key = tuple(row[k] for k in keys)
+            counts.setdefault(key, {
+                'contributions': 0,
+                'comments': 0,
+                'media': 0
+            })[name] = row['count']
+
+    add(observations, '', 'contributions')
+    add(comments, 'commentto__', 'comments')
+    add(media, 'contribution__', 'media')
+
+    return counts
+
+
+def reconcile_statistics(project_ids=None):
+    """
+    Recounts contributions, comments and media files and corrects the
+    statistics that are out of date.
+
+    Parameters
+    ----------
+    project_ids : list
+        Identify the projects that are reconciled, all projects if not set
+
+    Returns
+    -------
+    list
+        IDs of the projects with statistics that were out of date
+    """
+    rows = ProjectStatistics.objects.all()
+    if project_ids:
+        rows = rows.filter(project_id__in=project_ids)
+
+    outdated = set()
+
+    with transaction.atomic():
+        existing = dict(
+            ((row.project_id, row.category_id, row.status), row)
+            for row in rows.select_for_update()
+        )
+        counts = count_statistics(project_ids)
+
+        for key, row in existing.items():
+            if key not in counts:
+                if row.contributions or row.comments or row.media:
+                    outdated.add(key[0])
+                row.delete()
+
+        for key, values in counts.items():
+            row = existing.get(key)
+
+            if row is None:
+                ProjectStatistics.objects.create(
+                    project_id=key[0],
+                    category_id=key[1],
+                    status=key[2],
+                    **values
+                )
+                outdated.add(key[0])
+            elif any(getattr(row, name) != values[name] for name in values):
+                for name, value in values.items():
+                    setattr(row, name, value)
+                row.save()
+                outdated.add(key[0])
+
+    return sorted(outdated)
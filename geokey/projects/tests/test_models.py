@@ -469,6 +469,35 @@ class ProjectGetDataTest(TestCase):
 
         self.assertEqual(project.get_all_contributions(user).count(), 16)
 
+    def test_get_data_changed_since(self):
+        admin = UserFactory.create()
+        project = ProjectFactory.create(add_admins=[admin])
+        category = CategoryFactory(**{'project': project})
+
+        ObservationFactory.create_batch(3, **{
+            'project': project,
+            'category': category}
+        )
+        since = datetime.utcnow().replace(tzinfo=pytz.utc)
+
+        updated = ObservationFactory.create(**{
+            'project': project,
+            'category': category}
+        )
+        deleted = ObservationFactory.create(**{
+            'project': project,
+            'category': category}
+        )
+        deleted.delete()
+
+        changes = project.get_all_contributions(admin, since=since)
+        self.assertEqual(
+            [o.id for o in changes],
+            [updated.id, deleted.id]
+        )
+        self.assertEqual(changes[1].status, 'deleted')
+        self.assertEqual(project.get_all_contributions(admin).count(), 4)
+
     def test_get_data_category_filter(self):
         user = UserFactory.create()
         project = ProjectFactory.create()
@@ -737,6 +766,34 @@ class ProjectGetDataTest(TestCase):
 
         self.assertEqual(project.get_all_contributions(user).count(), 5)
 
+    def test_get_data_text_filter_with_quotes(self):
+        user = UserFactory.create()
+        project = ProjectFactory.create()
+
+        category = CategoryFactory(**{'project': project})
+        TextFieldFactory(**{'key': 'text', 'category': category})
+
+        UserGroupFactory.create(
+            add_users=[user],
+            **{
+                'project': project,
+                'filters': {category.id: {'text': "it's 100%"}}
+            }
+        )
+
+        ObservationFactory.create(**{
+            'project': project,
+            'category': category,
+            'properties': {'text': "it's 100% yes"}}
+        )
+        ObservationFactory.create(**{
+            'project': project,
+            'category': category,
+            'properties': {'text': 'no'}}
+        )
+
+        self.assertEqual(project.get_all_contributions(user).count(), 1)
+
     def test_get_data_min_number_filter(self):
         user = UserFactory.create()
         project = ProjectFactory.create()
@@ -0,0 +1,138 @@
+"""Tests for roles of users in projects."""
+
+from django.test import TestCase
+from django.contrib.auth.models import AnonymousUser
+
+from geokey.users.tests.model_factories import UserGroupFactory
+
+from ..models import Admins
+from ..roles import (
+    NO_MEMBERSHIP, get_membership, query_membership, get_cached_membership
+)
+from .model_factories import UserFactory, ProjectFactory
+
+
+class MembershipTest(TestCase):
+    def setUp(self):
+        self.admin = UserFactory.create()
+        self.moderator = UserFactory.create()
+        self.contributor = UserFactory.create()
+        self.viewer = UserFactory.create()
+        self.project = ProjectFactory.create(add_admins=[self.admin])
+
+        UserGroupFactory.create(
+            add_users=[self.moderator],
+            **{'project': self.project, 'can_moderate': True}
+        )
+        UserGroupFactory.create(
+            add_users=[self.contributor],
+            **{'project': self.project, 'can_contribute': True}
+        )
+        UserGroupFactory.create(
+            add_users=[self.viewer],
+            **{'project': self.project, 'can_contribute': False}
+        )
+
+    def test_query_membership(self):
+        self.assertEqual(
+            query_membership(self.project.id, self.admin.id),
+            {
+                'is_admin': True,
+                'is_member': False,
+                'can_contribute': False,
+                'can_moderate': False
+            }
+        )
+        self.assertEqual(
+            query_membership(self.project.id, self.moderator.id),
+            {
+                'is_admin': False,
+                'is_member': True,
+                'can_contribute': True,
+                'can_moderate': True
+            }
+        )
+        self.assertEqual(
+            query_membership(self.project.id, self.contributor.id),
+            {
+                'is_admin': False,
+                'is_member': True,
+                'can_contribute': True,
+                'can_moderate': False
+            }
+        )
+        self.assertEqual(
+            query_membership(self.project.id, self.viewer.id),
+            {
+                'is_admin': False,
+                'is_member': True,
+                'can_contribute': False,
+                'can_moderate': False
+            }
+        )
+        self.assertEqual(
+            query_membership(self.project.id, UserFactory.create().id),
+            NO_MEMBERSHIP
+        )
+
+    def test_get_membership_uses_one_query(self):
+        with self.assertNumQueries(1):
+            get_membership(self.project, self.moderator)
+
+        with self.assertNumQueries(0):
+            get_membership(self.project, self.moderator)
+
+    def test_get_membership_for_anonymous(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                get_membership(self.project, AnonymousUser()),
+                NO_MEMBERSHIP
+            )
+
+
+class MembershipCacheTest(TestCase):
+    def setUp(self):
+        self.user = UserFactory.create()
+        self.project = ProjectFactory.create()
+        self.usergroup = UserGroupFactory.create(**{
+            'project': self.project,
+            'can_contribute': False
+        })
+
+    def get(self):
+        return get_cached_membership(self.project.id, self.user.id)
+
+    def test_invalidate_on_admins_change(self):
+        self.assertFalse(self.get()['is_admin'])
+
+        admins = Admins.objects.create(project=self.project, user=self.user)
+        self.assertTrue(self.get()['is_admin'])
+
+        admins.delete()
+        self.assertFalse(self.get()['is_admin'])
+
+    def test_invalidate_on_members_change(self):
+        self.assertFalse(self.get()['is_member'])
+
+        self.usergroup.users.add(self.user)
+        self.assertTrue(self.get()['is_member'])
+
+        self.usergroup.users.remove(self.user)
+        self.assertFalse(self.get()['is_member'])
+
+        self.user.usergroup_set.add(self.usergroup)
+        self.assertTrue(self.get()['is_member'])
+
+        self.user.usergroup_set.clear()
+        self.assertFalse(self.get()['is_member'])
+
+    def test_invalidate_on_usergroup_change(self):
+        self.usergroup.users.add(self.user)
+        self.assertFalse(self.get()['can_moderate'])
+
+        self.usergroup.can_moderate = True
+        self.usergroup.save()
+        self.assertTrue(self.get()['can_moderate'])
+
+        self.usergroup.delete()
+        self.assertFalse(self.get()['is_member'])
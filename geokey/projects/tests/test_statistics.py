@@ -0,0 +1,127 @@
+"""Tests for statistics of projects."""
+
+from StringIO import StringIO
+
+from django.test import TestCase
+from django.core.management import call_command
+
+from geokey.categories.tests.model_factories import CategoryFactory
+from geokey.contributions.models import Observation
+from geokey.contributions.tests.model_factories import (
+    LocationFactory, ObservationFactory, CommentFactory
+)
+from geokey.contributions.tests.media.model_factories import AudioFileFactory
+
+from ..models import ProjectStatistics
+from ..statistics import get_statistics, reconcile_statistics
+from .model_factories import UserFactory, ProjectFactory
+
+
+class StatisticsTest(TestCase):
+    def setUp(self):
+        self.project = ProjectFactory.create()
+        self.category = CategoryFactory.create(project=self.project)
+        self.observation = ObservationFactory.create(
+            project=self.project,
+            category=self.category
+        )
+
+    def test_count_contributions(self):
+        ObservationFactory.create(
+            project=self.project,
+            category=self.category,
+            status='pending'
+        )
+        other = CategoryFactory.create(project=self.project)
+        ObservationFactory.create(project=self.project, category=other)
+
+        statistics = get_statistics(self.project.id)
+        self.assertEqual(statistics.contributions, 3)
+        self.assertEqual(statistics.count('active'), 2)
+        self.assertEqual(statistics.count('draft', 'pending'), 1)
+        self.assertEqual(
+            statistics.categories, {self.category.id: 2, other.id: 1})
+
+    def test_count_comments_and_media(self):
+        CommentFactory.create(commentto=self.observation)
+        comment = CommentFactory.create(commentto=self.observation)
+        AudioFileFactory.create(contribution=self.observation)
+
+        statistics = get_statistics(self.project.id)
+        self.assertEqual(statistics.comments, 2)
+        self.assertEqual(statistics.media, 1)
+
+        comment.delete()
+        self.assertEqual(get_statistics(self.project.id).comments, 1)
+
+    def test_change_status(self):
+        CommentFactory.create(commentto=self.observation)
+
+        self.observation.status = 'pending'
+        self.observation.save()
+
+        statistics = get_statistics(self.project.id)
+        self.assertEqual(statistics.statuses, {'active': 0, 'pending': 1})
+        self.assertEqual(statistics.comments, 1)
+
+        self.observation.delete()
+
+        statistics = get_statistics(self.project.id)
+        self.assertEqual(statistics.contributions, 0)
+        self.assertEqual(statistics.comments, 0)
+
+    def test_change_deferred_observation(self):
+        observation = Observation.objects.only('id').get(
+            pk=self.observation.id)
+        observation.status = 'review'
+        observation.save()
+
+        self.assertEqual(
+            get_statistics(self.project.id).statuses,
+            {'active': 0, 'review': 1}
+        )
+
+    def test_create_many(self):
+        Observation.create_many([
+            Observation(
+                location=LocationFactory.create(),
+                project=self.project,
+                category=self.category,
+                status='active',
+                properties={}
+            ) for x in range(0, 3)
+        ], UserFactory.create())
+
+        self.assertEqual(get_statistics(self.project.id).count('active'), 4)
+
+    def test_reconcile_statistics(self):
+        CommentFactory.create(commentto=self.observation)
+        ProjectStatistics.objects.filter(project=self.project).update(
+            contributions=5, comments=0)
+        other = ProjectFactory.create()
+        ProjectStatistics.objects.create(
+            project=other, category=self.category, status='draft',
+            contributions=1)
+
+        self.assertEqual(reconcile_statistics([self.project.id]),
+                         [self.project.id])
+
+        statistics = get_statistics(self.project.id)
+        self.assertEqual(statistics.contributions, 1)
+        self.assertEqual(statistics.comments, 1)
+        self.assertEqual(get_statistics(other.id).contributions, 1)
+
+        self.assertEqual(reconcile_statistics(), [other.id])
+        self.assertEqual(reconcile_statistics(), [])
+        self.assertEqual(get_statistics(other.id).contributions, 0)
+
+    def test_reconcile_statistics_command(self):
+        ProjectStatistics.objects.all().delete()
+
+        stdout = StringIO()
+        call_command('reconcile_statistics', projects=[self.project.id],
+                     stdout=stdout)
+
+        self.assertIn('Statistics of project %s were out of date.' %
+                      self.project.id, stdout.getvalue())
+        self.assertEqual(get_statistics(self.project.id).contributions, 1)
@@ -24,12 +24,12 @@ from geokey.core.decorators import (
 from geokey.users.serializers import UserSerializer
 from geokey.users.models import User
 from geokey.categories.models import Category
-from geokey.contributions.models import Comment, MediaFile
 
 from .base import STATUS
 from .models import Project, Admins
 from .forms import ProjectCreateForm
 from .serializers import ProjectSerializer
+from .statistics import get_statistics
 
 
 class ProjectContext(object):
@@ -150,7 +150,7 @@ class ProjectOverview(LoginRequiredMixin, ProjectContext, TemplateView):
         Return the context to render the view.
 
         Overwrite the method to add the project, number of contributions,
-        comments and media files in total.
+        comments and media files in total, read from the project statistics.
 
         Parameters
         ----------
@@ -166,12 +166,10 @@ class ProjectOverview(LoginRequiredMixin, ProjectContext, TemplateView):
         project = context.get('project')
 
         if project:
-            contributions = project.observations.all()
-            project.contributions_count = len(contributions)
-            project.comments_count = Comment.objects.filter(
-                commentto=contributions).count()
-            project.media_count = MediaFile.objects.filter(
-                contribution=contributions).count()
+            statistics = get_statistics(project.id)
+            project.contributions_count = statistics.contributions
+            project.comments_count = statistics.comments
+            project.media_count = statistics.media
 
         return context
 
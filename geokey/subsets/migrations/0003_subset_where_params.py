@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+import django_pgjson.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subsets', '0002_historicalsubset'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subset',
+            name='where_params',
+            field=django_pgjson.fields.JsonBField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalsubset',
+            name='where_params',
+            field=django_pgjson.fields.JsonBField(blank=True, null=True),
+        ),
+    ]
@@ -20,4 +20,5 @@ class Subset(FilterMixin, models.Model):
     project = models.ForeignKey('projects.Project', related_name='subsets')
     filters = JsonBField(blank=True, null=True)
     where_clause = models.TextField(blank=True, null=True)
+    where_params = JsonBField(blank=True, null=True)
     history = HistoricalRecords()
@@ -1,6 +1,7 @@
 """Views for superuser tools."""
 
-from django.db.models import Q, Case, When, Sum, IntegerField
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
 from django.views.generic import TemplateView
 from django.contrib import messages
 from django.contrib.sites.shortcuts import get_current_site
@@ -17,7 +18,6 @@ from geokey.core.decorators import handle_exceptions_for_ajax
 from geokey.users.models import User
 from geokey.users.serializers import UserSerializer
 from geokey.projects.models import Project
-from geokey.contributions.base import OBSERVATION_STATUS
 from geokey.superusertools.base import IsSuperuser
 from geokey.superusertools.mixins import SuperuserMixin
 
@@ -113,28 +113,17 @@ class ManageProjects(LoginRequiredMixin, SuperuserMixin, TemplateView):
         Return the context to render the view.
 
         Add a list of projects to the context (with numbers in total of
-        contributions, comments, media files).
+        contributions, comments, media files, read from the statistics of
+        the projects).
 
         Returns
         -------
         dict
         """
         return {'projects': Project.objects.all().annotate(
-            contributions_count=Sum(Case(When(
-                ~Q(observations__status=OBSERVATION_STATUS.deleted) &
-                Q(observations__isnull=False),
-                then=1
-            ), default=0, output_field=IntegerField()), distinct=True),
-            comments_count=Sum(Case(When(
-                ~Q(observations__status=OBSERVATION_STATUS.deleted) &
-                Q(observations__isnull=False),
-                then='observations__num_comments'
-            ), default=0, output_field=IntegerField()), distinct=True),
-            media_count=Sum(Case(When(
-                ~Q(observations__status=OBSERVATION_STATUS.deleted) &
-                Q(observations__isnull=False),
-                then='observations__num_media'
-            ), default=0, output_field=IntegerField()), distinct=True)
+            contributions_count=Coalesce(Sum('statistics__contributions'), 0),
+            comments_count=Coalesce(Sum('statistics__comments'), 0),
+            media_count=Coalesce(Sum('statistics__media'), 0)
         ).defer(
             'description',
             'everyone_contributes',
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+import django_pgjson.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_historicalusergroup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usergroup',
+            name='where_params',
+            field=django_pgjson.fields.JsonBField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalusergroup',
+            name='where_params',
+            field=django_pgjson.fields.JsonBField(blank=True, null=True),
+        ),
+    ]
@@ -4,6 +4,7 @@ from django.db import models
 from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser
 from django.utils import timezone
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 
 from simple_history.models import HistoricalRecords
@@ -13,6 +14,7 @@ from oauth2_provider.models import AccessToken
 from allauth.account.signals import email_confirmed
 
 from geokey.core.mixins import FilterMixin
+from geokey.projects.roles import invalidate_memberships
 from .managers import UserManager
 
 
@@ -76,6 +78,7 @@ class UserGroup(FilterMixin, models.Model):
     can_moderate = models.BooleanField(default=False)
     filters = JsonBField(blank=True, null=True)
     where_clause = models.TextField(blank=True, null=True)
+    where_params = JsonBField(blank=True, null=True)
     history = HistoricalRecords()
 
     def save(self, *args, **kwargs):
@@ -86,3 +89,33 @@ class UserGroup(FilterMixin, models.Model):
             self.can_contribute = True
 
         super(UserGroup, self).save(*args, **kwargs)
+
+
+@receiver(post_save, sender=UserGroup)
+@receiver(post_delete, sender=UserGroup)
+def invalidate_roles_on_usergroup_change(sender, instance, **kwargs):
+    """Invalidate cached roles in the project when a user group changes."""
+    invalidate_memberships(instance.project_id)
+
+
+@receiver(m2m_changed, sender=UserGroup.users.through)
+def invalidate_roles_on_members_change(sender, instance, action, reverse,
+                                       pk_set, **kwargs):
+    """
+    Invalidate cached roles in the projects when users are added to or
+    removed from user groups.
+    """
+    if action not in ['post_add', 'post_remove', 'pre_clear']:
+        return
+
+    if not reverse:
+        project_ids = [instance.project_id]
+    elif action == 'pre_clear':
+        project_ids = instance.usergroup_set.values_list(
+            'project_id', flat=True)
+    else:
+        project_ids = UserGroup.objects.filter(pk__in=pk_set).values_list(
+            'project_id', flat=True)
+
+    for project_id in set(project_ids):
+        invalidate_memberships(project_id)
@@ -40,25 +40,22 @@ class UserGroupTest(TestCase):
         }
         usergroup.save()
 
+        ref = UserGroup.objects.get(pk=usergroup.id)
+        self.assertEqual(
+            ref.where_clause,
+            '((category_id = %s)) OR ((category_id = %s))'
+        )
         self.assertIn(
-            UserGroup.objects.get(pk=usergroup.id).where_clause,
-            [
-                '((category_id = %s)) OR ((category_id = %s))' % (
-                    cat_2.id, cat_1.id
-                ),
-                '((category_id = %s)) OR ((category_id = %s))' % (
-                    cat_1.id, cat_2.id
-                )
-            ]
+            ref.where_params,
+            [[cat_2.id, cat_1.id], [cat_1.id, cat_2.id]]
         )
 
         usergroup.filters = {}
         usergroup.save()
 
-        self.assertEqual(
-            UserGroup.objects.get(pk=usergroup.id).where_clause,
-            'FALSE'
-        )
+        ref = UserGroup.objects.get(pk=usergroup.id)
+        self.assertEqual(ref.where_clause, 'FALSE')
+        self.assertEqual(ref.where_params, [])
 
     def test_contribute_and_moderate(self):
         usergroup = UserGroupFactory.create()